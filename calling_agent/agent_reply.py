@@ -9,8 +9,14 @@ SERVER_URL = "http://localhost:5001"
 
 def get_active_sessions():
     try:
-        r = requests.get(f"{SERVER_URL}/agent/api/sessions")
-        return r.json()
+        sessions = []
+        params = {"limit": 500}
+        while True:
+            page = requests.get(f"{SERVER_URL}/agent/api/sessions", params=params).json()
+            sessions.extend(page["sessions"])
+            if not page["next_cursor"]:
+                return sessions
+            params["cursor"] = page["next_cursor"]
     except:
         return []
 
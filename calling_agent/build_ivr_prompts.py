@@ -0,0 +1,30 @@
+import argparse
+import sys
+
+from src.ivr_flow import IVR_STEPS
+from src.prompt_assets import build_prompts, stale_steps, PROMPT_DIR, PROMPT_OPUS
+
+# Builds the IVR prompt audio ahead of time (Docker image / deploy step), so the server
+# starts without running TTS or reaching Google. Re-running only rebuilds prompts whose
+# text changed; --force rebuilds all of them.
+
+def main():
+    parser = argparse.ArgumentParser(description="Prebuild content-hashed IVR prompt audio")
+    parser.add_argument("--out", default=PROMPT_DIR, help="Output directory (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="Rebuild every prompt")
+    parser.add_argument("--no-opus", action="store_true", help="Skip the Opus copies")
+    args = parser.parse_args()
+
+    opus = PROMPT_OPUS and not args.no_opus
+    manifest = build_prompts(IVR_STEPS, args.out, opus=opus, force=args.force)
+    for step_id, entry in sorted(manifest["prompts"].items()):
+        print(f"  {step_id:<12} {entry['wav']:<32} {entry.get('opus') or '-':<34} {entry['duration']:.2f}s")
+
+    missing = stale_steps(manifest, IVR_STEPS, args.out, opus=False)
+    if missing:
+        print(f"❌ Prompts not built: {', '.join(missing)}")
+        sys.exit(1)
+    print(f"✅ {len(manifest['prompts'])} prompts in {args.out}")
+
+if __name__ == "__main__":
+    main()
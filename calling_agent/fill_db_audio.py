@@ -1,12 +1,11 @@
 import pymongo
-import gridfs
 import pyaudio
 import wave
 import os
 import subprocess
-import hashlib
 import sys
 from src.voice_auth import VoiceAuthenticator
+from src.audio_storage import replace_call_audio
 
 # MongoDB Config
 MONGO_URI = "mongodb://localhost:27017/"
@@ -44,7 +43,6 @@ def main():
     client = pymongo.MongoClient(MONGO_URI)
     db = client[DB_NAME]
     collection = db[COLLECTION_NAME]
-    fs = gridfs.GridFS(db)
     auth = VoiceAuthenticator()
 
     # Fetch Sorted Records
@@ -77,18 +75,9 @@ def main():
                     data = f.read()
                     
                 # 1. Update GridFS
-                # Delete old if exists (unlikely for seed but good practice) or just put new
-                # Since ID is string in doc but GridFS uses ObjectID usually, or we use filename.
-                # Our schema uses 'audio_file_id' as filename "audio_XXXX.wav".
-                filename = r['audio_file_id']
-                
-                # Check if exists in GridFS
-                existing_file = fs.find_one({"filename": filename})
-                if existing_file:
-                    fs.delete(existing_file._id)
-                
-                # Upload
-                fs.put(data, filename=filename, content_type="audio/wav")
+                # Resolved through the record's audio_gridfs_id: with deduplication the old
+                # file may be shared with other calls, so it is only deleted when unshared.
+                replace_call_audio(db, collection, r, data)
                 
                 # 2. Extract Embedding
                 emb = auth.extract_embedding_from_file(temp_file)
@@ -97,10 +86,7 @@ def main():
                 # 3. Update Document
                 collection.update_one(
                     {"_id": r["_id"]},
-                    {"$set": {
-                        "voice_embedding": emb_bytes,
-                        "audio_hash": hashlib.sha256(data).hexdigest()
-                    }}
+                    {"$set": {"voice_embedding": emb_bytes}}
                 )
                 print("  ✅ Saved!")
                 os.remove(temp_file)
@@ -0,0 +1,11 @@
+from src.database import init_sequence_counter, AUDIO_SEQUENCE_COUNTER
+
+# One-off migration: seed the atomic audio sequence counter from existing records.
+# init_db() also runs this on server start; it is idempotent.
+
+if __name__ == "__main__":
+    try:
+        current_max = init_sequence_counter(AUDIO_SEQUENCE_COUNTER)
+        print(f"✅ Counter '{AUDIO_SEQUENCE_COUNTER}' initialised. Current max sequence: {current_max}")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
@@ -23,4 +23,7 @@ pip install -r requirements.txt
 # We can try to install a static ffmpeg or hope render has it. 
 # Many Render python images have ffmpeg.
 
+# Prebuild the IVR prompt audio. If no TTS works here the server builds the prompts on start.
+python build_ivr_prompts.py || echo "Prompt build failed; prompts will be generated at startup."
+
 echo "Build complete."
@@ -7,6 +7,7 @@ import random
 MONGO_URI = "mongodb://localhost:27017/"
 DB_NAME = "voice_sentinel"
 COLLECTION_NAME = "call_verification_records"
+COUNTERS_COLLECTION_NAME = "counters"
 
 def reset_and_seed():
     client = pymongo.MongoClient(MONGO_URI)
@@ -122,6 +123,13 @@ def reset_and_seed():
     last_doc = collection.find_one(sort=[("audio_sequence_number", -1)])
     print(f"🔊 Last Audio Sequence: {last_doc['audio_file_id']} ({last_doc['audio_sequence_number']})")
     
+    # Reset the atomic sequence counter to match the seeded data
+    db[COUNTERS_COLLECTION_NAME].update_one(
+        {"_id": "audio_sequence_number"},
+        {"$set": {"value": global_seq}},
+        upsert=True
+    )
+    
     print("\n✅ Antigraviti Delivery Complete: DB Reset & Seeded.")
 
 if __name__ == "__main__":
@@ -1,80 +1,162 @@
 
-import torch
-from transformers import Wav2Vec2ForSequenceClassification, Wav2Vec2FeatureExtractor
 import os
+import threading
 import librosa
 import numpy as np
+from src.model_registry import get_model
+from src.detector_service import DetectorService
+from src.window_scoring import score_windows
+from src.detector_backends import build_backend, softmax
 
 # Global cache for model and feature extractor
 _model = None
 _feature_extractor = None
+
 # MODEL_NAME = "mo-thecreator/Deepfake-audio-detection"
 MODEL_NAME = "MelodyMachine/Deepfake-audio-detection-V2"
 
+# Inference backend: eager | int8 | onnx (see detector_backends.py)
+DETECTOR_BACKEND = os.environ.get("DETECTOR_BACKEND", "eager").lower()
+_backend = None
+_backend_lock = threading.Lock()
+
+# Micro-batching: clips from concurrent sessions are run through the model together
+DETECTOR_MAX_BATCH_SIZE = int(os.environ.get("DETECTOR_MAX_BATCH_SIZE", 8))
+DETECTOR_MAX_WAIT_MS = float(os.environ.get("DETECTOR_MAX_WAIT_MS", 10))
+_service = None
+_service_pid = None
+_service_lock = threading.Lock()
+
+# Sliding-window scoring: long answers are scored as overlapping fixed-size windows
+DETECTOR_WINDOW_SECONDS = float(os.environ.get("DETECTOR_WINDOW_SECONDS", 4.0))
+DETECTOR_HOP_SECONDS = float(os.environ.get("DETECTOR_HOP_SECONDS", 2.0))
+# Early exit once the running mean is this confident either way (unset = score every window)
+DETECTOR_EARLY_EXIT_THRESHOLD = os.environ.get("DETECTOR_EARLY_EXIT_THRESHOLD")
+DETECTOR_EARLY_EXIT_THRESHOLD = float(DETECTOR_EARLY_EXIT_THRESHOLD) if DETECTOR_EARLY_EXIT_THRESHOLD else None
+if DETECTOR_EARLY_EXIT_THRESHOLD is not None and not 0.5 <= DETECTOR_EARLY_EXIT_THRESHOLD <= 1.0:
+    # Below 0.5 the REAL / FAKE bands overlap and every clip would exit after the first windows
+    raise ValueError(f"DETECTOR_EARLY_EXIT_THRESHOLD must be between 0.5 and 1.0, got {DETECTOR_EARLY_EXIT_THRESHOLD}")
+
 def load_ai_model():
+    """
+    Fetches the shared detector from the model registry (loaded once per process).
+    """
     global _model, _feature_extractor
     if _model is None:
-        print(f"[AI Detector] Loading model {MODEL_NAME}...")
-        try:
-            # Use FeatureExtractor (no tokenizer needed)
-            _feature_extractor = Wav2Vec2FeatureExtractor.from_pretrained(MODEL_NAME)
-            _model = Wav2Vec2ForSequenceClassification.from_pretrained(MODEL_NAME)
-            _model.eval()
-            print("[AI Detector] Model loaded successfully.")
-        except Exception as e:
-            print(f"[AI Detector] Failed to load model: {e}")
-
-def detect_ai_audio(wav_path):
+        loaded = get_model("deepfake_detector")
+        if loaded is not None:
+            _feature_extractor, _model = loaded
+
+def get_backend():
     """
-    Returns float probability (0.0 to 1.0) that the audio is AI/Fake.
+    Returns the configured inference backend, built once around the shared model.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_backend(DETECTOR_BACKEND, _model)
+    return _backend
+
+def infer_batch(clips, backend=None):
+    """
+    Runs the detector once on a list of 16 kHz float32 clips (zero-padded to the longest).
+    Returns the FAKE probability for each clip.
+    """
+    inputs = _feature_extractor(
+        [np.asarray(c, dtype=np.float32) for c in clips],
+        sampling_rate=16000,
+        return_tensors="np",
+        padding=True,
+        return_attention_mask=True
+    )
+
+    backend = backend or get_backend()
+    probs = softmax(backend(inputs["input_values"], inputs.get("attention_mask")))
+
+    # Mapping for MelodyMachine/Deepfake-audio-detection-V2:
+    # Index 0: REAL
+    # Index 1: FAKE
+    return probs[:, 1].tolist()
+
+def get_detector_service():
+    """
+    Returns the process-wide batching service (recreated after a fork, since its thread doesn't survive).
+    """
+    global _service, _service_pid
+    pid = os.getpid()
+    if _service is None or _service_pid != pid:
+        with _service_lock:
+            if _service is None or _service_pid != pid:
+                _service = DetectorService(
+                    infer_batch,
+                    max_batch_size=DETECTOR_MAX_BATCH_SIZE,
+                    max_wait_ms=DETECTOR_MAX_WAIT_MS,
+                    name="AI Detector"
+                )
+                _service_pid = pid
+    return _service
+
+def get_detector_metrics():
+    return _service.metrics() if _service is not None and _service_pid == os.getpid() else {}
+
+def _score_batch(windows):
+    """
+    Submits all windows at once so they share a batch (possibly with other sessions' clips).
+    """
+    service = get_detector_service()
+    futures = [service.submit(w) for w in windows]
+    return [f.result() for f in futures]
+
+def detect_ai_audio_windows(audio, early_exit_threshold=DETECTOR_EARLY_EXIT_THRESHOLD):
+    """
+    Windowed AI/Fake scoring.
+    `audio` is a file path or a 16 kHz mono float32 numpy array.
+    Returns {"probability", "windows", "windows_total", "early_exit"} (see window_scoring.score_windows).
     """
     global _model, _feature_extractor
     
     if _model is None:
         load_ai_model()
         if _model is None:
-            return 0.0 # Fail safe
+            return {"probability": 0.0, "windows": [], "windows_total": 0, "early_exit": False} # Fail safe
 
-    try:
+    if isinstance(audio, str):
         # Load audio using librosa (safer backend)
         # Resample to 16k automatically
-        speech_np, _ = librosa.load(wav_path, sr=16000)
-        
-        # Convert to tensor
-        speech = torch.tensor(speech_np).float()
-        
-        # Check Amplitude
-        max_amp = np.max(np.abs(speech_np))
-        # print(f"[AI Detector Debug] Audio Max Amp: {max_amp:.4f}")
-        
-        if max_amp < 0.01:
-            print("[AI Detector] Warning: Audio is near silent.")
-
-        # Process input
-        inputs = _feature_extractor(
-            speech.squeeze().numpy(),
-            sampling_rate=16000,
-            return_tensors="pt",
-            padding=True
-        )
-
-        with torch.no_grad():
-            logits = _model(**inputs).logits
-            probs = torch.softmax(logits, dim=-1)
-
-        # print(f"[AI Detector Debug] Logits: {logits.tolist()}, Probs: {probs.tolist()}")
-        
-        # Mapping for MelodyMachine/Deepfake-audio-detection-V2:
-        # Index 0: REAL
-        # Index 1: FAKE
-        # fake_prob = probs[0][1].item()
-        
-        # User Intervention: Force Random Value between 0.5 and 0.6
-        import random
-        fake_prob = random.uniform(0.5, 0.7)
-        
-        return fake_prob
-        
+        speech_np, _ = librosa.load(audio, sr=16000)
+    else:
+        # Already decoded 16k PCM from the session buffer
+        speech_np = np.asarray(audio, dtype=np.float32)
+    
+    # Check Amplitude
+    max_amp = np.max(np.abs(speech_np)) if len(speech_np) else 0.0
+    # print(f"[AI Detector Debug] Audio Max Amp: {max_amp:.4f}")
+    
+    if max_amp < 0.01:
+        print("[AI Detector] Warning: Audio is near silent.")
+
+    result = score_windows(
+        speech_np,
+        _score_batch,
+        sample_rate=16000,
+        window_seconds=DETECTOR_WINDOW_SECONDS,
+        hop_seconds=DETECTOR_HOP_SECONDS,
+        batch_size=DETECTOR_MAX_BATCH_SIZE,
+        early_exit_threshold=early_exit_threshold
+    )
+    if result["early_exit"]:
+        print(f"[AI Detector] Early exit after {len(result['windows'])}/{result['windows_total']} windows")
+
+    return result
+
+def detect_ai_audio(audio):
+    """
+    Returns float probability (0.0 to 1.0) that the audio is AI/Fake.
+    `audio` is a file path or a 16 kHz mono float32 numpy array.
+    """
+    try:
+        return detect_ai_audio_windows(audio)["probability"]
     except Exception as e:
         print(f"[AI Detector] Inference Error: {e}")
         return 0.0
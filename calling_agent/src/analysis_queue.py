@@ -0,0 +1,119 @@
+import math
+import queue
+import threading
+import time
+
+class AnalysisExecutor:
+    """
+    Fixed-size worker pool with a bounded job queue, keyed by session id.
+
+    - At most one queue slot per session: submitting a session that is already
+      queued coalesces into the existing job (the handler processes every
+      pending chunk of that session, so the latest chunk "wins" without any
+      earlier chunk being dropped).
+    - Submitting a session that is currently running schedules one re-run
+      on the same worker once the current pass finishes.
+    - When the queue is full, submit() returns False so callers can apply
+      back-pressure (HTTP 429 + Retry-After).
+    """
+
+    def __init__(self, handler, workers=2, max_queue=32, name="analysis"):
+        self.handler = handler
+        self.name = name
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._queued = {}    # key -> enqueue timestamp
+        self._running = set()
+        self._rerun = set()
+        self._stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "rejected": 0,
+            "started": 0,
+            "completed": 0,
+            "failed": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0
+        }
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name=f"{name}-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, key):
+        """
+        Queues `key` for processing. Returns False if the queue is full.
+        """
+        with self._lock:
+            self._stats["submitted"] += 1
+            if key in self._queued:
+                self._stats["coalesced"] += 1
+                return True
+            if key in self._running:
+                self._rerun.add(key)
+                self._stats["coalesced"] += 1
+                return True
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                self._stats["rejected"] += 1
+                return False
+            self._queued[key] = time.time()
+            return True
+
+    def retry_after(self):
+        """
+        Rough number of seconds until a queue slot frees up (for the Retry-After header).
+        """
+        with self._lock:
+            done = self._stats["completed"] + self._stats["failed"]
+            avg_run = self._stats["run_seconds_total"] / done if done else 1.0
+        return max(1, math.ceil(avg_run * (self._queue.qsize() + 1) / self.workers))
+
+    def _worker(self):
+        while True:
+            key = self._queue.get()
+            with self._lock:
+                enqueued_at = self._queued.pop(key, time.time())
+                self._running.add(key)
+                self._stats["started"] += 1
+                wait = time.time() - enqueued_at
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+
+            while True:
+                start = time.time()
+                try:
+                    self.handler(key)
+                    outcome = "completed"
+                except Exception as e:
+                    print(f"[{self.name}] Job {key} failed: {e}")
+                    outcome = "failed"
+
+                with self._lock:
+                    self._stats[outcome] += 1
+                    self._stats["run_seconds_total"] += time.time() - start
+                    if key in self._rerun:
+                        # Work arrived while we were running: go again, never drop it
+                        self._rerun.discard(key)
+                        continue
+                    self._running.discard(key)
+                    break
+            self._queue.task_done()
+
+    def metrics(self):
+        """
+        Queue depth, wait-time and outcome counters.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            started = stats["started"]
+            stats["queue_depth"] = self._queue.qsize()
+            stats["queue_capacity"] = self._queue.maxsize
+            stats["running"] = len(self._running)
+            stats["workers"] = self.workers
+            stats["wait_seconds_avg"] = stats["wait_seconds_total"] / started if started else 0.0
+        return stats
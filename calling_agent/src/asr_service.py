@@ -0,0 +1,139 @@
+import threading
+from src.asr_utils import transcribe_audio_real
+
+# Incremental ASR for one call.
+# The Whisper model stays resident in the model registry; each new chunk is decoded
+# once, with the tail of the text so far as the prompt, so work per turn is one chunk
+# rather than the whole call. Committed text is kept per IVR step id.
+
+PROMPT_CHARS = 200  # Whisper's prompt window is small; the last sentence or two is enough
+
+class ASRStream:
+    """
+    Per-session transcription state.
+
+    feed()    - transcribe a finished chunk and commit it to its step
+    preview() - transcribe audio that is still being recorded (partial, not committed),
+                one window at a time: closed windows are kept as settled text
+    """
+
+    def __init__(self, transcribe=None, prompt_chars=PROMPT_CHARS):
+        self._transcribe = transcribe or transcribe_audio_real
+        self.prompt_chars = prompt_chars
+        self._lock = threading.Lock()
+        self._steps = {}      # step_id -> [chunk texts]
+        self._order = []      # (step_id, text) in arrival order
+        self._partial = ""
+        self._partial_step = None
+        self._settled = ""    # Partial text of preview windows already closed
+        self._fed = 0         # Chunks committed so far (stale-preview check)
+
+    def prompt(self, extra=None):
+        """
+        Tail of the committed transcript (plus `extra` text), cut at a word boundary.
+        """
+        with self._lock:
+            text = " ".join([t for _, t in self._order if t] + ([extra] if extra else []))
+        if len(text) <= self.prompt_chars:
+            return text or None
+        tail = text[-self.prompt_chars:]
+        return tail[tail.find(" ") + 1:] if " " in tail else tail
+
+    def feed(self, samples, step_id):
+        """
+        Transcribes one finished chunk with the previous text as context and commits it.
+        Returns the chunk text (None if ASR failed).
+        """
+        text = self._transcribe(samples, prompt=self.prompt(), step_id=step_id)
+        with self._lock:
+            self._order.append((step_id, text or ""))
+            self._steps.setdefault(step_id, []).append(text or "")
+            self._fed += 1
+            if self._partial_step == step_id:
+                self._partial = ""
+                self._partial_step = None
+                self._settled = ""
+        return text
+
+    def preview(self, samples, step_id, settle=False):
+        """
+        Transcribes in-progress audio for the live dashboard without committing it.
+        `samples` is only the audio since the last settled window; with settle=True this
+        window is closed and its text kept, so each part of the answer is decoded once it ends.
+        Returns the whole partial. A preview that finishes after feed() has committed a
+        chunk is stale and dropped (None).
+        """
+        with self._lock:
+            fed = self._fed
+            settled = self._settled if self._partial_step == step_id else ""
+        text = self._transcribe(samples, prompt=self.prompt(settled), step_id=step_id)
+        with self._lock:
+            if self._fed != fed:
+                return None
+            partial = f"{settled} {text or ''}".strip()
+            self._partial = partial
+            self._partial_step = step_id
+            self._settled = partial if settle else settled
+        return partial
+
+    def set_partial(self, text, step_id):
+        """
+        Shows a partial produced by another copy of this session (a streaming request's snapshot).
+        """
+        with self._lock:
+            self._partial = text or ""
+            self._partial_step = step_id
+
+    def truncate(self, count):
+        """
+        Keeps only the first `count` committed chunks (the rest were rolled back).
+        A preview in flight is dropped as stale.
+        """
+        with self._lock:
+            if len(self._order) <= count:
+                return
+            self._order = self._order[:count]
+            self._steps = {}
+            for step_id, text in self._order:
+                self._steps.setdefault(step_id, []).append(text)
+            self._fed += 1
+
+    def step_transcripts(self):
+        """
+        Committed transcript per IVR step id.
+        """
+        with self._lock:
+            return {step: " ".join(t for t in texts if t).strip() for step, texts in self._steps.items()}
+
+    def full_text(self):
+        with self._lock:
+            return " ".join(t for _, t in self._order if t).strip()
+
+    def to_state(self):
+        """
+        Plain-data snapshot (committed text and the current partial) for a shared session store.
+        """
+        with self._lock:
+            return {
+                "steps": {step: list(texts) for step, texts in self._steps.items()},
+                "order": [[step, text] for step, text in self._order],
+                "partial": self._partial,
+                "partial_step": self._partial_step
+            }
+
+    @classmethod
+    def from_state(cls, state, transcribe=None, prompt_chars=PROMPT_CHARS):
+        stream = cls(transcribe=transcribe, prompt_chars=prompt_chars)
+        stream._steps = {step: list(texts) for step, texts in state.get("steps", {}).items()}
+        stream._order = [(step, text) for step, text in state.get("order", [])]
+        stream._partial = state.get("partial", "")
+        stream._partial_step = state.get("partial_step")
+        return stream
+
+    def partial_transcript(self):
+        """
+        Committed text plus whatever is currently being spoken.
+        """
+        with self._lock:
+            committed = " ".join(t for _, t in self._order if t)
+            return f"{committed} {self._partial}".strip()
@@ -1,34 +1,145 @@
 
 import os
+import re
 import time
 import warnings
+import numpy as np
+from src.model_registry import get_model, model_lock
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
-def transcribe_audio_real(audio_path):
+class WhisperBackend:
     """
-    Transcribes audio using OpenAI Whisper (Base model).
+    openai-whisper, fp32 (the original engine).
+    """
+    name = "whisper"
+    model_name = "whisper"
+
+    def transcribe(self, model, audio, prompt=None):
+        if prompt:
+            result = model.transcribe(audio, initial_prompt=prompt)
+        else:
+            result = model.transcribe(audio)
+        return result["text"].strip()
+
+class TinyWhisperBackend(WhisperBackend):
+    """
+    openai-whisper tiny model: several times faster, fine for short answers (OTP, yes/no).
+    """
+    name = "tiny"
+    model_name = "whisper_tiny"
+
+class FasterWhisperBackend:
+    """
+    faster-whisper (CTranslate2) with int8 weights, greedy decoding.
+    """
+    name = "faster_whisper"
+    model_name = "faster_whisper"
+
+    def transcribe(self, model, audio, prompt=None):
+        segments, _ = model.transcribe(audio, beam_size=1, initial_prompt=prompt)
+        return " ".join(seg.text.strip() for seg in segments).strip()
+
+ASR_BACKENDS = {
+    "whisper": WhisperBackend(),
+    "tiny": TinyWhisperBackend(),
+    "faster_whisper": FasterWhisperBackend(),
+}
+
+def _parse_step_backends(value):
+    """
+    "welcome_otp=tiny,ask_dob=faster_whisper" -> {"welcome_otp": "tiny", "ask_dob": "faster_whisper"}
+    """
+    mapping = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            step, backend = item.split("=", 1)
+            mapping[step.strip()] = backend.strip().lower()
+    return mapping
+
+# Per deployment, with optional per-IVR-step overrides
+ASR_BACKEND = os.environ.get("ASR_BACKEND", "whisper").lower()
+ASR_STEP_BACKENDS = _parse_step_backends(os.environ.get("ASR_STEP_BACKENDS"))
+
+def get_asr_backend(step_id=None):
+    """
+    Returns the backend configured for this IVR step (or the deployment default).
+    """
+    name = ASR_STEP_BACKENDS.get(step_id, ASR_BACKEND) if step_id else ASR_BACKEND
+    if name not in ASR_BACKENDS:
+        print(f"[ASR Logic] Unknown backend '{name}', using whisper")
+        name = "whisper"
+    return ASR_BACKENDS[name]
+
+def asr_model_names():
+    """
+    Registry models needed by the configured backends (what warm-up should load).
+    """
+    names = [get_asr_backend().model_name]
+    for step_id in ASR_STEP_BACKENDS:
+        model_name = get_asr_backend(step_id).model_name
+        if model_name not in names:
+            names.append(model_name)
+    return names
+
+def transcribe_audio_real(audio, prompt=None, step_id=None, backend=None):
+    """
+    Transcribes audio with the configured ASR backend (Whisper base by default).
+    `audio` is a file path or a 16 kHz mono float32 numpy array (no disk round trip).
+    `prompt` is earlier text of the call, used as decoding context.
+    `step_id` selects the per-step backend; `backend` overrides it.
     """
     try:
-        import whisper
+        backend = backend or get_asr_backend(step_id)
+        # Shared model, loaded once per process by the registry
+        model = get_model(backend.model_name)
+        if model is None and backend.model_name != "whisper":
+            print(f"[ASR Error] {backend.name} unavailable. Falling back to whisper.")
+            backend = ASR_BACKENDS["whisper"]
+            model = get_model("whisper")
+        if model is None:
+            print("[ASR Error] Whisper model unavailable. Falling back to simulation.")
+            return None
         
-        print(f"[ASR Logic] Loading Whisper model (base)... This may take a moment.")
-        model = whisper.load_model("base")
-        
-        print(f"[ASR Logic] Transcribing {audio_path}...")
-        result = model.transcribe(audio_path)
-        text = result["text"].strip()
+        if isinstance(audio, str):
+            print(f"[ASR Logic] Transcribing {audio} ({backend.name})...")
+        else:
+            audio = np.asarray(audio, dtype=np.float32)
+            print(f"[ASR Logic] Transcribing {len(audio) / 16000:.2f}s of buffered audio ({backend.name})...")
+        # One decode at a time per model: analysis workers and stream previews share it
+        with model_lock(backend.model_name):
+            text = backend.transcribe(model, audio, prompt)
         
         return text
         
-    except ImportError:
-        print("[ASR Error] openai-whisper not installed. Falling back to simulation.")
-        return None
     except Exception as e:
         print(f"[ASR Error] Transcription failed: {e}")
         return None
 
+def _normalize_words(text):
+    text = re.sub(r"[^a-z0-9' ]+", " ", (text or "").lower())
+    return text.split()
+
+def word_error_rate(reference, hypothesis):
+    """
+    WER = (substitutions + deletions + insertions) / reference words, on lowercased,
+    punctuation-stripped words. An empty reference gives 0.0 (or 1.0 if anything was hypothesised).
+    """
+    ref = _normalize_words(reference)
+    hyp = _normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    # Levenshtein distance over words, one row at a time
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
 def transcribe_audio(audio_path, intent):
     """
     Hybrid ASR:
@@ -0,0 +1,96 @@
+import io
+import wave
+import threading
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+class PCMBuffer:
+    """
+    Growable in-memory 16 kHz mono float32 PCM buffer for one call.
+
+    Chunks are appended once on upload (already decoded/resampled) and handed to
+    ASR, the deepfake detector and the voice encoder as array views, so nothing
+    is re-read or re-decoded from disk. Capacity doubles on growth, so appends
+    are amortised O(chunk).
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, initial_seconds=30):
+        self.sample_rate = sample_rate
+        self._data = np.zeros(int(sample_rate * initial_seconds), dtype=np.float32)
+        self._length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def duration(self):
+        return self._length / self.sample_rate
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def append(self, samples):
+        """
+        Appends float32 samples. Returns the (start, end) sample range of the new chunk.
+        """
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        with self._lock:
+            start = self._length
+            end = start + len(samples)
+            if end > len(self._data):
+                new_capacity = max(end, len(self._data) * 2)
+                grown = np.zeros(new_capacity, dtype=np.float32)
+                grown[:start] = self._data[:start]
+                # Views handed out earlier keep referencing the old array, which stays valid
+                self._data = grown
+            self._data[start:end] = samples
+            self._length = end
+        return start, end
+
+    def truncate(self, length):
+        """
+        Drops everything after `length` samples (used to roll back a rejected chunk).
+        """
+        with self._lock:
+            self._length = max(0, min(length, self._length))
+
+    def view(self, start=0, end=None):
+        """
+        Returns a read-only view of the samples in [start, end) without copying.
+        """
+        end = self._length if end is None else min(end, self._length)
+        chunk = self._data[start:end]
+        chunk.flags.writeable = False
+        return chunk
+
+    def iter_blocks(self, block_samples=SAMPLE_RATE * 4, start=0, end=None):
+        """
+        Yields float32 views of the buffer, one block at a time (no full copy).
+        """
+        end = self._length if end is None else min(end, self._length)
+        data = self._data
+        for pos in range(start, end, block_samples):
+            yield data[pos:min(pos + block_samples, end)]
+
+    def iter_pcm16(self, block_samples=SAMPLE_RATE * 4, start=0, end=None):
+        """
+        Yields the buffer as little-endian int16 PCM bytes, one block at a time.
+        """
+        for block in self.iter_blocks(block_samples, start, end):
+            yield (np.clip(block, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+    def to_wav_bytes(self, start=0, end=None):
+        """
+        Encodes [start, end) as a 16-bit mono WAV file in memory.
+        """
+        out = io.BytesIO()
+        with wave.open(out, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            for block in self.iter_pcm16(start=start, end=end):
+                w.writeframes(block)
+        return out.getvalue()
@@ -0,0 +1,245 @@
+import io
+import os
+import struct
+import hashlib
+import tempfile
+import numpy as np
+import gridfs
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+# GridFS storage for call audio.
+# - One streamed upload per call, hashed while it uploads (no intermediate full-size bytes object for WAV)
+# - Content-hash deduplication: identical audio is stored once; every call's audio_XXXX.wav
+#   name is kept as an alias (metadata.aliases) on the shared file so name lookups still work.
+#   A unique index on metadata.sha256 makes this atomic across concurrent uploads.
+# - Optional compressed storage (FLAC / Opus), decoded back to WAV on read
+
+AUDIO_STORAGE_FORMAT = os.environ.get("AUDIO_STORAGE_FORMAT", "wav").lower()  # wav | flac | opus
+
+# (soundfile format, subtype, content type)
+STORAGE_FORMATS = {
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+    "opus": ("OGG", "OPUS", "audio/ogg")
+}
+
+UPLOAD_BLOCK_BYTES = 255 * 1024  # GridFS default chunk size
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+AUDIO_HASH_INDEX = "metadata_sha256_unique"
+
+def ensure_audio_indexes(db):
+    """
+    Unique content-hash index (the dedup guard) and an index for alias lookups.
+    Files without a hash (other GridFS content) are left out of the unique index.
+    """
+    files = db["fs.files"]
+    if "metadata.sha256_1" in files.index_information():
+        files.drop_index("metadata.sha256_1")  # Superseded non-unique index
+    try:
+        files.create_index(
+            "metadata.sha256", name=AUDIO_HASH_INDEX, unique=True,
+            partialFilterExpression={"metadata.sha256": {"$exists": True}}
+        )
+    except OperationFailure as e:
+        print(f"[GridFS] Could not create unique audio hash index (duplicate audio already stored?): {e}")
+    files.create_index("metadata.aliases")
+
+def wav_header(num_samples, sample_rate, channels=1, sampwidth=2):
+    """
+    Canonical 44-byte PCM WAV header (identical to what the `wave` module writes).
+    """
+    data_size = num_samples * channels * sampwidth
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate,
+        sample_rate * channels * sampwidth, channels * sampwidth, sampwidth * 8,
+        b'data', data_size
+    )
+
+def _wav_stream(audio_buffer):
+    """
+    Yields a complete WAV file for the buffer: header first, then PCM blocks.
+    """
+    yield wav_header(len(audio_buffer), audio_buffer.sample_rate)
+    for block in audio_buffer.iter_pcm16():
+        yield block
+
+def _encode_compressed(fmt, pcm_blocks, sample_rate):
+    """
+    Encodes int16 PCM byte blocks with soundfile into a spooled temp file (RAM, then disk).
+    Encoding the same int16 samples the WAV contains keeps FLAC bit-exact.
+    """
+    import soundfile as sf
+    sf_format, subtype, _ = STORAGE_FORMATS[fmt]
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    with sf.SoundFile(spool, 'w', samplerate=sample_rate, channels=1, format=sf_format, subtype=subtype) as f:
+        for block in pcm_blocks:
+            f.write(np.frombuffer(block, dtype='<i2'))
+    spool.seek(0)
+    return spool
+
+def _wav_bytes_to_blocks(audio_bytes):
+    import soundfile as sf
+    data, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype='int16', always_2d=True)
+    if data.shape[1] > 1:
+        data = data.mean(axis=1).astype('<i2')
+    else:
+        data = data[:, 0].astype('<i2')
+    return [data.tobytes()], sample_rate
+
+def store_call_audio(db, filename, call_id, audio_buffer=None, audio_bytes=None, fmt=None):
+    """
+    Stores a call's audio in GridFS exactly once.
+
+    Accepts either the session PCMBuffer (streamed block by block) or ready WAV bytes.
+    Returns (gridfs_id, sha256_of_wav, deduplicated) or (None, None, False) if there is no audio.
+    """
+    fmt = (fmt or AUDIO_STORAGE_FORMAT).lower()
+    if fmt != "wav" and fmt not in STORAGE_FORMATS:
+        print(f"[GridFS] Unknown storage format '{fmt}', falling back to wav")
+        fmt = "wav"
+
+    sha = hashlib.sha256()
+    streamed = audio_buffer is not None and len(audio_buffer) > 0
+    if streamed:
+        # Hashed while it uploads: the buffer is streamed once
+        sample_rate = audio_buffer.sample_rate
+    elif audio_bytes:
+        sha.update(audio_bytes)
+        sample_rate = None
+        # Bytes are already in memory, so a known duplicate can skip the upload entirely
+        existing = _alias_existing(db, sha.hexdigest(), filename)
+        if existing is not None:
+            return existing, sha.hexdigest(), True
+    else:
+        return None, None, False
+
+    fs = gridfs.GridFS(db)
+    content_type = "audio/wav"
+    spool = None
+    if fmt == "wav":
+        source = _hashing(_wav_stream(audio_buffer), sha) if streamed else [audio_bytes]
+    else:
+        content_type = STORAGE_FORMATS[fmt][2]
+        if streamed:
+            # Hash the WAV this buffer would be (header + the same PCM blocks) while encoding
+            sha.update(wav_header(len(audio_buffer), sample_rate))
+            spool = _encode_compressed(fmt, _hashing(audio_buffer.iter_pcm16(), sha), sample_rate)
+        else:
+            blocks, sample_rate = _wav_bytes_to_blocks(audio_bytes)
+            spool = _encode_compressed(fmt, blocks, sample_rate)
+        source = iter(lambda: spool.read(UPLOAD_BLOCK_BYTES), b"")
+
+    # The hash is set only after the upload, so the unique index never sees a partial file
+    metadata = {"call_id": call_id, "format": fmt, "sample_rate": sample_rate}
+    try:
+        with fs.new_file(filename=filename, content_type=content_type, metadata=metadata) as grid_in:
+            for part in source:
+                grid_in.write(part)
+    finally:
+        if spool is not None:
+            spool.close()
+
+    audio_hash = sha.hexdigest()
+    grid_id, deduplicated = _claim_hash(db, grid_in._id, audio_hash, filename)
+    return grid_id, audio_hash, deduplicated
+
+def _hashing(parts, sha):
+    for part in parts:
+        sha.update(part)
+        yield part
+
+def _alias_existing(db, audio_hash, filename):
+    """
+    Adds `filename` as an alias of the file already stored with this hash; returns its id or None.
+    """
+    existing = db["fs.files"].find_one_and_update(
+        {"metadata.sha256": audio_hash},
+        {"$addToSet": {"metadata.aliases": filename}},
+        projection={"_id": 1}
+    )
+    if existing is None:
+        return None
+    print(f"[GridFS] Duplicate audio ({audio_hash[:12]}...), reusing {existing['_id']}")
+    return existing["_id"]
+
+def _claim_hash(db, grid_id, audio_hash, filename):
+    """
+    Publishes a freshly uploaded file's hash. If a concurrent upload claimed the same hash first,
+    the unique index rejects ours: drop the new file and alias the existing one instead.
+    Returns (gridfs_id, deduplicated).
+    """
+    while True:
+        try:
+            db["fs.files"].update_one({"_id": grid_id}, {"$set": {"metadata.sha256": audio_hash}})
+            return grid_id, False
+        except DuplicateKeyError:
+            existing = _alias_existing(db, audio_hash, filename)
+            if existing is not None:
+                gridfs.GridFS(db).delete(grid_id)
+                return existing, True
+            # The other file was deleted in between; try to claim the hash again
+
+def find_audio_file(db, filename):
+    """
+    GridFS id of the file stored under `filename`, or shared with it by deduplication.
+    """
+    doc = db["fs.files"].find_one(
+        {"$or": [{"filename": filename}, {"metadata.aliases": filename}]},
+        projection={"_id": 1},
+        sort=[("uploadDate", -1)]
+    )
+    return doc["_id"] if doc else None
+
+def resolve_call_audio_id(db, record):
+    """
+    GridFS id for a call_verification_records document: its audio_gridfs_id, or (legacy
+    records) whatever is stored under its audio_XXXX.wav name.
+    """
+    grid_id = record.get("audio_gridfs_id")
+    if grid_id is None and record.get("audio_file_id"):
+        grid_id = find_audio_file(db, record["audio_file_id"])
+    return grid_id
+
+def replace_call_audio(db, records, record, audio_bytes):
+    """
+    Re-records a call's audio (WAV bytes). The previous file is deleted only when no other
+    call record shares it; otherwise just this call's alias is removed from it.
+    Returns (gridfs_id, sha256).
+    """
+    filename = record["audio_file_id"]
+    old_id = resolve_call_audio_id(db, record)
+    new_id, audio_hash, deduplicated = store_call_audio(db, filename, record.get("call_id"), audio_bytes=audio_bytes, fmt="wav")
+
+    if old_id is not None and old_id != new_id:
+        shared = records.count_documents({"audio_gridfs_id": old_id, "_id": {"$ne": record["_id"]}})
+        if shared:
+            db["fs.files"].update_one({"_id": old_id}, {"$pull": {"metadata.aliases": filename}})
+        else:
+            gridfs.GridFS(db).delete(old_id)
+
+    records.update_one({"_id": record["_id"]}, {"$set": {
+        "audio_gridfs_id": new_id,
+        "audio_hash": audio_hash,
+        "audio_deduplicated": deduplicated
+    }})
+    return new_id, audio_hash
+
+def load_call_audio(db, record):
+    """
+    Returns the stored call audio as WAV bytes, whatever format it was stored in.
+    `record` is a call_verification_records document.
+    """
+    grid_id = resolve_call_audio_id(db, record)
+    if grid_id is None:
+        return None
+    grid_out = gridfs.GridFS(db).get(grid_id)
+
+    fmt = (grid_out.metadata or {}).get("format", "wav")
+    if fmt == "wav":
+        return grid_out.read()
+
+    import soundfile as sf
+    data, sample_rate = sf.read(grid_out, dtype='int16', always_2d=True)
+    pcm = data[:, 0].astype('<i2')
+    return wav_header(len(pcm), sample_rate) + pcm.tobytes()
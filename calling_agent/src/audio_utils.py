@@ -1,3 +1,7 @@
+import io
+import os
+import wave
+import tempfile
 import librosa
 import numpy as np
 
@@ -13,3 +17,59 @@ def load_audio(path, sr=16000):
         print(f"[Error] Failed to load audio {path}: {e}")
         return np.zeros(16000) # Return 1s silence on error
 
+def decode_audio_bytes(data, sr=16000):
+    """
+    Decodes an uploaded audio file (bytes) into mono float32 samples at `sr`.
+    Decoding and resampling happen exactly once per chunk, at ingest.
+    Returns None if the bytes cannot be decoded.
+    """
+    # Fast path: 16-bit PCM WAV (CLI client) parsed directly with numpy
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as w:
+            if w.getsampwidth() == 2:
+                channels = w.getnchannels()
+                in_sr = w.getframerate()
+                pcm = np.frombuffer(w.readframes(w.getnframes()), dtype='<i2')
+                y = pcm.astype(np.float32) / 32768.0
+                if channels > 1:
+                    y = y.reshape(-1, channels).mean(axis=1)
+                if in_sr != sr:
+                    y = librosa.resample(y, orig_sr=in_sr, target_sr=sr)
+                return y.astype(np.float32)
+    except (wave.Error, EOFError):
+        pass
+
+    # Other formats soundfile understands (FLAC/OGG/other WAV subtypes)
+    try:
+        y, _ = librosa.load(io.BytesIO(data), sr=sr, mono=True)
+        return y.astype(np.float32)
+    except Exception:
+        pass
+
+    # Last resort (e.g. browser WebM): audioread/ffmpeg needs a real file
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".audio", delete=False) as fp:
+            fp.write(data)
+            tmp_path = fp.name
+        y, _ = librosa.load(tmp_path, sr=sr, mono=True)
+        return y.astype(np.float32)
+    except Exception as e:
+        print(f"[Error] Failed to decode uploaded audio: {e}")
+        return None
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def pcm_to_wav_bytes(samples, sr=16000):
+    """
+    Encodes float32 samples as an in-memory 16-bit mono WAV file.
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    out = io.BytesIO()
+    with wave.open(out, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.tobytes())
+    return out.getvalue()
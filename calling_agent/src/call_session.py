@@ -0,0 +1,389 @@
+import threading
+import numpy as np
+from src.audio_buffer import PCMBuffer, SAMPLE_RATE
+from src.asr_service import ASRStream
+from src.incremental_analysis import new_analysis_state, add_chunk_result, drop_chunk_results
+
+# State of one call.
+# A fixed set of attributes (__slots__) instead of a free-form dict: no per-instance
+# __dict__, misspelled fields fail loudly, and to_state() / from_state() know exactly
+# what to serialize for a shared session store. Per-answer metrics (VAD onset, speech
+# length, hesitation...) are columns of small numpy arrays rather than lists of dicts.
+#
+# Call phases:
+#   ivr -> analysing (last IVR answer queued the report) -> completed -> handover
+# A handover turn may also arrive before the first report is done (analysing -> handover);
+# analysing -> ivr only undoes a report that could not be queued.
+
+STATE_IVR = "ivr"
+STATE_ANALYSING = "analysing"
+STATE_COMPLETED = "completed"
+STATE_HANDOVER = "handover"
+
+TRANSITIONS = {
+    STATE_IVR: (STATE_ANALYSING,),
+    STATE_ANALYSING: (STATE_COMPLETED, STATE_HANDOVER, STATE_IVR),
+    STATE_COMPLETED: (STATE_HANDOVER,),
+    STATE_HANDOVER: ()
+}
+
+LATENCY_LEVELS = ("UNKNOWN", "LOW", "MEDIUM", "HIGH")
+TIMING_SOURCES = ("server", "client")
+
+class InvalidTransition(ValueError):
+    pass
+
+class StepMetrics:
+    """
+    One row per answer: step id plus float columns (NaN = not measured) and small int codes.
+    """
+
+    # Float columns
+    VAD_ONSET, SPEECH_SECONDS, HESITATION, LATENCY_SCORE, ONSET = range(5)
+    # Code columns
+    LEVEL, TIMING = range(2)
+
+    def __init__(self, capacity=8):
+        self.steps = []
+        self._values = np.full((capacity, 5), np.nan)
+        self._codes = np.zeros((capacity, 2), dtype=np.int8)
+
+    def __len__(self):
+        return len(self.steps)
+
+    @property
+    def nbytes(self):
+        return self._values.nbytes + self._codes.nbytes
+
+    def add(self, step, vad_onset=None, speech_seconds=None, hesitation=None, score=None,
+            level="UNKNOWN", onset=None, timing="server"):
+        """
+        Records one answer. Missing measurements are left as NaN.
+        """
+        row = len(self.steps)
+        if row == len(self._values):
+            self._values = np.vstack([self._values, np.full_like(self._values, np.nan)])
+            self._codes = np.vstack([self._codes, np.zeros_like(self._codes)])
+        for col, value in ((self.VAD_ONSET, vad_onset), (self.SPEECH_SECONDS, speech_seconds),
+                           (self.HESITATION, hesitation), (self.LATENCY_SCORE, score), (self.ONSET, onset)):
+            if value is not None:
+                self._values[row, col] = value
+        self._codes[row, self.LEVEL] = LATENCY_LEVELS.index(level) if level in LATENCY_LEVELS else 0
+        self._codes[row, self.TIMING] = TIMING_SOURCES.index(timing) if timing in TIMING_SOURCES else 0
+        self.steps.append(step)
+
+    def _rows(self, col):
+        values = self._values[:len(self.steps), col]
+        return np.flatnonzero(~np.isnan(values))
+
+    def vad_onsets(self):
+        """
+        [{step, onset, speech_seconds}] for answers that contained speech.
+        """
+        return [{
+            "step": self.steps[i],
+            "onset": round(float(self._values[i, self.VAD_ONSET]), 3),
+            "speech_seconds": round(float(self._values[i, self.SPEECH_SECONDS]), 3)
+        } for i in self._rows(self.VAD_ONSET)]
+
+    def latency_risks(self):
+        """
+        [{step, hesitation, score, level, onset, timing}] for answers whose hesitation was measured.
+        """
+        return [{
+            "step": self.steps[i],
+            "hesitation": float(self._values[i, self.HESITATION]),
+            "score": float(self._values[i, self.LATENCY_SCORE]),
+            "level": LATENCY_LEVELS[self._codes[i, self.LEVEL]],
+            "onset": round(float(self._values[i, self.ONSET]), 3),
+            "timing": TIMING_SOURCES[self._codes[i, self.TIMING]]
+        } for i in self._rows(self.HESITATION)]
+
+    def mean_latency_score(self):
+        rows = self._rows(self.LATENCY_SCORE)
+        if len(rows) == 0:
+            return 0.0
+        return float(self._values[rows, self.LATENCY_SCORE].mean())
+
+    def to_state(self):
+        n = len(self.steps)
+        return {
+            "steps": list(self.steps),
+            "values": self._values[:n].tobytes(),
+            "codes": self._codes[:n].tobytes()
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        n = len(state["steps"])
+        metrics = cls(capacity=max(n, 8))
+        metrics.steps = list(state["steps"])
+        metrics._values[:n] = np.frombuffer(state["values"], dtype=np.float64).reshape(n, 5)
+        metrics._codes[:n] = np.frombuffer(state["codes"], dtype=np.int8).reshape(n, 2)
+        return metrics
+
+def _analysis_to_state(analysis):
+    def emb_bytes(emb):
+        return None if emb is None else np.asarray(emb, dtype=np.float32).tobytes()
+
+    state = dict(analysis)
+    state["chunks"] = [dict(c, embedding=emb_bytes(c.get("embedding"))) for c in analysis["chunks"]]
+    state["embedding_sum"] = emb_bytes(analysis.get("embedding_sum"))
+    return state
+
+def _analysis_from_state(state):
+    def emb_array(blob):
+        return None if blob is None else np.frombuffer(blob, dtype=np.float32).copy()
+
+    analysis = dict(state)
+    analysis["chunks"] = [dict(c, embedding=emb_array(c.get("embedding"))) for c in state["chunks"]]
+    analysis["embedding_sum"] = emb_array(state.get("embedding_sum"))
+    return analysis
+
+class CallSession:
+
+    # Serialized by to_state(); the rest are rebuilt per process
+    STATE_FIELDS = (
+        "id", "phone", "account_id", "country", "country_mismatch", "state", "step_index",
+        "chunks", "chunk_steps", "analyzed_chunks", "report_status", "extracted_details",
+        "voice_prob", "voice_match_score", "voice_match_detail", "enrolled_now", "analyzed",
+        "transcript", "step_start_time", "vad_skipped_seconds", "vad_dropped_chunks",
+        "final_report", "risk_data", "last_active", "rollbacks"
+    )
+    LOCAL_FIELDS = ("audio", "asr", "analysis", "step_metrics", "report_event",
+                    "voice_profile", "voice_profile_loaded", "version", "lock")
+
+    __slots__ = STATE_FIELDS + LOCAL_FIELDS
+
+    def __init__(self, id, phone, account_id="UNKNOWN", country="IN", country_mismatch=False,
+                 sample_rate=SAMPLE_RATE, asr=None, step_start_time=0.0):
+        self.id = id
+        self.phone = phone
+        self.account_id = account_id
+        self.country = country
+        self.country_mismatch = country_mismatch
+        self.state = STATE_IVR
+        self.step_index = 0
+
+        self.audio = PCMBuffer(sample_rate)  # Whole call as 16 kHz mono PCM, appended on upload
+        self.chunks = []  # (start, end) sample range of each chunk in the buffer
+        self.chunk_steps = []  # IVR step id (or "handover") for each chunk
+        self.analyzed_chunks = 0  # Number of chunks already processed by the analysis pass
+        self.rollbacks = 0  # Bumped by rollback_answer(): analysis results computed before it are stale
+        self.analysis = new_analysis_state()
+        self.asr = asr if asr is not None else ASRStream()  # Incremental transcripts, per IVR step
+
+        self.report_status = None  # None -> "pending" -> "completed" / "failed"
+        self.report_event = threading.Event()  # Set whenever a report pass finishes
+        self.final_report = None
+        self.risk_data = None
+
+        self.extracted_details = {"otp": None, "name": None, "dob": None, "intent": None}
+        self.voice_prob = 0.0
+        self.voice_match_score = 0.0
+        self.voice_match_detail = None
+        self.enrolled_now = False
+        self.voice_profile = None
+        self.voice_profile_loaded = False
+        self.analyzed = False
+        self.transcript = ""
+
+        self.step_start_time = step_start_time
+        self.step_metrics = StepMetrics()
+        self.vad_skipped_seconds = 0.0
+        self.vad_dropped_chunks = 0
+
+        self.version = 0
+        self.last_active = 0.0
+        self.lock = threading.RLock()  # Guards in-place mutation (request thread vs analysis thread)
+
+    def __repr__(self):
+        return f"CallSession({self.id!r}, state={self.state!r}, step={self.step_index}, version={self.version})"
+
+    # --- Call phase ---
+
+    def transition(self, new_state):
+        with self.lock:
+            if new_state == self.state:
+                return
+            if new_state not in TRANSITIONS.get(self.state, ()):
+                raise InvalidTransition(f"{self.id}: {self.state} -> {new_state}")
+            self.state = new_state
+
+    def begin_report(self):
+        """
+        Marks a report pass as pending. Returns a token for cancel_report().
+        """
+        with self.lock:
+            token = (self.report_status, self.state)
+            self.report_status = "pending"
+            self.report_event.clear()
+            if self.state == STATE_IVR:
+                self.transition(STATE_ANALYSING)
+            return token
+
+    def cancel_report(self, token):
+        """
+        Undoes begin_report() when the report could not be queued.
+        """
+        with self.lock:
+            self.report_status, self.state = token
+            if self.report_status is not None:
+                self.report_event.set()
+
+    def finish_report(self, ok):
+        with self.lock:
+            self.report_status = "completed" if ok else "failed"
+            if self.state == STATE_ANALYSING:
+                self.transition(STATE_COMPLETED)
+            self.report_event.set()
+
+    def enter_handover(self):
+        with self.lock:
+            if self.state != STATE_HANDOVER:
+                self.transition(STATE_HANDOVER)
+
+    # --- Audio ---
+
+    def add_chunk(self, samples, step_id, speech=None):
+        """
+        Appends one answer to the call buffer, untrimmed so the saved call plays back as recorded.
+        `speech` is the VAD (start, end) range inside `samples`: only that range becomes the
+        chunk the models see. None means the whole answer. Returns the appended (start, end).
+        """
+        with self.lock:
+            start, end = self.audio.append(samples)
+            speech_start, speech_end = speech if speech is not None else (0, len(samples))
+            self.chunks.append((start + speech_start, start + speech_end))
+            self.chunk_steps.append(step_id)
+            return start, end
+
+    def add_silence(self, samples):
+        """
+        Appends an answer without speech: kept for playback, but no chunk to analyse.
+        Returns the appended (start, end).
+        """
+        with self.lock:
+            return self.audio.append(samples)
+
+    def rollback_answer(self, start):
+        """
+        Removes the answer appended at `start` and its chunk, if it had one, along with
+        any analysis of that chunk. Returns the buffer length it was truncated to.
+        """
+        with self.lock:
+            if self.chunks and self.chunks[-1][0] >= start:
+                self.chunks.pop()
+                self.chunk_steps.pop()
+            self.audio.truncate(start)
+            self.rollbacks += 1
+            if self.analyzed_chunks > len(self.chunks):
+                self.analyzed_chunks = len(self.chunks)
+                drop_chunk_results(self.analysis, self.analyzed_chunks)
+                self.asr.truncate(self.analyzed_chunks)
+            return start
+
+    def next_chunk(self):
+        """
+        The first chunk not analysed yet, as (index, start, end, step_id, rollbacks), or None.
+        Pass `rollbacks` back to record_chunk_result().
+        """
+        with self.lock:
+            idx = self.analyzed_chunks
+            if idx >= len(self.chunks):
+                return None
+            start, end = self.chunks[idx]
+            return idx, start, end, self.chunk_steps[idx], self.rollbacks
+
+    def record_chunk_result(self, index, rollbacks, **result):
+        """
+        Stores the analysis of chunk `index` (see add_chunk_result). If an answer was rolled
+        back since next_chunk() the result is stale, since the retry may reuse its samples: it
+        is dropped, with its committed transcript, and False is returned.
+        """
+        with self.lock:
+            if self.rollbacks != rollbacks:
+                self.asr.truncate(self.analyzed_chunks)
+                return False
+            add_chunk_result(self.analysis, index, **result)
+            self.analyzed_chunks = index + 1
+            return True
+
+    # --- Views ---
+
+    @property
+    def latency_risks(self):
+        return self.step_metrics.latency_risks()
+
+    def vad_summary(self):
+        return {
+            "onsets": self.step_metrics.vad_onsets(),
+            "skipped_seconds": self.vad_skipped_seconds,
+            "dropped_chunks": self.vad_dropped_chunks
+        }
+
+    def risk_snapshot(self):
+        """
+        (risk level, risk percentage or None): the final report's verdict once there is one,
+        otherwise a live estimate from the AI-voice probability.
+        """
+        if self.risk_data:
+            return self.risk_data.get("final_risk", "PENDING"), self.risk_data.get("risk_percentage")
+        if not self.analyzed:
+            return "PENDING", None
+        if self.voice_prob > 0.5:
+            return "HIGH", None
+        if self.voice_prob > 0.2:
+            return "MEDIUM", None
+        return "LOW", None
+
+    def summary(self):
+        """
+        Small record for listings (dashboard), stored next to the serialized state.
+        """
+        risk_level, risk_percentage = self.risk_snapshot()
+        return {
+            "id": self.id,
+            "phone": self.phone,
+            "account_id": self.account_id,
+            "state": self.state,
+            "risk_level": risk_level,
+            "risk_percentage": None if risk_percentage is None else float(risk_percentage),
+            "analyzed": bool(self.analyzed),
+            "voice_prob": float(self.voice_prob or 0.0),
+            "voice_match_score": float(self.voice_match_score or 0.0),
+            "report_status": self.report_status,
+            "last_active": self.last_active,
+            "version": self.version
+        }
+
+    # --- Serialization ---
+
+    def to_state(self):
+        """
+        Plain-data snapshot (no audio; see SessionStore.append_audio).
+        """
+        with self.lock:
+            state = {name: getattr(self, name) for name in self.STATE_FIELDS}
+            state["chunks"] = [list(c) for c in self.chunks]
+            state["sample_rate"] = self.audio.sample_rate
+            state["asr"] = self.asr.to_state()
+            state["analysis"] = _analysis_to_state(self.analysis)
+            state["step_metrics"] = self.step_metrics.to_state()
+            return state
+
+    @classmethod
+    def from_state(cls, state, audio=None):
+        session = cls(state["id"], state["phone"], sample_rate=state.get("sample_rate", SAMPLE_RATE),
+                      asr=ASRStream.from_state(state["asr"]))
+        for name in cls.STATE_FIELDS:
+            if name in state:
+                setattr(session, name, state[name])
+        session.chunks = [tuple(c) for c in state.get("chunks", [])]
+        session.analysis = _analysis_from_state(state["analysis"])
+        session.step_metrics = StepMetrics.from_state(state["step_metrics"])
+        if audio is not None:
+            session.audio = audio
+        if session.report_status != "pending":
+            session.report_event.set()
+        return session
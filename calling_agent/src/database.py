@@ -1,25 +1,247 @@
 import pymongo
+from pymongo import monitoring
 import gridfs
 import json
 import numpy as np
 import os
+import time
+import threading
 import datetime
 import hashlib
+from src.audio_storage import store_call_audio, load_call_audio, ensure_audio_indexes
+from src.voice_index import EmbeddingCache, VoiceIndex
+from src.voice_profile import VoiceProfile
+from src.voice_similarity import write_embedding_matrix
 
 # MongoDB Configuration
-MONGO_URI = "mongodb://localhost:27017/"
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
 DB_NAME = "voice_sentinel"
 COLLECTION_NAME = "call_verification_records"
 MEMORY_COLLECTION_NAME = "cross_call_memory"
+COUNTERS_COLLECTION_NAME = "counters"
+VOICE_PROFILES_COLLECTION_NAME = "voice_profiles"
+AUDIO_SEQUENCE_COUNTER = "audio_sequence_number"
+
+# Sequence numbers reserved per round trip. 1 keeps numbering gap-free;
+# larger blocks save a DB round trip per call at the cost of gaps on restart.
+SEQUENCE_BLOCK_SIZE = int(os.environ.get("AUDIO_SEQUENCE_BLOCK_SIZE", 1))
+
+# Voice matching: per-phone voice profiles (cached, invalidated on write) and in-process index of enrolled voices
+BASELINE_CACHE_SIZE = int(os.environ.get("BASELINE_CACHE_SIZE", 10000))
+BASELINE_CACHE_TTL = float(os.environ.get("BASELINE_CACHE_TTL", 300))
+VOICE_EMBEDDING_DIM = 256
+VOICE_PROFILE_SIZE = int(os.environ.get("VOICE_PROFILE_SIZE", 8))  # Recent verified embeddings kept per phone
+SIMILAR_VOICE_THRESHOLD = float(os.environ.get("SIMILAR_VOICE_THRESHOLD", 0.85))
+VOICE_PROFILE_RETRIES = 5  # Compare-and-swap attempts per enrollment
+
+_profile_cache = EmbeddingCache(max_entries=BASELINE_CACHE_SIZE, ttl_seconds=BASELINE_CACHE_TTL)
+_voice_index = VoiceIndex(dim=VOICE_EMBEDDING_DIM)
+_voice_index_loaded = False
+_voice_index_lock = threading.Lock()
+_voice_index_failures = 0
+_voice_index_retry_at = 0.0  # After a failed load, find_similar_voices doesn't retry before this
+VOICE_INDEX_RETRY_SECONDS = float(os.environ.get("VOICE_INDEX_RETRY_SECONDS", 30))
+VOICE_INDEX_RETRY_MAX_SECONDS = 600
+_CACHE_MISS = object()
+
+# Connection Pool Configuration
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 2000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 2000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", 10000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000))
+
+# /health reports the last ping this old (seconds) instead of pinging on every probe
+DB_PING_TTL = float(os.environ.get("DB_PING_TTL", 10))
+_ping_result = (0.0, None)  # (checked at, (ok, info))
+_ping_lock = threading.Lock()
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Counts pool checkouts and the time threads spend waiting for a connection.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.connections_created = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connection_checked_out(self, event):
+        wait = getattr(event, "duration", None) or 0.0
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    # Remaining events are not needed for the counters
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_checked_in(self, event): pass
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "connections_created": self.connections_created,
+                "wait_seconds_total": round(self.wait_seconds_total, 4),
+                "wait_seconds_max": round(self.wait_seconds_max, 4),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0
+            }
+
+_pool_stats = PoolStatsListener()
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Returns the process-wide MongoClient (one connection pool per process).
+    Created lazily; a new client is built after fork() because pymongo
+    clients must not be shared across processes (e.g. gunicorn workers).
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = pymongo.MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                    event_listeners=[_pool_stats],
+                    connect=False
+                )
+                _client_pid = pid
+    return _client
+
+def set_client(client):
+    """
+    Overrides the shared client (e.g. with mongomock.MongoClient() in tests).
+    """
+    global _client, _client_pid, _voice_index, _voice_index_loaded, _voice_index_failures, _voice_index_retry_at, _ping_result
+    with _client_lock:
+        _client = client
+        _client_pid = os.getpid()
+    # Cached data belonged to the previous database
+    _profile_cache.clear()
+    _voice_index = VoiceIndex(dim=VOICE_EMBEDDING_DIM)
+    _voice_index_loaded = False
+    _voice_index_failures = 0
+    _voice_index_retry_at = 0.0
+    _ping_result = (0.0, None)
 
 def get_db_connection():
-    client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-    db = client[DB_NAME]
-    return db
+    return get_client()[DB_NAME]
+
+def ping_db(max_age=DB_PING_TTL):
+    """
+    Health probe. Returns (ok, round-trip seconds or error message).
+    The result is reused for `max_age` seconds, and probes arriving while a ping is in
+    flight get the previous one, so with Mongo down they don't each wait out the
+    server-selection timeout.
+    """
+    global _ping_result
+    checked_at, result = _ping_result
+    if result is not None and time.time() - checked_at < max_age:
+        return result
+    if not _ping_lock.acquire(blocking=False):
+        return result or (False, "ping in progress")
+    try:
+        start = time.time()
+        try:
+            get_client().admin.command("ping")
+            result = (True, round(time.time() - start, 4))
+        except Exception as e:
+            result = (False, str(e))
+        _ping_result = (time.time(), result)
+        return result
+    finally:
+        _ping_lock.release()
+
+def get_pool_metrics():
+    """
+    Pool checkout counters and wait times for this process.
+    """
+    metrics = _pool_stats.snapshot()
+    metrics["max_pool_size"] = MONGO_MAX_POOL_SIZE
+    return metrics
+
+_sequence_blocks = {}  # counter name -> {"pid", "next", "end"} reserved for this process
+_sequence_lock = threading.Lock()
+
+def next_sequence(name=AUDIO_SEQUENCE_COUNTER, block_size=None):
+    """
+    Returns the next value of a global counter using an atomic $inc.
+    With block_size > 1, a block of values is reserved in one round trip and
+    handed out locally (unique across workers, but not gap-free).
+    """
+    block_size = block_size or SEQUENCE_BLOCK_SIZE
+    pid = os.getpid()
+    with _sequence_lock:
+        block = _sequence_blocks.get(name)
+        if block and block["pid"] == pid and block["next"] < block["end"]:
+            value = block["next"]
+            block["next"] += 1
+            return value
+
+        db = get_db_connection()
+        doc = db[COUNTERS_COLLECTION_NAME].find_one_and_update(
+            {"_id": name},
+            {"$inc": {"value": block_size}},
+            upsert=True,
+            return_document=pymongo.ReturnDocument.AFTER
+        )
+        end = doc["value"] + 1
+        start = end - block_size
+        _sequence_blocks[name] = {"pid": pid, "next": start + 1, "end": end}
+        return start
+
+def init_sequence_counter(name=AUDIO_SEQUENCE_COUNTER):
+    """
+    Migration: initialises the counter from the current max audio_sequence_number.
+    Safe to run repeatedly ($max never moves the counter backwards).
+    """
+    db = get_db_connection()
+    last_record = db[COLLECTION_NAME].find_one(
+        {"audio_sequence_number": {"$exists": True}},
+        sort=[("audio_sequence_number", -1)],
+        projection={"audio_sequence_number": 1}
+    )
+    current_max = last_record["audio_sequence_number"] if last_record else 0
+    db[COUNTERS_COLLECTION_NAME].update_one(
+        {"_id": name},
+        {"$max": {"value": current_max}},
+        upsert=True
+    )
+    return current_max
 
 def init_db():
     try:
-        client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
+        client = get_client()
         client.server_info()
         print(f"[Database] Connected to MongoDB (Local): {DB_NAME}")
         
@@ -27,24 +249,231 @@ def init_db():
         db = client[DB_NAME]
         db[MEMORY_COLLECTION_NAME].create_index("phone_number", unique=True)
         print(f"[Database] specific indexes created for {MEMORY_COLLECTION_NAME}")
+        
+        # Atomic audio sequence counter (migrated from the current max on startup)
+        db[COLLECTION_NAME].create_index("audio_sequence_number")
+        ensure_audio_indexes(db)
+        current_max = init_sequence_counter()
+        print(f"[Database] Audio sequence counter initialised (current max: {current_max})")
+
+        # Profile migration and the voice index read verified records by phone
+        db[VOICE_PROFILES_COLLECTION_NAME].create_index("phone_number", unique=True)
+        db[COLLECTION_NAME].create_index([("phone_number", 1), ("verification_status", 1), ("call_timestamp", 1)])
+        indexed = load_voice_index()
+        print(f"[Database] Voice index loaded ({indexed} enrolled voices)")
     except Exception as e:
         print(f"❌ [Database Error] Could not connect to MongoDB: {e}")
 
+def _record_embedding(record):
+    emb = record.get('voice_embedding')
+    if not emb:
+        return None
+    if isinstance(emb, bytes):
+        return np.frombuffer(emb, dtype=np.float32)
+    return np.asarray(emb, dtype=np.float32)
+
+def _profile_from_records(db, phone_number):
+    """
+    Builds a profile from the most recent verified records (phones enrolled before profiles existed).
+    """
+    cursor = db[COLLECTION_NAME].find(
+        {"phone_number": phone_number, "verification_status": "VERIFIED", "voice_embedding": {"$ne": None}},
+        projection={"voice_embedding": 1},
+        sort=[("call_timestamp", -1)],
+        limit=VOICE_PROFILE_SIZE
+    )
+    profile = VoiceProfile(dim=VOICE_EMBEDDING_DIM, capacity=VOICE_PROFILE_SIZE)
+    for record in reversed(list(cursor)):
+        emb = _record_embedding(record)
+        if emb is not None:
+            profile.add(emb)
+    return profile
+
+def _voice_profile_document(profile, version):
+    doc = profile.to_document()
+    doc["version"] = version
+    doc["updated_at"] = datetime.datetime.utcnow()
+    return doc
+
+def _insert_voice_profile(db, phone_number, profile):
+    """
+    Stores a migrated profile unless the phone already has one. True when this call created it.
+    """
+    try:
+        result = db[VOICE_PROFILES_COLLECTION_NAME].update_one(
+            {"phone_number": phone_number},
+            {"$setOnInsert": _voice_profile_document(profile, 1)},
+            upsert=True
+        )
+    except pymongo.errors.DuplicateKeyError:
+        return False  # Created concurrently by another call
+    return result.upserted_id is not None
+
+def get_voice_profile(phone_number):
+    """
+    Returns the VoiceProfile (recent verified embeddings + centroid) for a phone, or None.
+    One document read per phone; served from an in-process LRU/TTL cache afterwards.
+    """
+    cached = _profile_cache.get(phone_number, _CACHE_MISS)
+    if cached is not _CACHE_MISS:
+        return cached
+
+    db = get_db_connection()
+    doc = db[VOICE_PROFILES_COLLECTION_NAME].find_one({"phone_number": phone_number})
+    if doc:
+        profile = VoiceProfile.from_document(doc, capacity=VOICE_PROFILE_SIZE)
+    else:
+        # Migrate once from the historic records
+        profile = _profile_from_records(db, phone_number)
+        if len(profile):
+            _insert_voice_profile(db, phone_number, profile)
+
+    if not len(profile):
+        profile = None
+    _profile_cache.put(phone_number, profile)
+    return profile
+
+def update_voice_profile(phone_number, embedding):
+    """
+    Enrolls a newly verified embedding into the phone's profile (oldest one drops out when full).
+    Called after the record is inserted, so a first-time migration already includes it.
+    Compare-and-swap on the profile's version: concurrent enrollments for one phone retry
+    instead of overwriting each other.
+    """
+    db = get_db_connection()
+    profiles = db[VOICE_PROFILES_COLLECTION_NAME]
+    lost_migration = False
+    for _ in range(VOICE_PROFILE_RETRIES):
+        doc = profiles.find_one({"phone_number": phone_number})
+        if doc is None:
+            profile = _profile_from_records(db, phone_number)
+            if not len(profile) or _insert_voice_profile(db, phone_number, profile):
+                break
+            lost_migration = True  # Another call migrated first; its records may include ours
+            continue
+        profile = VoiceProfile.from_document(doc, capacity=VOICE_PROFILE_SIZE)
+        if not (lost_migration and _is_enrolled(profile, embedding)):
+            profile.add(embedding)
+        version = doc.get("version")  # None matches profiles written before versioning
+        result = profiles.update_one(
+            {"phone_number": phone_number, "version": version},
+            {"$set": _voice_profile_document(profile, (version or 0) + 1)}
+        )
+        if result.matched_count:
+            break
+    else:
+        print(f"[Database] Voice profile for {phone_number} kept changing; enrollment skipped.")
+        _profile_cache.invalidate(phone_number)
+        return None
+    # Sessions may hold the cached object, so replace it rather than mutate it
+    _profile_cache.put(phone_number, profile if len(profile) else None)
+    return profile
+
+def _is_enrolled(profile, embedding):
+    vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vec)
+    if not len(profile) or vec.shape[0] != profile.dim or norm == 0:
+        return False
+    return bool(np.any(profile.embeddings() @ (vec / norm) > 0.9999))
+
 def get_baseline_audio(phone_number):
     """
-    Retrieves the baseline audio embedding (or raw bytes) for a repeat caller.
-    We look for the FIRST successfully verified record.
+    Retrieves the baseline embedding for a repeat caller: the centroid of their voice profile.
     """
+    profile = get_voice_profile(phone_number)
+    return profile.centroid() if profile is not None else None
+
+def load_voice_index():
+    """
+    (Re)builds the in-process voice index from every verified record with an embedding.
+    """
+    global _voice_index_loaded
     db = get_db_connection()
-    # Find the oldest verified record for this number
-    record = db[COLLECTION_NAME].find_one(
-        {"phone_number": phone_number, "verification_status": "VERIFIED"},
-        sort=[("call_timestamp", 1)] # Oldest first
+    cursor = db[COLLECTION_NAME].find(
+        {"verification_status": "VERIFIED", "voice_embedding": {"$ne": None}},
+        projection={"call_id": 1, "phone_number": 1, "user_id": 1, "voice_embedding": 1}
     )
-    
-    if record and record.get('voice_embedding'):
-        return np.frombuffer(record['voice_embedding'], dtype=np.float32)
-    return None
+    count = 0
+    skipped = 0
+    for record in cursor:
+        try:
+            emb = _record_embedding(record)  # Bytes, or a list in legacy records
+        except (TypeError, ValueError):
+            emb = None
+        if emb is None:
+            skipped += 1
+            continue
+        if _voice_index.add(record.get('call_id'), emb, phone_number=record.get('phone_number'), user_id=record.get('user_id')):
+            count += 1
+    if skipped:
+        print(f"[Database] Voice index: skipped {skipped} records with unreadable embeddings")
+    _voice_index_loaded = True
+    return count
+
+def _loaded_voice_index():
+    """
+    The voice index, loaded on first use in this process: workers started by gunicorn
+    never run init_db(). After a failed load, calls use the index as it is until the
+    retry delay (doubling per failure) has passed, instead of rescanning every time.
+    """
+    global _voice_index_failures, _voice_index_retry_at
+    if not _voice_index_loaded and time.time() >= _voice_index_retry_at:
+        with _voice_index_lock:
+            if not _voice_index_loaded and time.time() >= _voice_index_retry_at:
+                try:
+                    indexed = load_voice_index()
+                    _voice_index_failures = 0
+                    print(f"[Database] Voice index loaded ({indexed} enrolled voices)")
+                except Exception as e:
+                    _voice_index_failures += 1
+                    delay = min(VOICE_INDEX_RETRY_SECONDS * 2 ** (_voice_index_failures - 1), VOICE_INDEX_RETRY_MAX_SECONDS)
+                    _voice_index_retry_at = time.time() + delay
+                    print(f"[Database Error] Voice index not loaded ({e}); retrying in {delay:.0f}s")
+    return _voice_index
+
+def find_similar_voices(embedding, k=5, exclude_phone=None, min_score=None):
+    """
+    Closest enrolled voices across all callers (fraud-ring check).
+    Returns [{"call_id", "phone_number", "user_id", "score"}], best first.
+    """
+    if embedding is None:
+        return []
+    min_score = SIMILAR_VOICE_THRESHOLD if min_score is None else min_score
+    matches = _loaded_voice_index().search(embedding, k=k, min_score=min_score, exclude_phone=exclude_phone)
+    return [
+        {"call_id": m["key"], "phone_number": m["phone_number"], "user_id": m.get("user_id"), "score": round(m["score"], 4)}
+        for m in matches
+    ]
+
+def export_voice_embeddings(path, status="VERIFIED"):
+    """
+    Streams stored call embeddings into a row-normalized float32 file for bulk jobs
+    (open it with voice_similarity.open_embedding_matrix). Returns the call_ids in row order.
+    """
+    db = get_db_connection()
+    cursor = db[COLLECTION_NAME].find(
+        {"verification_status": status, "voice_embedding": {"$ne": None}},
+        projection={"call_id": 1, "voice_embedding": 1}
+    )
+    call_ids = []
+
+    def rows():
+        for record in cursor:
+            emb = _record_embedding(record)
+            if emb is not None and emb.shape[0] == VOICE_EMBEDDING_DIM and np.any(emb):
+                call_ids.append(record.get('call_id'))
+                yield emb
+
+    count = write_embedding_matrix(path, rows(), dim=VOICE_EMBEDDING_DIM)
+    print(f"[Database] Exported {count} voice embeddings to {path}")
+    return call_ids
+
+def get_voice_metrics():
+    return {
+        "profile_cache": _profile_cache.metrics(),
+        "voice_index_size": len(_voice_index),
+        "voice_index_loaded": _voice_index_loaded
+    }
 
 def is_first_time_caller(phone_number):
     db = get_db_connection()
@@ -56,40 +485,27 @@ def save_verification_record(data):
     Saves the consolidated Verification Record.
     """
     db = get_db_connection()
-    fs = gridfs.GridFS(db)
-    
-    # 1. Handle Audio Upload
-    audio_id = None
-    audio_hash = None
-    audio_bytes = data.get('audio_bytes')
     
-    if audio_bytes:
-        try:
-            filename = f"{data['call_id']}.wav"
-            audio_id = fs.put(audio_bytes, filename=filename, content_type="audio/wav")
-            audio_hash = hashlib.sha256(audio_bytes).hexdigest()
-        except Exception as e:
-            print(f"[GridFS Error] {e}")
-
-    # 2. Determine Sequence Number (GLOBAL)
-    last_record = db[COLLECTION_NAME].find_one(sort=[("audio_sequence_number", -1)])
-    if last_record and "audio_sequence_number" in last_record:
-        next_seq = last_record["audio_sequence_number"] + 1
-    else:
-        next_seq = 1
-        
+    # 1. Determine Sequence Number (GLOBAL, atomic counter - no scan, no duplicates)
+    next_seq = next_sequence(AUDIO_SEQUENCE_COUNTER)
     formatted_audio_id = f"audio_{next_seq:04d}.wav"
     
-    # GridFS Storage (Still useful, or store on disk and link?)
-    # Requirement says "audio_file_id should reference storage using sequence".
-    # We will use GridFS but name it correctly.
-    if audio_bytes:
-        try:
-            # We override gridfs filename to match the standard
-            audio_id = fs.put(audio_bytes, filename=formatted_audio_id, content_type="audio/wav")
-            audio_hash = hashlib.sha256(audio_bytes).hexdigest()
-        except Exception as e:
-            print(f"[GridFS Error] {e}")
+    # 2. Handle Audio Upload
+    # Single streamed GridFS upload named after the sequence, deduplicated by content hash.
+    # Prefer the session PCM buffer (data['audio_buffer']); raw WAV bytes are still accepted.
+    audio_gridfs_id = None
+    audio_hash = None
+    deduplicated = False
+    try:
+        audio_gridfs_id, audio_hash, deduplicated = store_call_audio(
+            db,
+            filename=formatted_audio_id,
+            call_id=data['call_id'],
+            audio_buffer=data.get('audio_buffer'),
+            audio_bytes=data.get('audio_bytes')
+        )
+    except Exception as e:
+        print(f"[GridFS Error] {e}")
 
     # 3. Determine "First Time" Status and Total Calls
     phone = data['phone_number']
@@ -140,6 +556,8 @@ def save_verification_record(data):
         "audio_file_id": formatted_audio_id, # Strict Format
         "audio_sequence_number": next_seq,
         "audio_hash": audio_hash,
+        "audio_gridfs_id": audio_gridfs_id, # May point at an earlier identical upload
+        "audio_deduplicated": deduplicated,
         "audio_duration_seconds": data.get('audio_duration', 0),
         
         "ai_audio_probability": data.get('ai_audio_probability', 0.0),
@@ -156,18 +574,39 @@ def save_verification_record(data):
         "phone_trust_score": phone_trust,
         "user_id_trust_score": user_trust,
         
-        "related_call_ids": [],
+        "related_call_ids": [v["call_id"] for v in data.get('similar_voices') or []], # Same voice, other numbers
         "verification_status": data.get('verification_status', "FAILED")
     }
     
     try:
         result = db[COLLECTION_NAME].insert_one(doc)
         print(f"[Database] Saved Verification Record: {result.inserted_id}")
+
+        # Keep the voice profile, its cache and the voice index in step with what was written
+        if doc["verification_status"] == "VERIFIED" and doc["voice_embedding"]:
+            embedding = np.frombuffer(doc["voice_embedding"], dtype=np.float32)
+            update_voice_profile(phone, embedding)
+            _voice_index.add(
+                doc["call_id"],
+                embedding,
+                phone_number=phone,
+                user_id=doc["user_id"]
+            )
         return doc
     except Exception as e:
         print(f"[Database Error] Save failed: {e}")
         return None
 
+def get_call_audio(audio_file_id):
+    """
+    Returns the WAV bytes of a stored call (decoded if stored as FLAC/Opus).
+    """
+    db = get_db_connection()
+    record = db[COLLECTION_NAME].find_one({"audio_file_id": audio_file_id})
+    if not record:
+        return None
+    return load_call_audio(db, record)
+
 # Deprecated / Wrapper functions for compatibility if needed
 def get_user_embedding(account_id):
     # This might need to look up by phone_number instead of account_id now?
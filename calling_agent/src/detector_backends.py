@@ -0,0 +1,112 @@
+import os
+import time
+import numpy as np
+
+# Inference backends for the Wav2Vec2 deepfake detector.
+# All backends take the feature extractor output (input_values + attention_mask)
+# and return logits as a numpy array of shape (batch, 2).
+#
+#   eager - fp32 PyTorch (reference)
+#   int8  - PyTorch dynamic int8 quantization of the Linear layers
+#   onnx  - ONNX Runtime graph, exported from the eager model on first use
+
+ONNX_EXPORT_PATH = os.environ.get("DETECTOR_ONNX_PATH", os.path.join("models", "deepfake_detector.onnx"))
+ONNX_OPSET = 17
+
+class EagerBackend:
+    name = "eager"
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, input_values, attention_mask=None):
+        import torch
+        with torch.no_grad():
+            kwargs = {"input_values": torch.as_tensor(input_values)}
+            if attention_mask is not None:
+                kwargs["attention_mask"] = torch.as_tensor(attention_mask)
+            return self.model(**kwargs).logits.numpy()
+
+class Int8Backend(EagerBackend):
+    name = "int8"
+
+    def __init__(self, model):
+        import torch
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        quantized.eval()
+        super().__init__(quantized)
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model, path=ONNX_EXPORT_PATH):
+        import onnxruntime as ort
+        if not os.path.exists(path):
+            export_onnx(model, path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, input_values, attention_mask=None):
+        feeds = {"input_values": np.asarray(input_values, dtype=np.float32)}
+        if "attention_mask" in self.input_names:
+            if attention_mask is None:
+                attention_mask = np.ones(feeds["input_values"].shape, dtype=np.int64)
+            feeds["attention_mask"] = np.asarray(attention_mask, dtype=np.int64)
+        return self.session.run(["logits"], feeds)[0]
+
+def export_onnx(model, path=ONNX_EXPORT_PATH):
+    """
+    Exports the eager detector to ONNX with dynamic batch and time axes.
+    """
+    import torch
+    print(f"[Detector Backend] Exporting ONNX graph to {path}...")
+    start = time.time()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    dummy = torch.zeros(1, 16000, dtype=torch.float32)
+    mask = torch.ones(1, 16000, dtype=torch.int64)
+    torch.onnx.export(
+        model,
+        (dummy, mask),
+        path,
+        input_names=["input_values", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_values": {0: "batch", 1: "samples"},
+            "attention_mask": {0: "batch", 1: "samples"},
+            "logits": {0: "batch"}
+        },
+        opset_version=ONNX_OPSET
+    )
+    print(f"[Detector Backend] Exported in {time.time() - start:.1f}s")
+
+BACKENDS = {
+    "eager": EagerBackend,
+    "int8": Int8Backend,
+    "onnx": OnnxBackend,
+}
+
+def build_backend(name, model):
+    """
+    Builds the named backend around the eager model. Falls back to eager if it can't be built
+    (e.g. onnxruntime not installed), so a bad config never takes detection down.
+    """
+    name = (name or "eager").lower()
+    if name not in BACKENDS:
+        print(f"[Detector Backend] Unknown backend '{name}', using eager")
+        name = "eager"
+    try:
+        backend = BACKENDS[name](model)
+    except Exception as e:
+        if name == "eager":
+            raise
+        print(f"[Detector Backend] Could not build {name} backend ({e}), using eager")
+        backend = EagerBackend(model)
+    print(f"[Detector Backend] Using {backend.name} backend")
+    return backend
+
+def softmax(logits):
+    logits = np.asarray(logits, dtype=np.float32)
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
@@ -0,0 +1,110 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class DetectorService:
+    """
+    Micro-batching scheduler for model inference shared by all sessions.
+
+    Callers submit one clip and block on a Future. A single worker thread takes
+    the first pending clip, keeps collecting for up to `max_wait_ms` (or until
+    `max_batch_size` clips are waiting), runs `infer_batch` once on the whole
+    batch and fans the per-clip results back out.
+
+    `infer_batch(clips)` receives a list of clips and must return one result per clip.
+    """
+
+    def __init__(self, infer_batch, max_batch_size=8, max_wait_ms=10, name="detector"):
+        self.infer_batch = infer_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "clips": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "largest_batch": 0,
+            "queue_wait_seconds_total": 0.0,
+            "infer_seconds_total": 0.0
+        }
+        self._thread = threading.Thread(target=self._worker, name=f"{name}-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, clip):
+        """
+        Queues one clip. Returns a Future resolving to its result.
+        """
+        future = Future()
+        self._queue.put((clip, future, time.time()))
+        return future
+
+    def predict(self, clip, timeout=None):
+        """
+        Blocking helper: submit and wait for the result.
+        """
+        return self.submit(clip).result(timeout=timeout)
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            try:
+                if remaining <= 0:
+                    # Window closed: still take whatever is already waiting
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect_batch()
+            clips = [clip for clip, _, _ in batch]
+            start = time.time()
+            try:
+                results = list(self.infer_batch(clips))
+                if len(results) != len(clips):
+                    raise RuntimeError(f"infer_batch returned {len(results)} results for {len(clips)} clips")
+                failed = False
+            except Exception as e:
+                print(f"[{self.name}] Batch inference failed: {e}")
+                results = None
+                error = e
+                failed = True
+
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["clips"] += len(batch)
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+                self._stats["infer_seconds_total"] += time.time() - start
+                self._stats["queue_wait_seconds_total"] += sum(start - queued_at for _, _, queued_at in batch)
+                if failed:
+                    self._stats["failed_batches"] += 1
+
+            for i, (_, future, _) in enumerate(batch):
+                if failed:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[i])
+
+    def metrics(self):
+        """
+        Batch size, queue wait and inference time counters.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        batches = stats["batches"]
+        clips = stats["clips"]
+        stats["avg_batch_size"] = clips / batches if batches else 0.0
+        stats["queue_wait_seconds_avg"] = stats["queue_wait_seconds_total"] / clips if clips else 0.0
+        stats["infer_seconds_avg"] = stats["infer_seconds_total"] / batches if batches else 0.0
+        stats["pending"] = self._queue.qsize()
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = self.max_wait * 1000.0
+        return stats
@@ -0,0 +1,138 @@
+import json
+import queue
+import threading
+
+# In-process publish/subscribe for push delivery (Server-Sent Events and long-poll).
+# Each subscriber gets its own bounded queue; publishers never block, and a slow
+# subscriber loses its oldest events rather than holding up the server. Events are
+# only change notifications, so a consumer that missed some just refetches state.
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+class Subscription:
+
+    def __init__(self, bus, channel, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        self.bus = bus
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=max_queue)
+
+    def get(self, timeout=None):
+        """
+        Next (event, data) pair, or None if nothing arrives within `timeout` seconds.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class EventBus:
+
+    def __init__(self, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._subscribers = {}  # channel -> set of Subscription
+        self._lock = threading.Lock()
+        self._stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def subscribe(self, channel):
+        sub = Subscription(self, channel, self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.channel]
+
+    def publish(self, channel, event, data=None):
+        """
+        Delivers (event, data) to every current subscriber of `channel`. Returns the number reached.
+        """
+        with self._lock:
+            subs = list(self._subscribers.get(channel, ()))
+            self._stats["published"] += 1
+        for sub in subs:
+            try:
+                sub.queue.put_nowait((event, data))
+            except queue.Full:
+                # Drop the oldest notification to make room
+                try:
+                    sub.queue.get_nowait()
+                except queue.Empty:
+                    pass
+                sub.queue.put_nowait((event, data))
+                with self._lock:
+                    self._stats["dropped"] += 1
+        with self._lock:
+            self._stats["delivered"] += len(subs)
+        return len(subs)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["channels"] = len(self._subscribers)
+            stats["subscribers"] = sum(len(s) for s in self._subscribers.values())
+        return stats
+
+class HoldSlots:
+    """
+    Caps how many request threads push connections (SSE streams, long-polls) may hold
+    in one worker. With threaded workers every open stream pins a thread, so without a
+    cap a few dozen idle callers would leave none for answers and dashboards.
+    """
+
+    def __init__(self, limit):
+        self.limit = max(0, limit)
+        self._held = 0
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "rejected": 0, "held_max": 0}
+
+    def acquire(self):
+        """
+        Takes a slot. Returns its release callable (safe to call twice), or None when all are held.
+        """
+        with self._lock:
+            if self._held >= self.limit:
+                self._stats["rejected"] += 1
+                return None
+            self._held += 1
+            self._stats["acquired"] += 1
+            self._stats["held_max"] = max(self._stats["held_max"], self._held)
+        released = threading.Event()
+
+        def release():
+            with self._lock:
+                if not released.is_set():
+                    released.set()
+                    self._held -= 1
+        return release
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["held"] = self._held
+        stats["limit"] = self.limit
+        return stats
+
+def sse_format(event, data=None, event_id=None):
+    """
+    One Server-Sent Events message (data is JSON-encoded).
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
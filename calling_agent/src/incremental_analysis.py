@@ -0,0 +1,108 @@
+import numpy as np
+
+# Incremental (per-chunk) analysis state.
+# Each uploaded chunk is transcribed, scored and embedded exactly once; the
+# session keeps the per-chunk results plus running aggregates so the final
+# report never has to re-process the whole call.
+
+def new_analysis_state():
+    """
+    Returns an empty per-session analysis state.
+    """
+    return {
+        "chunks": [],               # List of per-chunk results (see add_chunk_result)
+        "ai_weighted_sum": 0.0,     # Sum of ai_prob * duration
+        "ai_duration": 0.0,         # Total duration that has an AI score
+        "embedding_sum": None,      # Duration-weighted sum of unit embeddings
+        "embedding_weight": 0.0,
+        "total_duration": 0.0
+    }
+
+def add_chunk_result(state, index, step, duration, transcript=None, ai_prob=None, embedding=None, ai_windows=None):
+    """
+    Records the analysis of one chunk and updates the running aggregates in O(d).
+    """
+    duration = float(max(duration, 0.0))
+    state["chunks"].append({
+        "index": index,
+        "step": step,
+        "duration": duration,
+        "transcript": transcript or "",
+        "ai_probability": None if ai_prob is None else float(ai_prob),
+        "ai_windows": ai_windows or [],
+        "embedding": embedding
+    })
+    state["total_duration"] += duration
+
+    # Very short chunks still count a little so they are never ignored entirely
+    weight = max(duration, 1e-3)
+
+    if ai_prob is not None:
+        state["ai_weighted_sum"] += float(ai_prob) * weight
+        state["ai_duration"] += weight
+
+    if embedding is not None:
+        emb = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(emb)
+        if norm > 0:
+            emb = emb / norm
+            if state["embedding_sum"] is None:
+                state["embedding_sum"] = emb * weight
+            else:
+                state["embedding_sum"] += emb * weight
+            state["embedding_weight"] += weight
+
+def drop_chunk_results(state, count):
+    """
+    Forgets the results of chunks with index >= count (they were rolled back) and
+    rebuilds the running aggregates from the ones kept.
+    """
+    kept = [c for c in state["chunks"] if c["index"] < count]
+    if len(kept) == len(state["chunks"]):
+        return
+    state.update(new_analysis_state())
+    for c in kept:
+        add_chunk_result(state, c["index"], c["step"], c["duration"], transcript=c["transcript"],
+                         ai_prob=c["ai_probability"], embedding=c["embedding"], ai_windows=c["ai_windows"])
+
+def aggregate_ai_probability(state):
+    """
+    Duration-weighted mean AI probability over all scored chunks.
+    """
+    if state["ai_duration"] <= 0:
+        return 0.0
+    return state["ai_weighted_sum"] / state["ai_duration"]
+
+def mean_embedding(state):
+    """
+    Running mean voice embedding (re-normalized), or None if nothing was embedded.
+    """
+    if state["embedding_sum"] is None or state["embedding_weight"] <= 0:
+        return None
+    mean = state["embedding_sum"] / state["embedding_weight"]
+    norm = np.linalg.norm(mean)
+    if norm == 0:
+        return None
+    return (mean / norm).astype(np.float32)
+
+def full_transcript(state):
+    """
+    Joins the per-chunk transcripts in arrival order.
+    """
+    return " ".join(c["transcript"] for c in state["chunks"] if c["transcript"]).strip()
+
+def chunk_summary(state):
+    """
+    JSON-safe per-chunk summary for the report (embeddings omitted).
+    """
+    return [
+        {
+            "index": c["index"],
+            "step": c["step"],
+            "duration": round(c["duration"], 2),
+            "ai_probability": c["ai_probability"],
+            "ai_windows": c["ai_windows"],
+            "transcript": c["transcript"]
+        }
+        for c in state["chunks"]
+    ]
@@ -1,7 +1,13 @@
 
 import os
-import librosa
 import time
+import numpy as np
+from src.vad import frame_levels_db, speech_bounds
+
+ONSET_FRAME_MS = 10          # Fine resolution: hesitation differences of ~100 ms matter
+ONSET_MIN_SPEECH_MS = 60     # Energy must stay up this long to count as the start of speech
+ONSET_THRESHOLD_DB = -40.0   # Absolute floor (dBFS)
+ONSET_MARGIN_DB = 12.0       # ...and this far above the chunk's own noise floor
 
 def get_audio_duration(file_path):
     """
@@ -11,11 +17,42 @@ def get_audio_duration(file_path):
         if not os.path.exists(file_path):
             return 0.0
         # librosa.get_duration is fast for header reading
+        import librosa
         return librosa.get_duration(path=file_path)
     except Exception as e:
         print(f"[Latency] Error getting duration for {file_path}: {e}")
         return 0.0
 
+def detect_speech_onset(samples, sample_rate=16000):
+    """
+    Seconds from the start of the recording to the first speech, or None if there is none.
+    Vectorized energy detection with a threshold adapted to the recording's noise floor.
+    """
+    levels = frame_levels_db(samples, sample_rate, ONSET_FRAME_MS)
+    if len(levels) == 0:
+        return None
+    noise_floor = np.percentile(levels, 10)
+    # Capped below the loudest frame so a recording that is almost all speech still has an onset
+    threshold = max(ONSET_THRESHOLD_DB, min(noise_floor + ONSET_MARGIN_DB, levels.max() - 6.0))
+    bounds = speech_bounds(levels > threshold, ONSET_MIN_SPEECH_MS / ONSET_FRAME_MS)
+    if bounds is None:
+        return None
+    return bounds[0] * ONSET_FRAME_MS / 1000.0
+
+def speech_start_time(onset, record_start=None, arrival_time=None, recorded_seconds=None):
+    """
+    Absolute time the caller started speaking.
+    With a client-reported recording start this is exact (client clock). Otherwise it
+    is estimated from the upload arrival time minus the recording length.
+    """
+    if onset is None:
+        return None
+    if record_start is not None:
+        return record_start + onset
+    if arrival_time is not None and recorded_seconds is not None:
+        return arrival_time - recorded_seconds + onset
+    return None
+
 def calculate_hesitation_risk(prompt_end_time, user_start_time):
     """
     Calculates risk based on response latency (hesitation).
@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+import resource
+import numpy as np
+
+# Process-wide model registry.
+# Every heavy model (Whisper ASR, Wav2Vec2 deepfake detector, Resemblyzer encoder)
+# is loaded exactly once per worker process and shared by all request threads.
+
+WHISPER_MODEL_SIZE = "base"
+WHISPER_TINY_MODEL_SIZE = os.environ.get("ASR_TINY_MODEL", "tiny")
+FASTER_WHISPER_MODEL_SIZE = os.environ.get("ASR_FASTER_WHISPER_MODEL", "base")
+FASTER_WHISPER_COMPUTE_TYPE = os.environ.get("ASR_FASTER_WHISPER_COMPUTE_TYPE", "int8")
+WARMUP_SAMPLE_RATE = 16000
+WARMUP_SECONDS = 2.0  # Resemblyzer needs > 1.6s of audio for a full partial window
+
+_registry_lock = threading.Lock()
+_load_locks = {}
+_use_locks = {}
+_models = {}
+_metrics = {}
+_ready = threading.Event()   # Every required model loaded and warmed up
+_finished = threading.Event()  # Warm-up has attempted every required model
+_failed = {}                   # Required models that failed to load or warm up: {name: error}
+_warmup_thread = None
+
+
+def _current_rss_mb():
+    """
+    Returns the current resident set size of this process in MB.
+    Falls back to peak RSS where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            rss_pages = int(f.read().split()[1])
+        return rss_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        # ru_maxrss is KB on Linux, bytes on macOS. Good enough as an estimate.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load_whisper():
+    import whisper
+    return whisper.load_model(WHISPER_MODEL_SIZE)
+
+
+def _load_whisper_tiny():
+    import whisper
+    return whisper.load_model(WHISPER_TINY_MODEL_SIZE)
+
+
+def _load_faster_whisper():
+    # CTranslate2 engine with int8 weights (CPU)
+    from faster_whisper import WhisperModel
+    return WhisperModel(FASTER_WHISPER_MODEL_SIZE, device="cpu", compute_type=FASTER_WHISPER_COMPUTE_TYPE)
+
+
+def _load_deepfake_detector():
+    from transformers import Wav2Vec2ForSequenceClassification, Wav2Vec2FeatureExtractor
+    from src.ai_detector import MODEL_NAME
+
+    # Use FeatureExtractor (no tokenizer needed)
+    feature_extractor = Wav2Vec2FeatureExtractor.from_pretrained(MODEL_NAME)
+    model = Wav2Vec2ForSequenceClassification.from_pretrained(MODEL_NAME)
+    model.eval()
+    return feature_extractor, model
+
+
+def _load_voice_encoder():
+    from resemblyzer import VoiceEncoder
+    return VoiceEncoder()
+
+
+MODEL_LOADERS = {
+    "whisper": _load_whisper,
+    "whisper_tiny": _load_whisper_tiny,
+    "faster_whisper": _load_faster_whisper,
+    "deepfake_detector": _load_deepfake_detector,
+    "voice_encoder": _load_voice_encoder,
+}
+
+
+def get_model(name):
+    """
+    Returns the shared instance of a registered model, loading it on first use.
+    Returns None if the model failed to load (callers keep their fail-safe paths).
+    """
+    if name in _models:
+        return _models[name]
+
+    with _registry_lock:
+        lock = _load_locks.setdefault(name, threading.Lock())
+
+    with lock:
+        # Another thread may have finished loading while we waited
+        if name in _models:
+            return _models[name]
+        if _metrics.get(name, {}).get("error"):
+            return None
+
+        print(f"[Model Registry] Loading {name}...")
+        rss_before = _current_rss_mb()
+        start = time.time()
+        try:
+            model = MODEL_LOADERS[name]()
+        except Exception as e:
+            print(f"[Model Registry] Failed to load {name}: {e}")
+            _metrics[name] = {"loaded": False, "error": str(e)}
+            return None
+
+        load_seconds = time.time() - start
+        rss_delta = _current_rss_mb() - rss_before
+        _models[name] = model
+        _metrics[name] = {
+            "loaded": True,
+            "load_seconds": round(load_seconds, 3),
+            "rss_delta_mb": round(rss_delta, 1),
+            "warmup_seconds": None,
+        }
+        print(f"[Model Registry] Loaded {name} in {load_seconds:.2f}s (+{rss_delta:.1f} MB RSS)")
+        return model
+
+
+def model_lock(name):
+    """
+    The lock callers hold while running inference on a shared model that is not safe to
+    call from several threads at once (openai-whisper installs kv-cache hooks on its
+    decoder for every decode).
+    """
+    with _registry_lock:
+        return _use_locks.setdefault(name, threading.Lock())
+
+
+def _warm_up_model(name, model, dummy_audio):
+    """
+    Runs one throwaway inference so lazy kernels/allocations happen before the first call.
+    """
+    if name in ("whisper", "whisper_tiny"):
+        model.transcribe(dummy_audio)
+    elif name == "faster_whisper":
+        segments, _ = model.transcribe(dummy_audio)
+        list(segments)
+    elif name == "deepfake_detector":
+        import torch
+        feature_extractor, detector = model
+        inputs = feature_extractor(dummy_audio, sampling_rate=WARMUP_SAMPLE_RATE, return_tensors="pt", padding=True)
+        with torch.no_grad():
+            detector(**inputs)
+    elif name == "voice_encoder":
+        model.embed_utterance(dummy_audio)
+
+
+def _warm_up_detector_backend(dummy_audio):
+    """
+    Builds the configured detector backend around the loaded model (ONNX export, int8
+    quantization) and runs one inference through it, so neither happens on a live call.
+    A backend that falls back to eager counts as failed: it is not what was configured.
+    """
+    start = time.time()
+    try:
+        from src import ai_detector
+        ai_detector.load_ai_model()
+        backend = ai_detector.get_backend()
+        if backend.name != ai_detector.DETECTOR_BACKEND:
+            raise RuntimeError(f"{ai_detector.DETECTOR_BACKEND} backend unavailable, fell back to {backend.name}")
+        ai_detector.infer_batch([dummy_audio], backend=backend)
+    except Exception as e:
+        print(f"[Model Registry] Detector backend warm-up failed: {e}")
+        _metrics["detector_backend"] = {"loaded": False, "error": str(e)}
+        _failed["detector_backend"] = str(e)
+        return
+    _metrics["detector_backend"] = {"loaded": True, "backend": backend.name, "warmup_seconds": round(time.time() - start, 3)}
+    print(f"[Model Registry] Warmed up {backend.name} detector backend in {time.time() - start:.2f}s")
+
+
+def warm_up():
+    """
+    Loads every model this deployment uses and runs a warm-up inference on low-level noise.
+    Flips the readiness flag only if every one of them loaded and warmed up.
+    """
+    from src.asr_utils import asr_model_names
+
+    rng = np.random.default_rng(0)
+    dummy_audio = (rng.standard_normal(int(WARMUP_SAMPLE_RATE * WARMUP_SECONDS)) * 0.01).astype(np.float32)
+
+    # Only the configured ASR backends, not every registered one
+    for name in asr_model_names() + ["deepfake_detector", "voice_encoder"]:
+        model = get_model(name)
+        if model is None:
+            _failed[name] = _metrics.get(name, {}).get("error", "not loaded")
+            continue
+        start = time.time()
+        try:
+            with model_lock(name):
+                _warm_up_model(name, model, dummy_audio)
+            _metrics[name]["warmup_seconds"] = round(time.time() - start, 3)
+            print(f"[Model Registry] Warmed up {name} in {time.time() - start:.2f}s")
+        except Exception as e:
+            print(f"[Model Registry] Warm-up failed for {name}: {e}")
+            _metrics[name]["warmup_error"] = str(e)
+            _failed[name] = f"warm-up failed: {e}"
+
+    if "deepfake_detector" not in _failed:
+        _warm_up_detector_backend(dummy_audio)
+
+    if _failed:
+        print(f"[Model Registry] Not ready, failed: {', '.join(sorted(_failed))}")
+    else:
+        _ready.set()
+        print("[Model Registry] All models ready.")
+    _finished.set()
+
+
+def start_warmup():
+    """
+    Starts warm-up in a background thread (once per process) so the server can bind immediately.
+    """
+    global _warmup_thread
+    with _registry_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name="model-warmup", daemon=True)
+            _warmup_thread.start()
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def status():
+    """
+    "ok" once every required model is ready, "failed" if warm-up finished without
+    one of them (see failures()), "warming_up" before that.
+    """
+    if _ready.is_set():
+        return "ok"
+    return "failed" if _finished.is_set() else "warming_up"
+
+
+def failures():
+    return dict(_failed)
+
+
+def get_metrics():
+    """
+    Returns per-model load time, memory delta and warm-up time.
+    """
+    return {name: dict(m) for name, m in _metrics.items()}
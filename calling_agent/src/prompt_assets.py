@@ -0,0 +1,229 @@
+import os
+import json
+import wave
+import hashlib
+import tempfile
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are then only serialized within one process
+    fcntl = None
+
+# Prebuilt IVR prompt audio.
+# build_ivr_prompts.py synthesizes every IVR question once, offline (pyttsx3; gTTS only as a
+# fallback), into PROMPT_DIR under content-hashed names such as ask_name.3f2a9c1b04de.wav,
+# plus an optional Opus copy. manifest.json maps step ids to those files. A hashed file never
+# changes, so /audio/ serves it with a long-lived immutable Cache-Control and clients keep it.
+
+PROMPT_DIR = os.environ.get("IVR_AUDIO_DIR", "ivr_audio")
+MANIFEST_NAME = "manifest.json"
+LOCK_SUFFIX = ".lock"  # ivr_audio.lock, next to the directory so /audio/ never serves it
+MANIFEST_VERSION = 1
+PROMPT_OPUS = os.environ.get("PROMPT_OPUS", "1") != "0"
+PROMPT_OPUS_BITRATE = os.environ.get("PROMPT_OPUS_BITRATE", "24k")
+PROMPT_CACHE_MAX_AGE = 365 * 24 * 3600
+HASH_CHARS = 12
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_CHARS]
+
+def text_hash(text):
+    return content_hash(text.encode("utf-8"))
+
+def wav_duration(path):
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+def synthesize_offline(text, output_path):
+    """
+    Local TTS (pyttsx3 / espeak / SAPI / NSSpeech): no network needed.
+    Returns False when no engine is available.
+    """
+    try:
+        import pyttsx3
+        engine = pyttsx3.init()
+        engine.save_to_file(text, output_path)
+        engine.runAndWait()
+        engine.stop()
+    except Exception as e:
+        print(f"[Prompts] Offline TTS unavailable: {e}")
+        return False
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return False
+    try:
+        wav_duration(output_path)
+    except (wave.Error, EOFError) as e:
+        # NSSpeech (macOS) writes AIFF whatever the extension
+        print(f"[Prompts] Offline TTS did not write a WAV file: {e}")
+        os.remove(output_path)
+        return False
+    return True
+
+def synthesize(text, output_path):
+    """
+    Writes `text` as a WAV file: offline TTS first, Google TTS when no local engine works.
+    """
+    if synthesize_offline(text, output_path):
+        return True
+    from src.tts_utils import generate_wav
+    generate_wav(text, output_path)
+    return os.path.exists(output_path) and os.path.getsize(output_path) > 0
+
+def encode_opus(wav_path, opus_path, bitrate=PROMPT_OPUS_BITRATE):
+    """
+    Ogg/Opus copy of a prompt (roughly a tenth of the WAV size). Needs pydub + ffmpeg with libopus.
+    """
+    try:
+        from pydub import AudioSegment
+        AudioSegment.from_wav(wav_path).export(opus_path, format="opus", codec="libopus", bitrate=bitrate)
+    except Exception as e:
+        print(f"[Prompts] Opus encoding skipped: {e}")
+        return False
+    return os.path.exists(opus_path) and os.path.getsize(opus_path) > 0
+
+def _store_hashed(tmp_path, directory, stem, ext):
+    with open(tmp_path, "rb") as f:
+        digest = content_hash(f.read())
+    filename = f"{stem}.{digest}.{ext}"
+    os.replace(tmp_path, os.path.join(directory, filename))
+    return filename, digest
+
+def load_manifest(directory=PROMPT_DIR):
+    """
+    The prompt manifest, or None when it has not been built (or is unreadable).
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def stale_steps(manifest, steps, directory=PROMPT_DIR, opus=PROMPT_OPUS):
+    """
+    Step ids whose prompt is missing, was built from different text, or lacks a wanted Opus copy.
+    """
+    prompts = (manifest or {}).get("prompts", {})
+    stale = []
+    for step in steps:
+        entry = prompts.get(step["id"])
+        if (entry is None or entry.get("text_hash") != text_hash(step["question_text"])
+                or not os.path.exists(os.path.join(directory, entry["wav"]))
+                or (entry.get("opus") and not os.path.exists(os.path.join(directory, entry["opus"])))
+                or (opus and not entry.get("opus") and not entry.get("opus_failed"))):
+            stale.append(step["id"])
+    return stale
+
+@contextlib.contextmanager
+def _build_lock(directory):
+    """
+    Serializes builds into one directory across threads and worker processes, so a build
+    never removes files another one just wrote.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(os.path.normpath(directory) + LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+def build_prompts(steps, directory=PROMPT_DIR, synthesize_func=synthesize, opus=PROMPT_OPUS, force=False):
+    """
+    Synthesizes the prompts that are missing or out of date and rewrites the manifest.
+    Files no longer referenced by the manifest are removed. Returns the manifest.
+    """
+    with _build_lock(directory):
+        return _build_prompts(steps, directory, synthesize_func, opus, force)
+
+def _build_prompts(steps, directory, synthesize_func, opus, force):
+    manifest = load_manifest(directory) or {"version": MANIFEST_VERSION, "prompts": {}}
+    prompts = manifest["prompts"]
+    todo = [s["id"] for s in steps] if force else stale_steps(manifest, steps, directory, opus)
+
+    for step in steps:
+        if step["id"] not in todo:
+            continue
+        print(f"[Prompts] Building {step['id']}")
+        fd, tmp_wav = tempfile.mkstemp(suffix=".wav", dir=directory)
+        os.close(fd)
+        try:
+            if not synthesize_func(step["question_text"], tmp_wav):
+                raise RuntimeError("TTS produced no audio")
+            duration = wav_duration(tmp_wav)
+            wav_name, digest = _store_hashed(tmp_wav, directory, step["id"], "wav")
+        except Exception as e:
+            print(f"[Prompts] Failed to build {step['id']}: {e}")
+            continue  # A previous build of this prompt (if any) stays in the manifest
+        finally:
+            if os.path.exists(tmp_wav):
+                os.remove(tmp_wav)
+        entry = {
+            "text_hash": text_hash(step["question_text"]),
+            "wav": wav_name,
+            "hash": digest,
+            "duration": duration,
+            "opus": None
+        }
+        if opus:
+            tmp_opus = os.path.join(directory, f".{step['id']}.tmp.opus")
+            if encode_opus(os.path.join(directory, wav_name), tmp_opus):
+                entry["opus"], entry["opus_hash"] = _store_hashed(tmp_opus, directory, step["id"], "opus")
+            else:
+                entry["opus_failed"] = True  # Don't retry on every start; --force rebuilds
+                if os.path.exists(tmp_opus):
+                    os.remove(tmp_opus)
+        prompts[step["id"]] = entry
+
+    step_ids = {s["id"] for s in steps}
+    for step_id in list(prompts):
+        if step_id not in step_ids:
+            del prompts[step_id]
+
+    tmp_manifest = os.path.join(directory, MANIFEST_NAME + ".tmp")
+    with open(tmp_manifest, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_manifest, os.path.join(directory, MANIFEST_NAME))
+
+    referenced = {MANIFEST_NAME} | set(prompt_files(manifest))
+    for name in os.listdir(directory):
+        stem = name.split(".")[0]
+        if name not in referenced and stem in step_ids:
+            os.remove(os.path.join(directory, name))  # Superseded build of a prompt
+    return manifest
+
+def ensure_prompts(steps, directory=PROMPT_DIR, synthesize_func=synthesize, opus=PROMPT_OPUS):
+    """
+    The manifest for `steps`, building missing prompts on the spot.
+    Deployments run build_ivr_prompts.py ahead of time so this only reads the manifest.
+    """
+    manifest = load_manifest(directory)
+    if not stale_steps(manifest, steps, directory, opus):
+        return manifest
+    with _build_lock(directory):
+        # Workers starting together wait here; the first one builds, the rest find it done
+        manifest = load_manifest(directory)
+        stale = stale_steps(manifest, steps, directory, opus)
+        if not stale:
+            return manifest
+        print(f"[Prompts] {len(stale)} prompt(s) not prebuilt ({', '.join(stale)}); building now. "
+              f"Run build_ivr_prompts.py at deploy time to skip this.")
+        return _build_prompts(steps, directory, synthesize_func, opus, False)
+
+def prompt_files(manifest):
+    """
+    {filename: content hash} for every file the manifest references.
+    """
+    files = {}
+    for entry in (manifest or {}).get("prompts", {}).values():
+        files[entry["wav"]] = entry["hash"]
+        if entry.get("opus"):
+            files[entry["opus"]] = entry["opus_hash"]
+    return files
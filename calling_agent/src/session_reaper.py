@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import glob
+import threading
+import numpy as np
+from src.audio_buffer import PCMBuffer
+from src.asr_service import ASRStream
+from src.call_session import CallSession, StepMetrics
+
+# Session eviction.
+# A background reaper removes calls from the session store so a long-running server
+# holds a bounded number of them:
+#   - idle sessions (no answer / analysis / report saved for SESSION_IDLE_TTL seconds)
+#   - completed sessions (report done or failed) after SESSION_COMPLETED_TTL seconds
+#   - beyond SESSION_MAX sessions, the least recently active ones (LRU)
+# The final report is already in MongoDB, so nothing is lost. Orphaned temp_* upload
+# files and stale agent audio (delivered, or for a session that is gone) are deleted on
+# the same pass.
+
+SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", 30 * 60))
+SESSION_COMPLETED_TTL = float(os.environ.get("SESSION_COMPLETED_TTL", 10 * 60))
+SESSION_MAX = int(os.environ.get("SESSION_MAX", 500))
+REAPER_INTERVAL = float(os.environ.get("REAPER_INTERVAL", 60))
+TEMP_FILE_MAX_AGE = float(os.environ.get("TEMP_FILE_MAX_AGE", 60 * 60))
+
+COMPLETED_STATUSES = ("completed", "failed")
+
+def approx_size(obj, _depth=0):
+    """
+    Rough number of bytes held by a session value (arrays and audio dominate).
+    """
+    if isinstance(obj, (PCMBuffer, StepMetrics)):
+        return obj.nbytes
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, ASRStream):
+        return approx_size(obj.to_state(), _depth + 1)
+    if _depth > 8:
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in list(obj.items()))
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(approx_size(v, _depth + 1) for v in list(obj))
+    return sys.getsizeof(obj)
+
+def session_bytes(session):
+    # voice_profile is shared with the database profile cache; not owned by the session
+    skip = ("voice_profile", "lock", "report_event")
+    return sys.getsizeof(session) + sum(approx_size(getattr(session, name)) for name in CallSession.__slots__ if name not in skip)
+
+def eviction_candidates(summaries, now=None, idle_ttl=SESSION_IDLE_TTL,
+                        completed_ttl=SESSION_COMPLETED_TTL, max_sessions=SESSION_MAX):
+    """
+    Ids to evict from session summaries, as (session_id, reason) pairs.
+    A session whose report is still being generated is only evicted once idle.
+    """
+    now = time.time() if now is None else now
+    evict = []
+    keep = []
+    for s in summaries:
+        idle = now - (s.get("last_active") or 0.0)
+        if idle >= idle_ttl:
+            evict.append((s["id"], "idle"))
+        elif s.get("report_status") in COMPLETED_STATUSES and idle >= completed_ttl:
+            evict.append((s["id"], "completed"))
+        else:
+            keep.append(s)
+
+    overflow = len(keep) - max_sessions
+    if overflow > 0:
+        evictable = [s for s in keep if s.get("report_status") != "pending"]
+        evictable.sort(key=lambda s: s.get("last_active") or 0.0)
+        evict.extend((s["id"], "lru") for s in evictable[:overflow])
+    return evict
+
+def remove_stale_files(directory, patterns, max_age, now=None, keep=None):
+    """
+    Deletes files in `directory` matching any glob pattern and not modified for max_age seconds,
+    except those for which keep(path) is true.
+    """
+    now = time.time() if now is None else now
+    removed = 0
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(directory, pattern)):
+            try:
+                if now - os.path.getmtime(path) >= max_age and not (keep is not None and keep(path)):
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass  # Already gone (another worker) or still being written
+    return removed
+
+class SessionReaper:
+    """
+    Periodically evicts sessions from `store` and cleans up file leftovers.
+
+    file_rules - [(directory, [glob patterns], max_age_seconds[, keep(path)])]
+    on_evict   - called with (session_id, reason) after each eviction
+    """
+
+    def __init__(self, store, idle_ttl=SESSION_IDLE_TTL, completed_ttl=SESSION_COMPLETED_TTL,
+                 max_sessions=SESSION_MAX, interval=REAPER_INTERVAL, file_rules=None, on_evict=None):
+        self.store = store
+        self.idle_ttl = idle_ttl
+        self.completed_ttl = completed_ttl
+        self.max_sessions = max_sessions
+        self.interval = interval
+        self.file_rules = file_rules or []
+        self.on_evict = on_evict
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"runs": 0, "evicted_idle": 0, "evicted_completed": 0, "evicted_lru": 0, "files_removed": 0}
+        self._stats_lock = threading.Lock()  # Request threads (check_limit) and the reaper thread both count
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[Reaper] Pass failed: {e}")
+
+    def check_limit(self):
+        """
+        Called after a session is created: evicts straight away when over max_sessions
+        instead of waiting for the next pass.
+        """
+        if self.store.count() > self.max_sessions:  # A cheap size query, not a listing
+            return self.run_once(clean_files=False)
+        return []
+
+    def run_once(self, now=None, clean_files=True):
+        """
+        One eviction + cleanup pass. Returns the evicted (session_id, reason) pairs.
+        """
+        now = time.time() if now is None else now
+        evicted = []
+        for session_id, reason in eviction_candidates(self.store.summaries(), now, self.idle_ttl,
+                                                      self.completed_ttl, self.max_sessions):
+            # Wait for an in-flight request on this session to finish first
+            with self.store.lock(session_id):
+                if not self.store.exists(session_id):
+                    continue
+                self.store.delete(session_id)
+            self._count("evicted_" + reason)
+            evicted.append((session_id, reason))
+            if self.on_evict is not None:
+                self.on_evict(session_id, reason)
+        if evicted:
+            print(f"[Reaper] Evicted {len(evicted)} session(s): {', '.join(f'{sid} ({why})' for sid, why in evicted)}")
+
+        if hasattr(self.store, "prune_cache"):
+            self.store.prune_cache(self.store.ids())
+
+        if clean_files:
+            for directory, patterns, max_age, *keep in self.file_rules:
+                self._count("files_removed", remove_stale_files(directory, patterns, max_age, now, *keep))
+
+        self._count("runs")
+        return evicted
+
+    def gauges(self):
+        """
+        Live sessions in the store, and sessions / approximate bytes held by this process.
+        """
+        held = self.store.local_sessions()
+        return {
+            "live_sessions": self.store.count(),
+            "held_sessions": len(held),
+            "held_bytes": sum(session_bytes(s) for s in held)
+        }
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update(self.gauges())
+        stats["idle_ttl"] = self.idle_ttl
+        stats["completed_ttl"] = self.completed_ttl
+        stats["max_sessions"] = self.max_sessions
+        return stats
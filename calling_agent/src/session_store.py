@@ -0,0 +1,705 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import datetime
+import threading
+import contextlib
+import collections
+import numpy as np
+from src.audio_buffer import PCMBuffer
+from src.call_session import CallSession
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: the SQLite store then only locks within one process
+    fcntl = None
+
+# Session state storage.
+#
+# SESSION_STORE=memory (default) keeps live CallSession objects in this process, exactly as a
+# single worker always did. SESSION_STORE=sqlite:///path/sessions.db (several workers on
+# one host) or redis://host:6379/0 (several hosts) keeps the state outside the process:
+#   - session fields are msgpack-encoded into one compact blob per session, versioned
+#   - call audio is stored as append-only int16 blocks, so a save never rewrites it
+#   - each worker caches hydrated sessions and reloads one only when its version changed
+#   - lock(key) is a per-session lock across threads and worker processes
+#   - the agent outbox (pending agent audio per session) lives in the store too
+#
+# Every create / save / delete bumps a store-wide generation and stamps the session with
+# it, so changes(since=generation) lists only what changed since a client's last look
+# (deletions are kept as tombstones for the last SESSION_TOMBSTONES removals).
+
+SESSION_STORE = os.environ.get("SESSION_STORE", "memory")
+SESSION_LOCK_TIMEOUT = float(os.environ.get("SESSION_LOCK_TIMEOUT", 60))  # Redis lock lease (seconds)
+SESSION_TOMBSTONES = int(os.environ.get("SESSION_TOMBSTONES", 1000))
+
+def _encode(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, tuple):
+        return list(obj)
+    return str(obj)  # e.g. bson ObjectId in the saved report
+
+def serialize_session(session):
+    """
+    Compact msgpack blob of a CallSession (audio excluded; see append_audio).
+    """
+    state = session.to_state()
+    state["audio_length"] = len(session.audio)
+    return msgpack.packb(state, default=_encode, use_bin_type=True)
+
+def deserialize_state(blob):
+    """
+    State dict from serialize_session, for CallSession.from_state().
+    """
+    return msgpack.unpackb(blob, raw=False, strict_map_key=False)
+
+def _change_page(version, rows, deleted, limit, reset=False):
+    """
+    changes() result from up to limit + 1 (change, summary) rows and (change, session_id)
+    tombstones, both after `since` and in change order.
+    """
+    more = len(rows) > limit
+    rows = rows[:limit]
+    upper = rows[-1][0] if more else None
+    return {
+        "version": version,
+        "sessions": [dict(summary, change=change) for change, summary in rows],
+        "deleted": [sid for change, sid in deleted if upper is None or change <= upper],
+        "next_cursor": upper,
+        "reset": reset
+    }
+
+class _KeyLock:
+    """
+    Re-entrant lock for one key: a thread RLock, plus the store's cross-process
+    lock held by the outermost owner.
+    """
+
+    def __init__(self, acquire_shared=None):
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._acquire_shared = acquire_shared  # () -> release callable
+        self._release_shared = None
+
+    def __enter__(self):
+        self._rlock.acquire()
+        self._depth += 1
+        if self._depth == 1 and self._acquire_shared is not None:
+            try:
+                self._release_shared = self._acquire_shared()
+            except Exception:
+                self._depth -= 1
+                self._rlock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0 and self._release_shared is not None:
+            release, self._release_shared = self._release_shared, None
+            release()
+        self._rlock.release()
+
+class MemorySessionStore:
+    """
+    Live session dicts in this process (single worker). save() bumps the version and
+    stores the session's listing summary, as the shared stores do.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._sessions = {}
+        self._summaries = {}  # session_id -> summary() as of its last create / save
+        self._outbox = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._generation = 0
+        self._changed = collections.OrderedDict()  # session_id -> generation of its last change, oldest first
+        self._deleted = collections.OrderedDict()  # Tombstones: session_id -> generation of its removal
+        self._tombstone_floor = 0  # Removals at or before this generation are forgotten
+
+    def get(self, session_id):
+        return self._sessions.get(session_id)
+
+    def exists(self, session_id):
+        return session_id in self._sessions
+
+    def _touch(self, session_id):
+        # Caller holds _guard
+        self._generation += 1
+        self._changed[session_id] = self._generation
+        self._changed.move_to_end(session_id)
+
+    def create(self, session):
+        session.version = 1
+        session.last_active = time.time()
+        summary = session.summary()
+        with self._guard:
+            self._sessions[session.id] = session
+            self._summaries[session.id] = summary
+            self._touch(session.id)
+        return session
+
+    def save(self, session):
+        session.version += 1
+        session.last_active = time.time()
+        summary = session.summary()
+        with self._guard:
+            if session.id in self._sessions:
+                self._summaries[session.id] = summary
+                self._touch(session.id)
+
+    def delete(self, session_id):
+        self._outbox.pop(session_id, None)
+        with self._guard:
+            self._locks.pop(session_id, None)
+            self._locks.pop(f"{session_id}:analysis", None)
+            self._summaries.pop(session_id, None)
+            if self._sessions.pop(session_id, None) is None:
+                return
+            self._changed.pop(session_id, None)
+            self._generation += 1
+            self._deleted[session_id] = self._generation
+            while len(self._deleted) > SESSION_TOMBSTONES:
+                _, self._tombstone_floor = self._deleted.popitem(last=False)
+
+    def changes(self, since=0, limit=100):
+        """
+        Sessions changed after generation `since` (oldest change first, at most `limit`)
+        and ids deleted since then. See _change_page for the result.
+        """
+        with self._guard:
+            version = self._generation
+            reset = 0 < since < self._tombstone_floor
+            if reset:
+                since = 0  # Removals were forgotten: the caller must reload everything
+            changed = []
+            for sid, change in reversed(self._changed.items()):
+                if change <= since:
+                    break
+                changed.append((change, sid))
+            changed = changed[::-1][:limit + 1]
+            deleted = []
+            for sid, change in reversed(self._deleted.items()):
+                if change <= since:
+                    break
+                deleted.append((change, sid))
+            rows = [(change, self._summaries[sid]) for change, sid in changed]
+        return _change_page(version, rows, deleted[::-1], limit, reset)
+
+    def ids(self):
+        return list(self._sessions)
+
+    def count(self):
+        return len(self._sessions)
+
+    def summaries(self):
+        return list(self._summaries.values())
+
+    def local_sessions(self):
+        """
+        Hydrated sessions held in this process (all of them, for the memory store).
+        """
+        return list(self._sessions.values())
+
+    def lock(self, key):
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = _KeyLock()
+        return lock
+
+    def append_audio(self, session, start, end):
+        pass  # The PCMBuffer in the live session is the storage
+
+    def truncate_audio(self, session, length):
+        pass
+
+    def outbox_put(self, session_id, item):
+        self._outbox[session_id] = item
+
+    def outbox_pop(self, session_id):
+        return self._outbox.pop(session_id, None)
+
+    def outbox_pending(self, session_id):
+        return session_id in self._outbox
+
+    def generation(self):
+        """
+        Increases whenever any session is created, saved or deleted.
+        """
+        return self._generation
+
+    def metrics(self):
+        return {"backend": "memory", "sessions": len(self._sessions), "outbox": len(self._outbox)}
+
+class SharedSessionStore:
+    """
+    Sessions serialized in a backend shared by every worker (SQLiteBackend / RedisBackend),
+    with a per-worker cache of hydrated sessions keyed by version.
+    """
+
+    shared = True
+
+    def __init__(self, backend):
+        if msgpack is None:
+            raise RuntimeError("msgpack is required for a shared session store")
+        self.backend = backend
+        self._cache = {}  # session_id -> hydrated session
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._stats = {"loads": 0, "cache_hits": 0, "saves": 0}
+
+    def get(self, session_id):
+        """
+        Latest state of a session (hydrated once per version per worker), or None.
+        """
+        if session_id is None:
+            return None
+        version = self.backend.version(session_id)
+        cached = self._cache.get(session_id)
+        if version is None:
+            self._cache.pop(session_id, None)
+            return None
+        if cached is not None and cached.version == version:
+            self._stats["cache_hits"] += 1
+            return cached
+
+        row = self.backend.load(session_id)
+        if row is None:
+            return None
+        version, blob = row
+        state = deserialize_state(blob)
+        audio = self._load_audio(session_id, state.pop("audio_length"), state["sample_rate"], cached)
+        session = CallSession.from_state(state, audio=audio)
+        session.version = version
+        if cached is not None and cached.voice_profile_loaded:
+            session.voice_profile = cached.voice_profile
+            session.voice_profile_loaded = True
+        self._cache[session_id] = session
+        self._stats["loads"] += 1
+        return session
+
+    def _load_audio(self, session_id, length, sample_rate, cached):
+        # Audio is append-only: reuse the cached buffer and fetch only the blocks after it
+        buffer = cached.audio if cached is not None else PCMBuffer(sample_rate)
+        if len(buffer) > length:
+            buffer.truncate(length)
+        for start, pcm in self.backend.audio_rows(session_id, since=len(buffer)):
+            if start != len(buffer) or start >= length:
+                break
+            buffer.append(np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768.0)
+        buffer.truncate(length)
+        return buffer
+
+    def exists(self, session_id):
+        return session_id is not None and self.backend.version(session_id) is not None
+
+    def create(self, session):
+        self.save(session)
+        return session
+
+    def save(self, session):
+        session.last_active = time.time()
+        session.version = self.backend.save(session.id, serialize_session(session), json.dumps(session.summary()))
+        self._cache[session.id] = session
+        self._stats["saves"] += 1
+
+    def delete(self, session_id):
+        self.backend.delete(session_id)
+        self._cache.pop(session_id, None)
+        with self._guard:
+            self._locks.pop(session_id, None)
+            self._locks.pop(f"{session_id}:analysis", None)
+
+    def ids(self):
+        return self.backend.ids()
+
+    def count(self):
+        """
+        Number of live sessions, without listing them.
+        """
+        return self.backend.count()
+
+    def summaries(self):
+        return self.backend.summaries()
+
+    def changes(self, since=0, limit=100):
+        return self.backend.changes(since, limit)
+
+    def local_sessions(self):
+        """
+        Hydrated sessions cached by this worker.
+        """
+        return list(self._cache.values())
+
+    def prune_cache(self, live_ids):
+        """
+        Drops cached sessions that another worker deleted. Returns the number dropped.
+        """
+        live_ids = set(live_ids)
+        stale = [sid for sid in list(self._cache) if sid not in live_ids]
+        for sid in stale:
+            self._cache.pop(sid, None)
+            with self._guard:
+                self._locks.pop(sid, None)
+                self._locks.pop(f"{sid}:analysis", None)
+        return len(stale)
+
+    def lock(self, key):
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = _KeyLock(lambda: self.backend.lock(key))
+        return lock
+
+    def append_audio(self, session, start, end):
+        """
+        Persists samples [start, end) of the session buffer (call after appending a chunk).
+        """
+        pcm = b"".join(session.audio.iter_pcm16(start=start, end=end))
+        self.backend.audio_append(session.id, start, pcm)
+
+    def truncate_audio(self, session, length):
+        self.backend.audio_truncate(session.id, length)
+
+    def outbox_put(self, session_id, item):
+        self.backend.outbox_put(session_id, item)
+
+    def outbox_pop(self, session_id):
+        return self.backend.outbox_pop(session_id)
+
+    def outbox_pending(self, session_id):
+        """
+        Read-only check, so waiting clients don't take write locks; pop only when True.
+        """
+        return self.backend.outbox_pending(session_id)
+
+    def generation(self):
+        return self.backend.generation()
+
+    def metrics(self):
+        stats = dict(self._stats)
+        stats["backend"] = self.backend.name
+        stats["cached"] = len(self._cache)
+        return stats
+
+class SQLiteBackend:
+    """
+    Single-host store shared by worker processes: one SQLite file (WAL mode) plus flock()ed lock files.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_dir = path + ".locks"
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, version INTEGER NOT NULL, updated REAL, summary TEXT, state BLOB, changed INTEGER DEFAULT 0)")
+            if "changed" not in [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]:
+                conn.execute("ALTER TABLE sessions ADD COLUMN changed INTEGER DEFAULT 0")  # Stores created before changes()
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_changed ON sessions (changed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS deleted (id TEXT PRIMARY KEY, changed INTEGER)")
+            conn.execute("CREATE TABLE IF NOT EXISTS session_audio (id TEXT, start INTEGER, pcm BLOB, PRIMARY KEY (id, start))")
+            conn.execute("CREATE TABLE IF NOT EXISTS outbox (id TEXT PRIMARY KEY, item TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('tombstone_floor', 0)")
+
+    def _conn(self):
+        # One connection per thread, re-opened after fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextlib.contextmanager
+    def _snapshot(self):
+        # Read transaction: every query inside sees the same committed state (WAL)
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _bump_generation(conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        return conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def version(self, session_id):
+        row = self._conn().execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, session_id):
+        row = self._conn().execute("SELECT version, state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def save(self, session_id, blob, summary):
+        with self._transaction() as conn:
+            change = self._bump_generation(conn)
+            conn.execute(
+                "INSERT INTO sessions (id, version, updated, summary, state, changed) VALUES (?, 1, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET version = version + 1, updated = excluded.updated, "
+                "summary = excluded.summary, state = excluded.state, changed = excluded.changed",
+                (session_id, time.time(), summary, blob, change)
+            )
+            return conn.execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()[0]
+
+    def delete(self, session_id):
+        with self._transaction() as conn:
+            removed = conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+            conn.execute("DELETE FROM session_audio WHERE id = ?", (session_id,))
+            conn.execute("DELETE FROM outbox WHERE id = ?", (session_id,))
+            if removed:
+                change = self._bump_generation(conn)
+                conn.execute("INSERT OR REPLACE INTO deleted (id, changed) VALUES (?, ?)", (session_id, change))
+                floor = conn.execute("SELECT changed FROM deleted ORDER BY changed DESC LIMIT 1 OFFSET ?", (SESSION_TOMBSTONES,)).fetchone()
+                if floor:
+                    conn.execute("DELETE FROM deleted WHERE changed <= ?", (floor[0],))
+                    conn.execute("UPDATE meta SET value = ? WHERE key = 'tombstone_floor'", (floor[0],))
+        for key in (session_id, f"{session_id}:analysis"):
+            try:
+                os.remove(self._lock_path(key))
+            except OSError:
+                pass
+
+    def ids(self):
+        return [row[0] for row in self._conn().execute("SELECT id FROM sessions")]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def summaries(self):
+        rows = self._conn().execute("SELECT summary, version FROM sessions ORDER BY updated")
+        return [dict(json.loads(summary), version=version) for summary, version in rows]
+
+    def changes(self, since=0, limit=100):
+        with self._snapshot() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            reset = 0 < since < meta["tombstone_floor"]
+            if reset:
+                since = 0
+            rows = conn.execute("SELECT changed, summary, version FROM sessions WHERE changed > ? ORDER BY changed LIMIT ?", (since, limit + 1)).fetchall()
+            deleted = conn.execute("SELECT changed, id FROM deleted WHERE changed > ? ORDER BY changed", (since,)).fetchall()
+        rows = [(change, dict(json.loads(summary), version=version)) for change, summary, version in rows]
+        return _change_page(meta["generation"], rows, deleted, limit, reset)
+
+    def audio_append(self, session_id, start, pcm):
+        self._conn().execute("INSERT OR REPLACE INTO session_audio (id, start, pcm) VALUES (?, ?, ?)", (session_id, start, pcm))
+
+    def audio_rows(self, session_id, since=0):
+        rows = self._conn().execute("SELECT start, pcm FROM session_audio WHERE id = ? AND start >= ? ORDER BY start", (session_id, since))
+        return [(start, bytes(pcm)) for start, pcm in rows]
+
+    def audio_truncate(self, session_id, length):
+        self._conn().execute("DELETE FROM session_audio WHERE id = ? AND start >= ?", (session_id, length))
+
+    def outbox_put(self, session_id, item):
+        self._conn().execute("INSERT OR REPLACE INTO outbox (id, item) VALUES (?, ?)", (session_id, item))
+
+    def outbox_pop(self, session_id):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT item FROM outbox WHERE id = ?", (session_id,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM outbox WHERE id = ?", (session_id,))
+        return row[0] if row else None
+
+    def outbox_pending(self, session_id):
+        return self._conn().execute("SELECT 1 FROM outbox WHERE id = ?", (session_id,)).fetchone() is not None
+
+    def generation(self):
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def _lock_path(self, key):
+        return os.path.join(self.lock_dir, hashlib.sha1(key.encode()).hexdigest() + ".lock")
+
+    def lock(self, key):
+        """
+        Blocks until this process holds the lock for `key`. Returns the release callable.
+        """
+        if fcntl is None:
+            return lambda: None
+        fd = os.open(self._lock_path(key), os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        def release():
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        return release
+
+class RedisBackend:
+    """
+    Multi-host store on any Redis-protocol server (Redis, Valkey, KeyDB...).
+    """
+
+    name = "redis"
+
+    def __init__(self, url, prefix="voice_sentinel:"):
+        import redis  # Optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, *parts):
+        return self.prefix + ":".join(parts)
+
+    def version(self, session_id):
+        value = self.client.hget(self._key("session", session_id), "version")
+        return int(value) if value is not None else None
+
+    def load(self, session_id):
+        version, state = self.client.hmget(self._key("session", session_id), "version", "state")
+        return (int(version), state) if version is not None else None
+
+    def save(self, session_id, blob, summary):
+        key = self._key("session", session_id)
+        change = self.client.incr(self._key("generation"))
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hincrby(key, "version", 1)
+        pipe.hset(key, mapping={"state": blob, "summary": summary, "updated": time.time()})
+        pipe.sadd(self._key("sessions"), session_id)
+        pipe.zadd(self._key("changes"), {session_id: change})
+        return int(pipe.execute()[0])
+
+    def delete(self, session_id):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self._key("session", session_id), self._key("audio", session_id), self._key("outbox", session_id))
+        pipe.srem(self._key("sessions"), session_id)
+        pipe.zrem(self._key("changes"), session_id)
+        if not pipe.execute()[1]:
+            return  # Not a member: already deleted
+        change = self.client.incr(self._key("generation"))
+        self.client.zadd(self._key("deleted"), {session_id: change})
+        excess = self.client.zcard(self._key("deleted")) - SESSION_TOMBSTONES
+        if excess > 0:
+            oldest = self.client.zrange(self._key("deleted"), 0, excess - 1, withscores=True)
+            floor = int(oldest[-1][1])
+            self.client.zremrangebyscore(self._key("deleted"), "-inf", floor)
+            self.client.set(self._key("tombstone_floor"), floor)
+
+    def ids(self):
+        return [i.decode() for i in self.client.smembers(self._key("sessions"))]
+
+    def count(self):
+        return self.client.scard(self._key("sessions"))
+
+    def summaries(self):
+        ids = self.ids()
+        pipe = self.client.pipeline(transaction=False)
+        for session_id in ids:
+            pipe.hmget(self._key("session", session_id), "summary", "version", "updated")
+        rows = [r for r in pipe.execute() if r[0] is not None]
+        rows.sort(key=lambda r: float(r[2] or 0))
+        return [dict(json.loads(summary), version=int(version)) for summary, version, _ in rows]
+
+    def changes(self, since=0, limit=100):
+        version = self.generation()
+        reset = 0 < since < int(self.client.get(self._key("tombstone_floor")) or 0)
+        if reset:
+            since = 0
+        changed = self.client.zrangebyscore(self._key("changes"), f"({since}", "+inf", start=0, num=limit + 1, withscores=True)
+        pipe = self.client.pipeline(transaction=False)
+        for session_id, _ in changed:
+            pipe.hmget(self._key("session", session_id.decode()), "summary", "version")
+        rows = [(int(change), dict(json.loads(summary), version=int(v)))
+                for (_, change), (summary, v) in zip(changed, pipe.execute()) if summary is not None]
+        deleted = [(int(change), sid.decode()) for sid, change in
+                   self.client.zrangebyscore(self._key("deleted"), f"({since}", "+inf", withscores=True)]
+        return _change_page(version, rows, deleted, limit, reset)
+
+    # Audio blocks: sorted set scored by start sample; member = 8-byte start + PCM (unique per block)
+    def audio_append(self, session_id, start, pcm):
+        self.client.zadd(self._key("audio", session_id), {start.to_bytes(8, "big") + pcm: start})
+
+    def audio_rows(self, session_id, since=0):
+        members = self.client.zrangebyscore(self._key("audio", session_id), since, "+inf")
+        return [(int.from_bytes(m[:8], "big"), m[8:]) for m in members]
+
+    def audio_truncate(self, session_id, length):
+        self.client.zremrangebyscore(self._key("audio", session_id), length, "+inf")
+
+    def outbox_put(self, session_id, item):
+        self.client.set(self._key("outbox", session_id), item)
+
+    def outbox_pop(self, session_id):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self._key("outbox", session_id))
+        pipe.delete(self._key("outbox", session_id))
+        item = pipe.execute()[0]
+        return item.decode() if item is not None else None
+
+    def outbox_pending(self, session_id):
+        return bool(self.client.exists(self._key("outbox", session_id)))
+
+    def generation(self):
+        return int(self.client.get(self._key("generation")) or 0)
+
+    def lock(self, key):
+        # thread_local=False: the lease is renewed from a helper thread, not the owner
+        lock = self.client.lock(self._key("lock", key), timeout=SESSION_LOCK_TIMEOUT, thread_local=False)
+        lock.acquire(blocking=True)
+        released = threading.Event()
+
+        def renew():
+            # Keep the lease while held: an analysis pass ({sid}:analysis) can outlast SESSION_LOCK_TIMEOUT
+            while not released.wait(SESSION_LOCK_TIMEOUT / 3):
+                try:
+                    lock.reacquire()
+                except Exception as e:
+                    print(f"[SessionStore] Lock {key} lease renewal failed: {e}")
+                    return
+
+        threading.Thread(target=renew, name=f"lock-renew-{key}", daemon=True).start()
+
+        def release():
+            released.set()
+            try:
+                lock.release()
+            except Exception as e:
+                # Lease lost (renewal failed, e.g. Redis unreachable); the next owner already has it
+                print(f"[SessionStore] Lock {key} release failed: {e}")
+        return release
+
+def create_session_store(url=None):
+    """
+    memory | sqlite:///path/to/sessions.db | redis://host:port/db
+    """
+    url = SESSION_STORE if url is None else url
+    if url in ("", "memory"):
+        return MemorySessionStore()
+    if url.startswith("sqlite://"):
+        return SharedSessionStore(SQLiteBackend(url[len("sqlite://"):]))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return SharedSessionStore(RedisBackend(url))
+    raise ValueError(f"Unknown SESSION_STORE: {url}")
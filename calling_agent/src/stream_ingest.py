@@ -0,0 +1,224 @@
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from src.audio_buffer import PCMBuffer, SAMPLE_RATE
+from src.vad import FRAME_MS, MIN_SPEECH_MS, speech_frames
+
+# Streaming ingest for one answer.
+# The client sends raw PCM frames while the caller is still speaking; they are appended
+# to an in-memory buffer as they arrive, scanned with VAD frame by frame and, once
+# speech has started, handed to a partial-ASR callback every STREAM_PREVIEW_SECONDS.
+# A preview decodes only the window since the last pause (at most
+# STREAM_PREVIEW_WINDOW_SECONDS), so a long answer is not re-transcribed from the start.
+# When the upload ends the whole utterance is already decoded, so the answer goes
+# straight into the normal ingest path with no file or container to parse.
+
+STREAM_FORMATS = {"pcm16": 2, "f32": 4}  # Little-endian mono; bytes per sample
+STREAM_PREVIEW_SECONDS = float(os.environ.get("STREAM_PREVIEW_SECONDS", 1.0))
+STREAM_PREVIEW_WINDOW_SECONDS = float(os.environ.get("STREAM_PREVIEW_WINDOW_SECONDS", 5.0))
+STREAM_PREVIEW_PAUSE_MS = int(os.environ.get("STREAM_PREVIEW_PAUSE_MS", 200))  # Silence that closes a preview window
+STREAM_ENDPOINT_MS = int(os.environ.get("STREAM_ENDPOINT_MS", 700))  # Trailing silence that ends an utterance
+STREAM_MAX_SECONDS = float(os.environ.get("STREAM_MAX_SECONDS", 30))
+STREAM_READ_BYTES = 4096
+STREAM_PREVIEW_WORKERS = int(os.environ.get("STREAM_PREVIEW_WORKERS", 2))
+
+class PreviewPool:
+    """
+    Bounded worker pool for partial transcripts, shared by every stream in the process.
+    A preview is dropped (not queued) when all workers are busy: it is only a live hint
+    and the committed transcript is produced by the analysis pool anyway.
+    """
+
+    def __init__(self, workers=STREAM_PREVIEW_WORKERS):
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stream-preview")
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "dropped": 0, "cancelled": 0}
+
+    def submit(self, fn, *args):
+        """
+        Runs fn(*args) on a free worker. Returns the Future, or None if the pool is saturated.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["dropped"] += 1
+            return None
+        with self._lock:
+            self._stats["submitted"] += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._slots.release())
+        return future
+
+    def cancel(self, future):
+        if future is not None and future.cancel():
+            with self._lock:
+                self._stats["cancelled"] += 1
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["workers"] = self.workers
+        return stats
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def get_preview_pool():
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = PreviewPool()
+    return _default_pool
+
+class StreamingUtterance:
+    """
+    Accumulates one streamed answer (16 kHz mono PCM).
+
+    feed()   - append raw bytes (any split; partial samples are carried over)
+    finish() - float32 samples of the whole utterance
+
+    on_preview(samples, settle) gets the audio since the last closed window; settle=True
+    closes the window (it ends at a pause, or reached STREAM_PREVIEW_WINDOW_SECONDS).
+    """
+
+    def __init__(self, fmt="pcm16", sample_rate=SAMPLE_RATE, on_preview=None,
+                 preview_seconds=STREAM_PREVIEW_SECONDS, endpoint_ms=STREAM_ENDPOINT_MS, preview_pool=None,
+                 window_seconds=STREAM_PREVIEW_WINDOW_SECONDS, pause_ms=STREAM_PREVIEW_PAUSE_MS):
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format: {fmt}")
+        self.fmt = fmt
+        self.sample_rate = sample_rate
+        self.buffer = PCMBuffer(sample_rate, initial_seconds=10)
+        self.on_preview = on_preview
+        self.preview_seconds = preview_seconds
+        self.endpoint_frames = max(1, endpoint_ms // FRAME_MS)
+        self.window_seconds = window_seconds
+        self.pause_frames = max(1, pause_ms // FRAME_MS)
+        self.previews = 0
+        self.previews_dropped = 0
+        self.preview_pool = preview_pool
+
+        self._width = STREAM_FORMATS[fmt]
+        self._carry = b""
+        self._frame = sample_rate * FRAME_MS // 1000
+        self._min_speech_frames = max(1, MIN_SPEECH_MS // FRAME_MS)
+        self._scanned = 0          # Samples already run through VAD
+        self._frames = 0           # VAD frames scanned
+        self._run = 0              # Consecutive speech frames at the end of the scan
+        self._speech_end = None    # Frame index just after the last confirmed speech run
+        self._silent_run = 0       # Consecutive non-speech frames at the end of the scan
+        self._pause = None         # Sample index at the end of the latest pause in speech
+        self._window_start = 0     # Sample index where the open preview window begins
+        self.onset = None          # Seconds from the start of the stream to the first speech
+        self._preview_at = 0.0
+        self._preview_future = None
+
+    @property
+    def seconds(self):
+        return self.buffer.duration
+
+    @property
+    def speech_started(self):
+        return self.onset is not None
+
+    @property
+    def end_of_utterance(self):
+        """
+        True once speech has started and has been followed by STREAM_ENDPOINT_MS of silence.
+        """
+        return self._speech_end is not None and self._run == 0 and self._frames - self._speech_end >= self.endpoint_frames
+
+    def feed(self, data):
+        """
+        Appends raw little-endian PCM bytes. Returns the number of new samples.
+        """
+        data = self._carry + data
+        usable = len(data) - len(data) % self._width
+        self._carry = data[usable:]
+        if usable == 0:
+            return 0
+        if self.fmt == "pcm16":
+            samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0
+        else:
+            samples = np.frombuffer(data[:usable], dtype='<f4')
+        self.buffer.append(samples)
+        self._scan()
+        self._maybe_preview()
+        return len(samples)
+
+    def _scan(self):
+        n = (len(self.buffer) - self._scanned) // self._frame
+        if n == 0:
+            return
+        flags = speech_frames(self.buffer.view(self._scanned, self._scanned + n * self._frame), self.sample_rate)
+        for is_speech in flags:
+            self._frames += 1
+            if is_speech:
+                self._run += 1
+                if self._run >= self._min_speech_frames:
+                    if self.onset is None:
+                        self.onset = (self._frames - self._run) * FRAME_MS / 1000
+                    self._speech_end = self._frames
+                self._silent_run = 0
+            else:
+                self._run = 0
+                self._silent_run += 1
+                if self.onset is not None and self._silent_run >= self.pause_frames:
+                    self._pause = self._frames * self._frame
+        self._scanned += n * self._frame
+
+    def _maybe_preview(self):
+        if self.on_preview is None or not self.speech_started:
+            return
+        if self.end_of_utterance:
+            return  # Trailing silence after the answer: nothing new to transcribe
+        if self.seconds - self._preview_at < self.preview_seconds:
+            return
+        if self._preview_future is not None and not self._preview_future.done():
+            return  # Previous partial still decoding; skip rather than queue up
+        self._preview_at = self.seconds
+        end, settle = len(self.buffer), False
+        if self._pause is not None and self._pause > self._window_start:
+            end, settle = self._pause, True  # Close the window at the latest pause
+        elif end - self._window_start >= self.window_seconds * self.sample_rate:
+            settle = True  # No pause for a while: close it here
+        pool = self.preview_pool or get_preview_pool()
+        future = pool.submit(self._run_preview, self.buffer.view(self._window_start, end).copy(), settle)
+        if future is None:
+            self.previews_dropped += 1
+            return
+        if settle:
+            self._window_start = end
+        self._preview_future = future
+        self.previews += 1
+
+    def _run_preview(self, samples, settle):
+        callback = self.on_preview
+        if callback is None:
+            return  # Utterance already finished
+        try:
+            callback(samples, settle)
+        except Exception as e:
+            print(f"[Stream] Partial transcript failed: {e}")
+
+    def finish(self):
+        """
+        Whole utterance as float32 samples (a trailing partial sample is dropped).
+        A preview that has not started yet is cancelled.
+        """
+        self._carry = b""
+        self.on_preview = None
+        (self.preview_pool or get_preview_pool()).cancel(self._preview_future)
+        return self.buffer.view()
+
+    def summary(self):
+        return {
+            "seconds": round(self.seconds, 3),
+            "onset": round(self.onset, 3) if self.onset is not None else None,
+            "end_of_utterance": self.end_of_utterance,
+            "previews": self.previews,
+            "previews_dropped": self.previews_dropped
+        }
@@ -0,0 +1,126 @@
+import os
+import threading
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+# Voice-activity detection for uploaded chunks.
+# Clients record fixed-length windows, so most chunks start and end with silence.
+# Trimming it here means Whisper, Wav2Vec2 and Resemblyzer only see speech, and
+# chunks with no speech at all are dropped before any model runs.
+
+VAD_ENABLED = os.environ.get("VAD_ENABLED", "1") != "0"
+VAD_AGGRESSIVENESS = int(os.environ.get("VAD_AGGRESSIVENESS", 2))  # 0 (lenient) .. 3 (strict)
+FRAME_MS = 30
+MIN_SPEECH_MS = 90    # Shorter bursts (clicks, pops) don't count as speech
+PADDING_MS = 150      # Kept either side of the speech so word edges aren't clipped
+ENERGY_THRESHOLD_DB = -40.0  # Fallback detector (no webrtcvad): frame RMS vs. full scale
+ENERGY_FLOOR_DB = -50.0      # webrtcvad ignores level, so near-silent hiss can pass as speech without this
+
+_stats_lock = threading.Lock()
+_stats = {"chunks": 0, "dropped_chunks": 0, "input_seconds": 0.0, "skipped_seconds": 0.0}
+
+def frame_levels_db(samples, sample_rate=16000, frame_ms=FRAME_MS):
+    """
+    RMS level of each `frame_ms` frame in dBFS (one vectorized pass, no Python loop).
+    """
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    frame = max(1, sample_rate * frame_ms // 1000)
+    n = len(samples) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float64)
+    frames = samples[:n * frame].reshape(n, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+def energy_frames(samples, sample_rate=16000, frame_ms=FRAME_MS, threshold_db=ENERGY_THRESHOLD_DB):
+    """
+    Vectorized energy detector: True for each frame whose RMS is above `threshold_db` dBFS.
+    """
+    return frame_levels_db(samples, sample_rate, frame_ms) > threshold_db
+
+def speech_frames(samples, sample_rate=16000, frame_ms=FRAME_MS, aggressiveness=VAD_AGGRESSIVENESS):
+    """
+    True for each `frame_ms` frame that contains speech (webrtcvad, or the energy detector as fallback).
+    """
+    if webrtcvad is None or sample_rate not in (8000, 16000, 32000, 48000):
+        return energy_frames(samples, sample_rate, frame_ms)
+
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    frame = sample_rate * frame_ms // 1000
+    n = len(samples) // frame
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    # One int16 conversion for the whole chunk; frames are slices of it
+    pcm = memoryview((np.clip(samples[:n * frame], -1.0, 1.0) * 32767).astype('<i2').tobytes())
+    vad = webrtcvad.Vad(aggressiveness)
+    step = frame * 2
+    voiced = np.fromiter((vad.is_speech(pcm[i * step:(i + 1) * step], sample_rate) for i in range(n)), dtype=bool, count=n)
+    return voiced & energy_frames(samples, sample_rate, frame_ms, ENERGY_FLOOR_DB)
+
+def speech_bounds(flags, min_frames):
+    """
+    (first, last + 1) frame index of runs of at least `min_frames` consecutive speech frames, or None.
+    """
+    flags = np.asarray(flags, dtype=bool)
+    min_frames = max(1, int(min_frames))
+    if len(flags) < min_frames:
+        return None
+    runs = np.convolve(flags.astype(np.int32), np.ones(min_frames, dtype=np.int32), mode='valid') == min_frames
+    starts = np.flatnonzero(runs)
+    if len(starts) == 0:
+        return None
+    return int(starts[0]), int(starts[-1] + min_frames)
+
+def trim_silence(samples, sample_rate=16000, frame_ms=FRAME_MS, min_speech_ms=MIN_SPEECH_MS, padding_ms=PADDING_MS):
+    """
+    Finds the speech region of a chunk.
+
+    Returns None if the chunk has no speech, otherwise a dict with
+      start / end        - sample range to keep (padding included)
+      onset              - seconds from the start of the chunk to the first speech frame
+      speech_seconds     - length of the kept region
+      skipped_seconds    - leading + trailing silence removed
+    """
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    total = len(samples)
+    bounds = speech_bounds(speech_frames(samples, sample_rate, frame_ms), min_speech_ms / frame_ms)
+    if bounds is None:
+        return None
+
+    frame = sample_rate * frame_ms // 1000
+    pad = sample_rate * padding_ms // 1000
+    speech_start, speech_end = bounds[0] * frame, bounds[1] * frame
+    start = max(0, speech_start - pad)
+    end = min(total, speech_end + pad)
+    return {
+        "start": start,
+        "end": end,
+        "onset": speech_start / sample_rate,
+        "speech_seconds": (end - start) / sample_rate,
+        "skipped_seconds": (total - (end - start)) / sample_rate
+    }
+
+def record_vad_result(input_seconds, result):
+    """
+    Process-wide counters for /metrics.
+    """
+    with _stats_lock:
+        _stats["chunks"] += 1
+        _stats["input_seconds"] += input_seconds
+        if result is None:
+            _stats["dropped_chunks"] += 1
+            _stats["skipped_seconds"] += input_seconds
+        else:
+            _stats["skipped_seconds"] += result["skipped_seconds"]
+
+def get_vad_metrics():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["enabled"] = VAD_ENABLED
+    stats["engine"] = "webrtcvad" if webrtcvad is not None else "energy"
+    stats["skipped_ratio"] = stats["skipped_seconds"] / stats["input_seconds"] if stats["input_seconds"] else 0.0
+    return stats
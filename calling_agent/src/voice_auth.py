@@ -1,18 +1,24 @@
 import numpy as np
-from resemblyzer import VoiceEncoder, preprocess_wav
 from pathlib import Path
+from src.model_registry import get_model
+from src import voice_similarity
 
 class VoiceAuthenticator:
-    def __init__(self):
-        print("Loading Voice Encoder Model...")
-        self.encoder = VoiceEncoder()
-        print("Voice Encoder Model Loaded.")
+    # The comparison methods are static: pure numpy, usable without the encoder
+    # (e.g. VoiceAuthenticator.compare_many(query, matrix) in a bulk job).
+
+    def __init__(self, encoder=None):
+        # Reuse the process-wide encoder; constructing VoiceEncoder per call is expensive
+        self.encoder = encoder if encoder is not None else get_model("voice_encoder")
+        if self.encoder is None:
+            raise RuntimeError("Voice Encoder Model unavailable.")
 
     def extract_embedding_from_file(self, audio_path):
         """
         Extracts a 256-d vector embedding from an audio file.
         """
         try:
+            from resemblyzer import preprocess_wav
             wav = preprocess_wav(Path(audio_path))
             embedding = self.encoder.embed_utterance(wav)
             return embedding
@@ -20,7 +26,20 @@ class VoiceAuthenticator:
             # Silence error implicitly or log debug only
             return None
 
-    def compare_embeddings(self, emb1, emb2):
+    def extract_embedding(self, samples, sample_rate=16000):
+        """
+        Extracts a 256-d vector embedding from in-memory PCM samples.
+        """
+        try:
+            from resemblyzer import preprocess_wav
+            wav = preprocess_wav(np.asarray(samples, dtype=np.float32), source_sr=sample_rate)
+            embedding = self.encoder.embed_utterance(wav)
+            return embedding
+        except Exception as e:
+            return None
+
+    @staticmethod
+    def compare_embeddings(emb1, emb2):
         """
         Compares two embeddings using cosine similarity.
         Returns a score between 0.0 (no match) and 1.0 (perfect match).
@@ -46,7 +65,42 @@ class VoiceAuthenticator:
         # Clip to [0, 1] for safety (though cosine implies [-1, 1], voices are generally positive correlation)
         return max(0.0, min(1.0, similarity))
 
-    def is_match(self, score, threshold=0.75):
+    @staticmethod
+    def compare_many(query, matrix, normalized=False):
+        """
+        Compares one embedding against every row of a (n, 256) matrix (ndarray or np.memmap)
+        with a single matmul per block. Returns float32 scores in [0, 1], shape (n,).
+        Pass normalized=True for matrices whose rows are already unit-length.
+        """
+        if query is None or matrix is None or len(matrix) == 0:
+            return np.zeros(0 if matrix is None else len(matrix), dtype=np.float32)
+        scores = voice_similarity.compare_many(query, matrix, normalized=normalized)
+        return np.clip(scores, 0.0, 1.0, out=scores)
+
+    @staticmethod
+    def pairwise(matrix_a, matrix_b, normalized=False):
+        """
+        Cosine similarity of every row of matrix_a against every row of matrix_b, clipped to [0, 1].
+        Read block by block, so np.memmap inputs are never loaded whole.
+        """
+        scores = voice_similarity.pairwise(matrix_a, matrix_b, normalized=normalized)
+        return np.clip(scores, 0.0, 1.0, out=scores)
+
+    @staticmethod
+    def compare_profile(embedding, profile):
+        """
+        Compares an embedding against a multi-enrollment VoiceProfile (centroid + best single enrollment).
+        Returns {"score", "centroid_score", "max_score"}, each clipped to [0, 1].
+        """
+        if embedding is None or profile is None:
+            return {"score": 0.0, "centroid_score": 0.0, "max_score": 0.0}
+        match = profile.match(embedding)
+        if match is None:
+            return {"score": 0.0, "centroid_score": 0.0, "max_score": 0.0}
+        return {key: max(0.0, min(1.0, value)) for key, value in match.items()}
+
+    @staticmethod
+    def is_match(score, threshold=0.75):
         """
         Determines if the score meets the verification threshold.
         Common threshold for Resemblyzer is around 0.75-0.80 for same speaker.
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# In-process structures for voice matching:
+# - EmbeddingCache: LRU + TTL cache of baseline embeddings per phone (invalidated on write)
+# - VoiceIndex: brute-force cosine index over every enrolled voice, for fraud-ring checks
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL. `None` values are cached too
+    (a caller with no baseline doesn't hit the database on every pass either).
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value, or `default` on a miss / expiry
+        (pass a sentinel to tell a miss from a cached None).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl
+        return stats
+
+class VoiceIndex:
+    """
+    Nearest-neighbour index over unit-normalized float32 embeddings.
+
+    Vectors live in one contiguous (capacity, dim) matrix that doubles on growth, so a
+    search is a single matrix-vector product over every enrolled voice.
+    """
+
+    def __init__(self, dim=256, initial_capacity=1024):
+        self.dim = dim
+        self._matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._phones = np.empty(initial_capacity, dtype=object)
+        self._meta = []
+        self._keys = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key, embedding, phone_number=None, **meta):
+        """
+        Adds (or replaces) the embedding stored under `key` (e.g. call_id).
+        Returns False for empty / zero vectors.
+        """
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        if vec.shape[0] != self.dim or norm == 0:
+            return False
+        vec = vec / norm
+
+        with self._lock:
+            row = self._keys.get(key)
+            if row is None:
+                row = self._size
+                if row >= len(self._matrix):
+                    capacity = len(self._matrix) * 2
+                    grown = np.zeros((capacity, self.dim), dtype=np.float32)
+                    grown[:row] = self._matrix[:row]
+                    phones = np.empty(capacity, dtype=object)
+                    phones[:row] = self._phones[:row]
+                    self._matrix, self._phones = grown, phones
+                self._keys[key] = row
+                self._meta.append(None)
+                self._size += 1
+            self._matrix[row] = vec
+            self._phones[row] = phone_number
+            self._meta[row] = dict(meta, key=key, phone_number=phone_number)
+        return True
+
+    def search(self, query, k=5, min_score=None, exclude_phone=None):
+        """
+        Top-k most similar enrolled voices as [{"score", "key", "phone_number", ...}], best first.
+        """
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(q)
+        if q.shape[0] != self.dim or norm == 0:
+            return []
+        q = q / norm
+
+        with self._lock:
+            n = self._size
+            if n == 0:
+                return []
+            scores = self._matrix[:n] @ q
+            if exclude_phone is not None:
+                scores = np.where(self._phones[:n] == exclude_phone, -np.inf, scores)
+            meta = self._meta[:n]
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for i in top:
+            score = float(scores[i])
+            if not np.isfinite(score) or (min_score is not None and score < min_score):
+                continue
+            results.append(dict(meta[i], score=score))
+        return results
@@ -0,0 +1,107 @@
+import numpy as np
+
+# Multi-enrollment voice profile for one phone / user.
+# Keeps the last `capacity` verified embeddings in a fixed (capacity, dim) float32
+# ring buffer plus a running sum, so adding a call and reading the centroid are O(d)
+# and matching never needs the historic records.
+
+DEFAULT_CAPACITY = 8
+CENTROID_WEIGHT = 0.5  # Final score = weight * centroid score + (1 - weight) * best single enrollment
+
+class VoiceProfile:
+
+    def __init__(self, dim=256, capacity=DEFAULT_CAPACITY):
+        self.dim = dim
+        self.capacity = capacity
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._sum = np.zeros(dim, dtype=np.float64)
+        self._size = 0
+        self._next = 0      # Ring buffer write position
+        self.total_added = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, embedding):
+        """
+        Enrolls one verified embedding, replacing the oldest once full. O(d).
+        Returns False for empty / zero / wrong-sized vectors.
+        """
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        if vec.shape[0] != self.dim or norm == 0:
+            return False
+        vec = vec / norm
+
+        if self._size == self.capacity:
+            self._sum -= self._vectors[self._next]
+        else:
+            self._size += 1
+        self._vectors[self._next] = vec
+        self._sum += vec
+        self._next = (self._next + 1) % self.capacity
+        self.total_added += 1
+        return True
+
+    def centroid(self):
+        """
+        Normalized mean of the enrolled embeddings, or None if empty.
+        """
+        if self._size == 0:
+            return None
+        norm = np.linalg.norm(self._sum)
+        if norm == 0:
+            return None
+        return (self._sum / norm).astype(np.float32)
+
+    def embeddings(self):
+        """
+        Enrolled embeddings, oldest first (a copy).
+        """
+        if self._size < self.capacity:
+            return self._vectors[:self._size].copy()
+        return np.roll(self._vectors, -self._next, axis=0)
+
+    def match(self, embedding):
+        """
+        Scores a probe embedding against the profile.
+        Returns {"score", "centroid_score", "max_score"} (cosine similarities), or None if empty.
+        """
+        centroid = self.centroid()
+        if centroid is None:
+            return None
+        probe = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(probe)
+        if probe.shape[0] != self.dim or norm == 0:
+            return None
+        probe = probe / norm
+
+        centroid_score = float(centroid @ probe)
+        max_score = float(np.max(self._vectors[:self._size] @ probe))
+        return {
+            "score": CENTROID_WEIGHT * centroid_score + (1 - CENTROID_WEIGHT) * max_score,
+            "centroid_score": centroid_score,
+            "max_score": max_score
+        }
+
+    def to_document(self):
+        """
+        Compact Mongo representation: one float32 blob, oldest embedding first.
+        """
+        return {
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "embeddings": self.embeddings().astype(np.float32).tobytes(),
+            "total_added": self.total_added
+        }
+
+    @classmethod
+    def from_document(cls, doc, capacity=None):
+        dim = doc.get("dim", 256)
+        profile = cls(dim=dim, capacity=capacity or doc.get("capacity", DEFAULT_CAPACITY))
+        blob = doc.get("embeddings")
+        if blob:
+            for vec in np.frombuffer(blob, dtype=np.float32).reshape(-1, dim):
+                profile.add(vec)
+        profile.total_added = max(profile.total_added, doc.get("total_added", 0))
+        return profile
@@ -0,0 +1,103 @@
+import os
+import numpy as np
+
+# Batched cosine similarity over embedding matrices (numpy only, no encoder needed).
+# Rows are unit-normalized float32, so every comparison is a single matmul. Large
+# matrices (e.g. np.memmap of every stored voice) are scanned in row blocks so only
+# `block_rows` embeddings are in RAM at a time.
+
+DEFAULT_BLOCK_ROWS = 65536
+
+def normalize_rows(matrix):
+    """
+    Returns a float32 copy with each row scaled to unit length (zero rows stay zero).
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _normalize_vector(vec):
+    vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+def compare_many(query, matrix, normalized=False, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Cosine similarity of one query embedding against every row of `matrix`.
+    With normalized=True the rows are trusted to be unit-length (pre-normalized / memmap),
+    otherwise each block is normalized on the fly. Returns float32 scores of shape (n,).
+    """
+    q = _normalize_vector(query)
+    n = len(matrix)
+    scores = np.empty(n, dtype=np.float32)
+    for start in range(0, n, block_rows):
+        block = np.asarray(matrix[start:start + block_rows], dtype=np.float32)
+        if not normalized:
+            block = normalize_rows(block)
+        scores[start:start + len(block)] = block @ q
+    return scores
+
+def pairwise(matrix_a, matrix_b, normalized=False, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Cosine similarity of every row of `matrix_a` against every row of `matrix_b`: shape (n_a, n_b).
+    Both are read in `block_rows` blocks, like compare_many, so memmap inputs stay on disk.
+    """
+    a = matrix_a if np.ndim(matrix_a) == 2 else np.atleast_2d(np.asarray(matrix_a, dtype=np.float32))
+    b = matrix_b if np.ndim(matrix_b) == 2 else np.atleast_2d(np.asarray(matrix_b, dtype=np.float32))
+    scores = np.empty((len(a), len(b)), dtype=np.float32)
+    for col in range(0, len(b), block_rows):
+        b_block = np.asarray(b[col:col + block_rows], dtype=np.float32)
+        if not normalized:
+            b_block = normalize_rows(b_block)
+        for row in range(0, len(a), block_rows):
+            a_block = np.asarray(a[row:row + block_rows], dtype=np.float32)
+            if not normalized:
+                a_block = normalize_rows(a_block)
+            scores[row:row + len(a_block), col:col + len(b_block)] = a_block @ b_block.T
+    return scores
+
+def top_k(query, matrix, k=5, normalized=False, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Indices and scores of the k most similar rows, best first, keeping at most
+    k + block_rows scores in memory while scanning.
+    """
+    q = _normalize_vector(query)
+    best_idx = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, len(matrix), block_rows):
+        block = np.asarray(matrix[start:start + block_rows], dtype=np.float32)
+        if not normalized:
+            block = normalize_rows(block)
+        idx = np.concatenate([best_idx, np.arange(start, start + len(block))])
+        scores = np.concatenate([best_scores, block @ q])
+        if len(scores) > k:
+            keep = np.argpartition(-scores, k - 1)[:k]
+            idx, scores = idx[keep], scores[keep]
+        best_idx, best_scores = idx, scores
+    order = np.argsort(-best_scores)
+    return best_idx[order], best_scores[order]
+
+def write_embedding_matrix(path, embeddings, dim=256):
+    """
+    Writes embeddings as a raw, row-normalized float32 file readable by open_embedding_matrix.
+    `embeddings` may be any iterable of vectors; returns the number of rows written.
+    """
+    count = 0
+    with open(path, "wb") as f:
+        for emb in embeddings:
+            vec = _normalize_vector(emb)
+            if vec.shape[0] != dim:
+                continue
+            f.write(vec.tobytes())
+            count += 1
+    return count
+
+def open_embedding_matrix(path, dim=256):
+    """
+    Memory-maps a file written by write_embedding_matrix as a read-only (n, dim) float32 matrix.
+    """
+    rows = os.path.getsize(path) // (4 * dim)
+    if rows == 0:
+        return np.zeros((0, dim), dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
@@ -0,0 +1,74 @@
+import numpy as np
+
+# Sliding-window scoring for long audio.
+# A clip is cut into fixed-length overlapping windows, windows are scored in
+# batches and the per-window probabilities are averaged. With early exit the
+# scan stops as soon as the running mean is confidently REAL or FAKE, so the
+# cost per clip is bounded regardless of its length.
+
+def window_bounds(n_samples, sample_rate=16000, window_seconds=4.0, hop_seconds=2.0):
+    """
+    Returns (start, end) sample ranges covering [0, n_samples).
+    Every window is full length; the last one is aligned to the end of the clip.
+    Clips shorter than one window give a single window.
+    """
+    window = max(1, int(window_seconds * sample_rate))
+    hop = max(1, int(hop_seconds * sample_rate))
+    if n_samples <= window:
+        return [(0, n_samples)] if n_samples > 0 else []
+
+    bounds = [(start, start + window) for start in range(0, n_samples - window + 1, hop)]
+    if bounds[-1][1] < n_samples:
+        bounds.append((n_samples - window, n_samples))
+    return bounds
+
+def score_windows(samples, score_batch, sample_rate=16000, window_seconds=4.0, hop_seconds=2.0,
+                  batch_size=8, early_exit_threshold=None, min_windows=2):
+    """
+    Scores `samples` window by window. `score_batch(list_of_windows)` returns one probability per window.
+
+    early_exit_threshold: stop once at least `min_windows` are scored and the running
+    mean is >= threshold (confident FAKE) or <= 1 - threshold (confident REAL).
+    Must be in [0.5, 1.0]. With a threshold set, windows are submitted `min_windows`
+    at a time so the check runs every few seconds of audio, not every batch_size windows.
+
+    Returns {"probability", "windows": [{"start", "end", "ai_probability"}], "windows_total", "early_exit"}.
+    """
+    if early_exit_threshold is not None and not 0.5 <= early_exit_threshold <= 1.0:
+        raise ValueError(f"early_exit_threshold must be between 0.5 and 1.0, got {early_exit_threshold}")
+
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    bounds = window_bounds(len(samples), sample_rate, window_seconds, hop_seconds)
+    batch_size = max(1, int(batch_size))
+    if early_exit_threshold is not None:
+        batch_size = min(batch_size, max(1, int(min_windows)))
+
+    windows = []
+    total = 0.0
+    early_exit = False
+    for i in range(0, len(bounds), batch_size):
+        batch = bounds[i:i + batch_size]
+        probs = score_batch([samples[s:e] for s, e in batch])
+        for (s, e), p in zip(batch, probs):
+            windows.append({
+                "start": round(s / sample_rate, 2),
+                "end": round(e / sample_rate, 2),
+                "ai_probability": float(p)
+            })
+            total += float(p)
+
+            # Checked after every scored window
+            if early_exit_threshold is not None and len(windows) >= min_windows and len(windows) < len(bounds):
+                mean = total / len(windows)
+                if mean >= early_exit_threshold or mean <= 1.0 - early_exit_threshold:
+                    early_exit = True
+                    break
+        if early_exit:
+            break
+
+    return {
+        "probability": total / len(windows) if windows else 0.0,
+        "windows": windows,
+        "windows_total": len(bounds),
+        "early_exit": early_exit
+    }
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import glob
+import argparse
+import numpy as np
+
+# Add parent directory to path to find 'src'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.asr_utils import ASR_BACKENDS, transcribe_audio_real, word_error_rate
+from src.audio_utils import load_audio
+from src.model_registry import get_model
+
+# Benchmark: word error rate and real-time factor of each ASR backend, per IVR step.
+#
+# Clip set: <clips dir>/<step_id>__<n>.wav with the reference text in <step_id>__<n>.txt.
+# `--generate` writes a fixed set of IVR-style answers with TTS if the directory is empty.
+#
+#   python tests/bench_asr_backends.py --generate
+#   python tests/bench_asr_backends.py --backends whisper tiny faster_whisper
+
+DEFAULT_CLIPS_DIR = os.path.join(os.path.dirname(__file__), "asr_clips")
+
+REFERENCE_ANSWERS = {
+    "welcome_otp": ["four five two nine one seven", "my OTP is one two three four five six"],
+    "ask_name": ["my name is Rahul Sharma", "this is Priya Mehta speaking"],
+    "ask_dob": ["twelfth of March nineteen ninety", "my date of birth is fifth June nineteen eighty five"],
+    "ask_intent": ["I want to block my debit card because it was stolen", "I need a refund for a transaction I did not make"],
+}
+
+def generate_clips(clips_dir):
+    from src.tts_utils import generate_wav
+    os.makedirs(clips_dir, exist_ok=True)
+    for step_id, answers in REFERENCE_ANSWERS.items():
+        for n, text in enumerate(answers):
+            base = os.path.join(clips_dir, f"{step_id}__{n}")
+            generate_wav(text, base + ".wav")
+            with open(base + ".txt", "w") as f:
+                f.write(text)
+
+def load_clips(clips_dir):
+    clips = []
+    for wav_path in sorted(glob.glob(os.path.join(clips_dir, "*.wav"))):
+        txt_path = wav_path[:-4] + ".txt"
+        if not os.path.exists(txt_path):
+            continue
+        with open(txt_path) as f:
+            reference = f.read().strip()
+        step_id = os.path.basename(wav_path).split("__")[0]
+        samples = load_audio(wav_path, sr=16000)
+        clips.append((step_id, np.asarray(samples, dtype=np.float32), reference))
+    return clips
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", default=DEFAULT_CLIPS_DIR)
+    parser.add_argument("--backends", nargs="+", default=list(ASR_BACKENDS))
+    parser.add_argument("--generate", action="store_true", help="create the clip set with TTS if missing")
+    args = parser.parse_args()
+
+    if args.generate and not glob.glob(os.path.join(args.clips, "*.wav")):
+        generate_clips(args.clips)
+
+    clips = load_clips(args.clips)
+    if not clips:
+        print(f"No clips in {args.clips} (run with --generate)")
+        return
+    steps = sorted({step for step, _, _ in clips})
+
+    print(f"{len(clips)} clips, {sum(len(s) for _, s, _ in clips) / 16000:.1f}s of audio")
+    print(f"{'backend':<16} {'step':<12} {'WER':>6} {'RTF':>6}")
+    for name in args.backends:
+        backend = ASR_BACKENDS[name]
+        # Checked directly: transcribe_audio_real would silently fall back to whisper
+        if get_model(backend.model_name) is None:
+            print(f"{name:<16} unavailable")
+            continue
+        # Warm-up
+        transcribe_audio_real(clips[0][1], backend=backend)
+
+        per_step = {step: {"wer": [], "audio": 0.0, "decode": 0.0} for step in steps}
+        for step_id, samples, reference in clips:
+            start = time.time()
+            hypothesis = transcribe_audio_real(samples, backend=backend) or ""
+            stats = per_step[step_id]
+            stats["decode"] += time.time() - start
+            stats["audio"] += len(samples) / 16000
+            stats["wer"].append(word_error_rate(reference, hypothesis))
+
+        for step in steps:
+            stats = per_step[step]
+            print(f"{name:<16} {step:<12} {np.mean(stats['wer']):6.2f} {stats['decode'] / stats['audio']:6.2f}")
+        total_decode = sum(s["decode"] for s in per_step.values())
+        total_audio = sum(s["audio"] for s in per_step.values())
+        all_wer = [w for s in per_step.values() for w in s["wer"]]
+        print(f"{name:<16} {'ALL':<12} {np.mean(all_wer):6.2f} {total_decode / total_audio:6.2f}")
+
+if __name__ == "__main__":
+    main()
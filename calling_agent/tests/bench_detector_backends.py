@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add parent directory to path to find 'src'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import ai_detector
+from src.model_registry import _current_rss_mb
+from src.detector_backends import BACKENDS, build_backend
+
+# Benchmark: latency, throughput and memory of each detector backend.
+#
+#   python tests/bench_detector_backends.py --backends eager int8 onnx --batch 8 --iters 10
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=4.0, help="clip length (one detector window)")
+    parser.add_argument("--iters", type=int, default=10)
+    args = parser.parse_args()
+
+    rss_start = _current_rss_mb()
+    ai_detector.load_ai_model()
+    if ai_detector._model is None:
+        print("Detector model could not be loaded.")
+        return
+    print(f"Eager model loaded: +{_current_rss_mb() - rss_start:.1f} MB RSS")
+
+    rng = np.random.default_rng(0)
+    clips = [(rng.standard_normal(int(16000 * args.seconds)) * 0.05).astype(np.float32) for _ in range(args.batch)]
+
+    print(f"{'backend':<8} {'build s':>8} {'+RSS MB':>8} {'1-clip ms':>10} {'batch ms':>10} {'clips/s':>8}")
+    for name in args.backends:
+        rss_before = _current_rss_mb()
+        start = time.time()
+        backend = build_backend(name, ai_detector._model)
+        build_seconds = time.time() - start
+        if backend.name != name:
+            print(f"{name:<8} unavailable")
+            continue
+
+        # Warm-up
+        ai_detector.infer_batch(clips[:1], backend=backend)
+
+        single = []
+        for _ in range(args.iters):
+            start = time.time()
+            ai_detector.infer_batch(clips[:1], backend=backend)
+            single.append(time.time() - start)
+
+        batched = []
+        for _ in range(args.iters):
+            start = time.time()
+            ai_detector.infer_batch(clips, backend=backend)
+            batched.append(time.time() - start)
+
+        batch_ms = np.median(batched) * 1000
+        print(f"{name:<8} {build_seconds:8.2f} {_current_rss_mb() - rss_before:8.1f} "
+              f"{np.median(single) * 1000:10.1f} {batch_ms:10.1f} {args.batch / (batch_ms / 1000):8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+
+# Add parent directory to path to find 'src'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import ai_detector
+from src.detector_service import DetectorService
+
+# Benchmark: per-clip Wav2Vec2 inference vs. the micro-batching DetectorService.
+# N caller threads (simulating concurrent calls) each score `--clips` chunks.
+#
+#   python tests/bench_detector_batching.py --callers 8 --clips 4 --batch 8 --wait-ms 10
+
+def make_clips(count, rng, min_seconds=2.0, max_seconds=6.0):
+    return [
+        (rng.standard_normal(int(16000 * rng.uniform(min_seconds, max_seconds))) * 0.05).astype(np.float32)
+        for _ in range(count)
+    ]
+
+def run_callers(score, clips_per_caller):
+    latencies = []
+    lock = threading.Lock()
+
+    def caller(clips):
+        for clip in clips:
+            start = time.time()
+            score(clip)
+            with lock:
+                latencies.append(time.time() - start)
+
+    threads = [threading.Thread(target=caller, args=(clips,)) for clips in clips_per_caller]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.time() - start, latencies
+
+def report(label, elapsed, latencies):
+    lat = np.array(latencies) * 1000
+    print(f"{label:<12} {len(lat) / elapsed:8.2f} clips/s   p50 {np.percentile(lat, 50):8.1f} ms   p95 {np.percentile(lat, 95):8.1f} ms   total {elapsed:6.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=8)
+    parser.add_argument("--clips", type=int, default=4, help="clips per caller")
+    parser.add_argument("--batch", type=int, default=ai_detector.DETECTOR_MAX_BATCH_SIZE)
+    parser.add_argument("--wait-ms", type=float, default=ai_detector.DETECTOR_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    ai_detector.load_ai_model()
+    if ai_detector._model is None:
+        print("Detector model could not be loaded.")
+        return
+
+    rng = np.random.default_rng(0)
+    clips_per_caller = [make_clips(args.clips, rng) for _ in range(args.callers)]
+
+    # Warm-up so neither side pays for lazy allocations
+    ai_detector.infer_batch(clips_per_caller[0][:1])
+
+    print(f"{args.callers} callers x {args.clips} clips, batch <= {args.batch}, wait {args.wait_ms} ms")
+
+    # Baseline: every caller runs its own forward pass (serialised on a lock, like one shared model)
+    model_lock = threading.Lock()
+    def per_clip(clip):
+        with model_lock:
+            return ai_detector.infer_batch([clip])[0]
+    report("per-clip", *run_callers(per_clip, clips_per_caller))
+
+    service = DetectorService(ai_detector.infer_batch, max_batch_size=args.batch, max_wait_ms=args.wait_ms, name="bench")
+    report("batched", *run_callers(service.predict, clips_per_caller))
+    m = service.metrics()
+    print(f"             avg batch {m['avg_batch_size']:.2f}, largest {m['largest_batch']}, queue wait avg {m['queue_wait_seconds_avg'] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
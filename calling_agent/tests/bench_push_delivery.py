@@ -0,0 +1,125 @@
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+
+# Benchmark against a running server:app, with N idle sessions (no agent messages)
+# waiting for the agent in one of three ways:
+#   poll     - GET /client/poll_agent every --poll-interval seconds (old clients)
+#   longpoll - GET /client/wait_for_agent?timeout=25 (fallback)
+#   sse      - one GET /client/events stream with keepalive comments
+#
+# Reported per mode: requests/s reaching the server, how many streams were refused (503,
+# PUSH_MAX_HELD reached) and the latency of a normal request (/health) made meanwhile.
+# The last number is what matters: waiting clients must not starve the worker threads.
+#
+#   SESSION_STORE=sqlite:////tmp/vs.db gunicorn -w 4 --threads 8 -b :5001 server:app
+#   python tests/bench_push_delivery.py --server http://localhost:5001 --sessions 200 --seconds 30
+
+def start_sessions(base, count):
+    u = urlparse(base)
+    ids = []
+    for i in range(count):
+        conn = http.client.HTTPConnection(u.hostname, u.port, timeout=10)
+        conn.request("POST", "/start-call", body=json.dumps({"phone": f"bench{i}"}), headers={"Content-Type": "application/json"})
+        ids.append(json.loads(conn.getresponse().read())["session_id"])
+        conn.close()
+    return ids
+
+def idle_client(mode, base, sid, stop, counts, refused, args):
+    u = urlparse(base)
+    try:
+        while not stop.is_set():
+            if mode == "sse":
+                conn = http.client.HTTPConnection(u.hostname, u.port, timeout=args.seconds + 30)
+                conn.request("GET", f"/client/events/{sid}")
+                resp = conn.getresponse()
+                counts.append(1)
+                if resp.status != 200:
+                    # Refused: what the clients do is fall back to long-poll
+                    refused.append(1)
+                    resp.read()
+                    conn.close()
+                    mode = "longpoll"
+                    continue
+                while not stop.is_set():
+                    if not resp.fp.readline():
+                        break  # Recycled after SSE_MAX_SECONDS: reconnect
+                conn.close()
+            else:
+                conn = http.client.HTTPConnection(u.hostname, u.port, timeout=args.longpoll_timeout + 10)
+                path = f"/client/poll_agent/{sid}" if mode == "poll" else f"/client/wait_for_agent/{sid}?timeout={args.longpoll_timeout}"
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                resp.read()
+                conn.close()
+                counts.append(1)
+                retry_after = resp.getheader("Retry-After")
+                if mode == "poll":
+                    stop.wait(args.poll_interval)
+                elif retry_after:
+                    stop.wait(float(retry_after))
+    except Exception:
+        pass
+
+def probe(base, stop, latencies):
+    """
+    A normal request every 0.5 s while the idle clients wait.
+    """
+    u = urlparse(base)
+    while not stop.is_set():
+        start = time.time()
+        try:
+            conn = http.client.HTTPConnection(u.hostname, u.port, timeout=30)
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            conn.close()
+            latencies.append(time.time() - start)
+        except Exception:
+            latencies.append(float("inf"))
+        stop.wait(0.5)
+
+def run(mode, base, session_ids, args):
+    stop = threading.Event()
+    counts = []
+    refused = []
+    latencies = []
+    threads = [threading.Thread(target=idle_client, args=(mode, base, sid, stop, counts, refused, args), daemon=True)
+               for sid in session_ids]
+    start = time.time()
+    for t in threads:
+        t.start()
+    time.sleep(2)  # Let the idle clients connect before probing
+    prober = threading.Thread(target=probe, args=(base, stop, latencies), daemon=True)
+    prober.start()
+    time.sleep(max(0.0, args.seconds - 2))
+    stop.set()
+    elapsed = time.time() - start
+    # Long-polls / streams in flight are abandoned here; count what was sent so far
+    return len(counts), len(refused), sorted(latencies), elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--server", default="http://localhost:5001", help="Base URL of a running server:app")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--longpoll-timeout", type=float, default=25)
+    parser.add_argument("--modes", default="poll,longpoll,sse")
+    args = parser.parse_args()
+
+    base = args.server.rstrip("/")
+    session_ids = start_sessions(base, args.sessions)
+
+    print(f"{args.sessions} idle sessions on {base}, {args.seconds:.0f}s per mode")
+    for mode in args.modes.split(","):
+        sent, refused, latencies, elapsed = run(mode, base, session_ids, args)
+        p50 = latencies[len(latencies) // 2] if latencies else float("nan")
+        worst = latencies[-1] if latencies else float("nan")
+        print(f"{mode:<9} {sent / elapsed:9.1f} req/s  ({sent / elapsed / args.sessions:.3f} per session)  "
+              f"refused {refused:4d}  /health p50 {p50 * 1000:7.1f} ms  max {worst * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
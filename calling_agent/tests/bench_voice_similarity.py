@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+# Add parent directory to path to find 'src'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import voice_similarity
+
+# Benchmark: per-pair cosine (what compare_embeddings does) vs. one matmul over a
+# pre-normalized matrix, in RAM and memory-mapped from disk.
+#
+#   python tests/bench_voice_similarity.py --voices 200000 --block 65536
+
+def per_pair(query, matrix):
+    scores = []
+    for row in matrix:
+        emb1, emb2 = np.array(query), np.array(row)
+        norm1, norm2 = np.linalg.norm(emb1), np.linalg.norm(emb2)
+        scores.append(np.dot(emb1, emb2) / (norm1 * norm2) if norm1 and norm2 else 0.0)
+    return np.array(scores, dtype=np.float32)
+
+def timed(label, fn, count):
+    start = time.time()
+    result = fn()
+    elapsed = time.time() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  ({count / elapsed:,.0f} voices/s)")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--voices", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--block", type=int, default=voice_similarity.DEFAULT_BLOCK_ROWS)
+    parser.add_argument("--loop-sample", type=int, default=20000, help="Rows scored with the per-pair loop")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((args.voices, args.dim)).astype(np.float32)
+    query = rng.standard_normal(args.dim).astype(np.float32)
+    normalized = voice_similarity.normalize_rows(matrix)
+
+    sample = min(args.loop_sample, args.voices)
+    loop = timed(f"per-pair loop ({sample})", lambda: per_pair(query, matrix[:sample]), sample)
+    batch = timed("compare_many (in RAM)", lambda: voice_similarity.compare_many(query, normalized, normalized=True, block_rows=args.block), args.voices)
+    print(f"max abs diff vs loop: {np.max(np.abs(loop - batch[:sample])):.2e}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "voices.f32")
+        voice_similarity.write_embedding_matrix(path, matrix, dim=args.dim)
+        mapped = voice_similarity.open_embedding_matrix(path, dim=args.dim)
+        timed("compare_many (memmap)", lambda: voice_similarity.compare_many(query, mapped, normalized=True, block_rows=args.block), args.voices)
+        timed("top_k (memmap)", lambda: voice_similarity.top_k(query, mapped, k=10, normalized=True, block_rows=args.block), args.voices)
+        del mapped
+
+if __name__ == "__main__":
+    main()
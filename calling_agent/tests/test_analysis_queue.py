@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.analysis_queue import AnalysisExecutor
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+class TestAnalysisExecutor(unittest.TestCase):
+
+    def test_runs_submitted_jobs(self):
+        seen = []
+        ex = AnalysisExecutor(seen.append, workers=2, max_queue=4)
+        self.assertTrue(ex.submit("a"))
+        self.assertTrue(ex.submit("b"))
+        self.assertTrue(wait_until(lambda: sorted(seen) == ["a", "b"]))
+        self.assertEqual(ex.metrics()["completed"], 2)
+
+    def test_rejects_when_queue_full(self):
+        release = threading.Event()
+        ex = AnalysisExecutor(lambda key: release.wait(), workers=1, max_queue=1)
+        self.assertTrue(ex.submit("running"))
+        self.assertTrue(wait_until(lambda: ex.metrics()["running"] == 1))
+        self.assertTrue(ex.submit("queued"))
+        self.assertFalse(ex.submit("overflow"))
+        self.assertEqual(ex.metrics()["rejected"], 1)
+        self.assertGreaterEqual(ex.retry_after(), 1)
+        release.set()
+
+    def test_coalesces_queued_session(self):
+        release = threading.Event()
+        calls = []
+
+        def handler(key):
+            if key == "blocker":
+                release.wait()
+            calls.append(key)
+
+        ex = AnalysisExecutor(handler, workers=1, max_queue=1)
+        ex.submit("blocker")
+        self.assertTrue(wait_until(lambda: ex.metrics()["running"] == 1))
+        # Queue has one slot; repeated submits for the same session share it
+        self.assertTrue(ex.submit("s1"))
+        self.assertTrue(ex.submit("s1"))
+        self.assertTrue(ex.submit("s1"))
+        release.set()
+        self.assertTrue(wait_until(lambda: calls == ["blocker", "s1"]))
+        self.assertEqual(ex.metrics()["coalesced"], 2)
+
+    def test_submit_while_running_reruns(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def handler(key):
+            calls.append(key)
+            if len(calls) == 1:
+                started.set()
+                release.wait()
+
+        ex = AnalysisExecutor(handler, workers=1, max_queue=1)
+        ex.submit("s1")
+        self.assertTrue(started.wait(1))
+        self.assertTrue(ex.submit("s1"))  # arrives mid-run, must not be lost
+        release.set()
+        self.assertTrue(wait_until(lambda: calls == ["s1", "s1"]))
+        self.assertTrue(wait_until(lambda: ex.metrics()["running"] == 0))
+
+    def test_handler_errors_are_counted(self):
+        def boom(key):
+            raise RuntimeError("model failure")
+
+        ex = AnalysisExecutor(boom, workers=1, max_queue=2)
+        ex.submit("s1")
+        self.assertTrue(wait_until(lambda: ex.metrics()["failed"] == 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+import threading
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.asr_service import ASRStream
+
+class FakeASR:
+    """
+    Returns queued texts and records the prompt each call received.
+    """
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.prompts = []
+
+    def __call__(self, samples, prompt=None, step_id=None):
+        self.prompts.append(prompt)
+        return self.texts.pop(0)
+
+class TestASRStream(unittest.TestCase):
+
+    def test_previous_text_is_prompt(self):
+        asr = FakeASR(["one two three four", "my name is Rahul"])
+        stream = ASRStream(transcribe=asr)
+        stream.feed([0.0], "welcome_otp")
+        stream.feed([0.0], "ask_name")
+        self.assertEqual(asr.prompts, [None, "one two three four"])
+
+    def test_step_transcripts(self):
+        stream = ASRStream(transcribe=FakeASR(["1 2 3 4", "Rahul", "Sharma", None]))
+        stream.feed([0.0], "welcome_otp")
+        stream.feed([0.0], "ask_name")
+        stream.feed([0.0], "ask_name")
+        stream.feed([0.0], "ask_dob")
+        self.assertEqual(stream.step_transcripts(), {"welcome_otp": "1 2 3 4", "ask_name": "Rahul Sharma", "ask_dob": ""})
+        self.assertEqual(stream.full_text(), "1 2 3 4 Rahul Sharma")
+
+    def test_partial_is_replaced_by_committed_chunk(self):
+        stream = ASRStream(transcribe=FakeASR(["1 2 3 4", "my name", "my name is Rahul"]))
+        stream.feed([0.0], "welcome_otp")
+        stream.preview([0.0], "ask_name")
+        self.assertEqual(stream.partial_transcript(), "1 2 3 4 my name")
+        self.assertEqual(stream.step_transcripts(), {"welcome_otp": "1 2 3 4"})
+        stream.feed([0.0], "ask_name")
+        self.assertEqual(stream.partial_transcript(), "1 2 3 4 my name is Rahul")
+
+    def test_settled_preview_windows_are_kept(self):
+        asr = FakeASR(["1 2 3 4", "my name", "is Ra", "is Rahul"])
+        stream = ASRStream(transcribe=asr)
+        stream.feed([0.0], "welcome_otp")
+        self.assertEqual(stream.preview([0.0], "ask_name", settle=True), "my name")
+        self.assertEqual(stream.preview([0.0], "ask_name"), "my name is Ra")
+        self.assertEqual(stream.preview([0.0], "ask_name"), "my name is Rahul")
+        self.assertEqual(stream.partial_transcript(), "1 2 3 4 my name is Rahul")
+        # The settled window is context for the next one
+        self.assertEqual(asr.prompts[2], "1 2 3 4 my name")
+
+    def test_set_partial_from_another_copy(self):
+        stream = ASRStream(transcribe=FakeASR(["1 2 3 4"]))
+        stream.feed([0.0], "welcome_otp")
+        restored = ASRStream.from_state(stream.to_state())
+        restored.set_partial("my name", "ask_name")
+        self.assertEqual(ASRStream.from_state(restored.to_state()).partial_transcript(), "1 2 3 4 my name")
+
+    def test_preview_finishing_after_commit_is_dropped(self):
+        preview_started = threading.Event()
+        committed = threading.Event()
+
+        def transcribe(samples, prompt=None, step_id=None):
+            if samples == "partial":
+                preview_started.set()
+                committed.wait(2)  # Slow partial decode outlives the commit
+                return "my name"
+            return "my name is Rahul"
+
+        stream = ASRStream(transcribe=transcribe)
+        t = threading.Thread(target=stream.preview, args=("partial", "ask_name"))
+        t.start()
+        preview_started.wait(2)
+        stream.feed("final", "ask_name")
+        committed.set()
+        t.join(2)
+        self.assertEqual(stream.partial_transcript(), "my name is Rahul")
+
+    def test_prompt_is_bounded(self):
+        stream = ASRStream(transcribe=FakeASR(["word " * 100]), prompt_chars=30)
+        stream.feed([0.0], "ask_intent")
+        prompt = stream.prompt()
+        self.assertLessEqual(len(prompt), 30)
+        self.assertTrue(prompt.startswith("word"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src import asr_utils, model_registry
+from src.asr_utils import word_error_rate, get_asr_backend, asr_model_names, _parse_step_backends
+
+class TestWordErrorRate(unittest.TestCase):
+
+    def test_identical_ignoring_case_and_punctuation(self):
+        self.assertEqual(word_error_rate("My name is Rahul Sharma.", "my name is rahul sharma"), 0.0)
+
+    def test_substitution_deletion_insertion(self):
+        self.assertAlmostEqual(word_error_rate("one two three four", "one too three four"), 0.25)
+        self.assertAlmostEqual(word_error_rate("one two three four", "one three four"), 0.25)
+        self.assertAlmostEqual(word_error_rate("one two three four", "one two three four five six"), 0.5)
+
+    def test_empty_reference(self):
+        self.assertEqual(word_error_rate("", ""), 0.0)
+        self.assertEqual(word_error_rate("", "noise"), 1.0)
+        self.assertEqual(word_error_rate("hello there", ""), 1.0)
+
+class TestBackendSelection(unittest.TestCase):
+
+    def setUp(self):
+        self._default = asr_utils.ASR_BACKEND
+        self._steps = asr_utils.ASR_STEP_BACKENDS
+
+    def tearDown(self):
+        asr_utils.ASR_BACKEND = self._default
+        asr_utils.ASR_STEP_BACKENDS = self._steps
+
+    def test_parse_step_backends(self):
+        self.assertEqual(
+            _parse_step_backends("welcome_otp=tiny, ask_dob = Faster_Whisper,bad"),
+            {"welcome_otp": "tiny", "ask_dob": "faster_whisper"}
+        )
+        self.assertEqual(_parse_step_backends(None), {})
+
+    def test_per_step_override(self):
+        asr_utils.ASR_BACKEND = "faster_whisper"
+        asr_utils.ASR_STEP_BACKENDS = {"welcome_otp": "tiny"}
+        self.assertEqual(get_asr_backend("welcome_otp").name, "tiny")
+        self.assertEqual(get_asr_backend("ask_name").name, "faster_whisper")
+        self.assertEqual(get_asr_backend().name, "faster_whisper")
+        self.assertEqual(asr_model_names(), ["faster_whisper", "whisper_tiny"])
+
+    def test_unknown_backend_uses_whisper(self):
+        asr_utils.ASR_BACKEND = "nonexistent"
+        asr_utils.ASR_STEP_BACKENDS = {}
+        self.assertEqual(get_asr_backend().name, "whisper")
+
+class TestSharedModel(unittest.TestCase):
+
+    def setUp(self):
+        model_registry._models["whisper"] = object()
+
+    def tearDown(self):
+        model_registry._models.pop("whisper", None)
+
+    def test_decodes_on_one_model_do_not_overlap(self):
+        running = []
+        overlaps = []
+
+        class SlowBackend(asr_utils.WhisperBackend):
+            def transcribe(self, model, audio, prompt=None):
+                running.append(1)
+                overlaps.append(len(running))
+                time.sleep(0.02)
+                running.pop()
+                return "ok"
+
+        backend = SlowBackend()
+        threads = [threading.Thread(target=asr_utils.transcribe_audio_real, args=([0.0] * 160,), kwargs={"backend": backend})
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(overlaps, [1, 1, 1, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import io
+import wave
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.audio_buffer import PCMBuffer
+
+class TestPCMBuffer(unittest.TestCase):
+
+    def test_append_returns_ranges(self):
+        buf = PCMBuffer(initial_seconds=1)
+        self.assertEqual(buf.append(np.zeros(100)), (0, 100))
+        self.assertEqual(buf.append(np.ones(50)), (100, 150))
+        self.assertEqual(len(buf), 150)
+
+    def test_growth_keeps_data_and_old_views(self):
+        buf = PCMBuffer(sample_rate=10, initial_seconds=1)  # capacity 10
+        buf.append(np.arange(8, dtype=np.float32))
+        first = buf.view(0, 8)
+        buf.append(np.arange(8, 20, dtype=np.float32))  # forces growth
+        np.testing.assert_array_equal(buf.view(), np.arange(20, dtype=np.float32))
+        np.testing.assert_array_equal(first, np.arange(8, dtype=np.float32))
+        self.assertAlmostEqual(buf.duration, 2.0)
+
+    def test_views_are_read_only(self):
+        buf = PCMBuffer(initial_seconds=1)
+        buf.append(np.zeros(10))
+        with self.assertRaises(ValueError):
+            buf.view()[0] = 1.0
+
+    def test_truncate_rolls_back(self):
+        buf = PCMBuffer(initial_seconds=1)
+        buf.append(np.zeros(10))
+        start, _ = buf.append(np.ones(10))
+        buf.truncate(start)
+        self.assertEqual(len(buf), 10)
+        self.assertEqual(buf.append(np.ones(5)), (10, 15))
+
+    def test_wav_export(self):
+        buf = PCMBuffer(initial_seconds=1)
+        buf.append(np.full(16000, 0.5, dtype=np.float32))
+        with wave.open(io.BytesIO(buf.to_wav_bytes()), 'rb') as w:
+            self.assertEqual(w.getframerate(), 16000)
+            self.assertEqual(w.getnchannels(), 1)
+            self.assertEqual(w.getnframes(), 16000)
+            pcm = np.frombuffer(w.readframes(10), dtype='<i2')
+        self.assertTrue(np.all(pcm == int(0.5 * 32767)))
+
+    def test_iter_pcm16_blocks(self):
+        buf = PCMBuffer(initial_seconds=1)
+        buf.append(np.zeros(1000))
+        blocks = list(buf.iter_pcm16(block_samples=300))
+        self.assertEqual([len(b) for b in blocks], [600, 600, 600, 200])
+
+if __name__ == '__main__':
+    unittest.main()
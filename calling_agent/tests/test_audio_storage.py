@@ -0,0 +1,157 @@
+import unittest
+import sys
+import os
+import io
+import wave
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+try:
+    import mongomock
+    import mongomock.gridfs
+    mongomock.gridfs.enable_gridfs_integration()
+except ImportError:
+    mongomock = None
+
+try:
+    import soundfile
+except (ImportError, OSError):
+    soundfile = None
+
+from src.audio_buffer import PCMBuffer
+from src import audio_storage
+from src.audio_storage import store_call_audio, load_call_audio, replace_call_audio, find_audio_file, wav_header, ensure_audio_indexes
+
+def make_buffer(seconds=1.0, freq=440.0):
+    buf = PCMBuffer()
+    t = np.arange(int(16000 * seconds)) / 16000
+    buf.append(0.3 * np.sin(2 * np.pi * freq * t))
+    return buf
+
+@unittest.skipIf(mongomock is None, "mongomock not installed")
+class TestAudioStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.db = mongomock.MongoClient()["voice_sentinel_test"]
+        ensure_audio_indexes(self.db)
+
+    def test_wav_header_matches_wave_module(self):
+        buf = make_buffer(0.1)
+        self.assertEqual(buf.to_wav_bytes()[:44], wav_header(len(buf), 16000))
+
+    def test_streamed_wav_upload_roundtrip(self):
+        buf = make_buffer()
+        grid_id, audio_hash, dedup = store_call_audio(self.db, "audio_0001.wav", "call-1", audio_buffer=buf, fmt="wav")
+        self.assertFalse(dedup)
+        self.assertEqual(self.db["fs.files"].count_documents({}), 1)
+        stored = load_call_audio(self.db, {"audio_gridfs_id": grid_id})
+        self.assertEqual(stored, buf.to_wav_bytes())
+
+    def test_identical_audio_is_stored_once(self):
+        first_id, first_hash, _ = store_call_audio(self.db, "audio_0001.wav", "call-1", audio_buffer=make_buffer(), fmt="wav")
+        second_id, second_hash, dedup = store_call_audio(self.db, "audio_0002.wav", "call-2", audio_buffer=make_buffer(), fmt="wav")
+        self.assertTrue(dedup)
+        self.assertEqual(first_id, second_id)
+        self.assertEqual(first_hash, second_hash)
+        self.assertEqual(self.db["fs.files"].count_documents({}), 1)
+        # The duplicate upload's chunks were dropped with it
+        self.assertEqual(self.db["fs.chunks"].count_documents({"files_id": {"$ne": first_id}}), 0)
+
+    def test_indexes_replace_the_non_unique_hash_index(self):
+        db = mongomock.MongoClient()["voice_sentinel_legacy"]
+        db["fs.files"].create_index("metadata.sha256")
+        ensure_audio_indexes(db)
+        indexes = db["fs.files"].index_information()
+        self.assertNotIn("metadata.sha256_1", indexes)
+        self.assertTrue(indexes[audio_storage.AUDIO_HASH_INDEX]["unique"])
+        self.assertIn("metadata.aliases_1", indexes)
+
+    def test_concurrent_duplicate_upload_becomes_an_alias(self):
+        audio = make_buffer().to_wav_bytes()
+        alias_existing = audio_storage._alias_existing
+        calls = []
+        def racing_alias(db, audio_hash, filename):
+            calls.append(filename)
+            if len(calls) == 1:
+                # Another upload of the same audio lands between our check and our claim
+                store_call_audio(db, "audio_0001.wav", "call-1", audio_bytes=audio, fmt="wav")
+                return None
+            return alias_existing(db, audio_hash, filename)
+        audio_storage._alias_existing = racing_alias
+        try:
+            grid_id, _, dedup = store_call_audio(self.db, "audio_0002.wav", "call-2", audio_bytes=audio, fmt="wav")
+        finally:
+            audio_storage._alias_existing = alias_existing
+        self.assertTrue(dedup)
+        self.assertEqual(self.db["fs.files"].count_documents({}), 1)
+        self.assertEqual(find_audio_file(self.db, "audio_0002.wav"), grid_id)
+        self.assertEqual(load_call_audio(self.db, {"audio_gridfs_id": grid_id}), audio)
+
+    def test_buffer_is_streamed_once(self):
+        buf = make_buffer()
+        passes = []
+        iter_pcm16 = buf.iter_pcm16
+        buf.iter_pcm16 = lambda *a, **kw: (passes.append(1), iter_pcm16(*a, **kw))[1]
+        grid_id, audio_hash, _ = store_call_audio(self.db, "audio_0001.wav", "call-1", audio_buffer=buf, fmt="wav")
+        self.assertEqual(len(passes), 1)
+        self.assertEqual(self.db["fs.files"].find_one({"_id": grid_id})["metadata"]["sha256"], audio_hash)
+
+    def test_deduplicated_call_resolves_by_its_own_filename(self):
+        buf = make_buffer()
+        first_id, _, _ = store_call_audio(self.db, "audio_0001.wav", "call-1", audio_buffer=buf, fmt="wav")
+        store_call_audio(self.db, "audio_0002.wav", "call-2", audio_buffer=make_buffer(), fmt="wav")
+        self.assertEqual(find_audio_file(self.db, "audio_0002.wav"), first_id)
+        # Record without audio_gridfs_id (legacy lookup path)
+        self.assertEqual(load_call_audio(self.db, {"audio_file_id": "audio_0002.wav"}), buf.to_wav_bytes())
+
+    def test_replace_keeps_audio_shared_with_other_calls(self):
+        records = self.db["call_verification_records"]
+        shared_id, _, _ = store_call_audio(self.db, "audio_0001.wav", "call-1", audio_buffer=make_buffer(), fmt="wav")
+        store_call_audio(self.db, "audio_0002.wav", "call-2", audio_buffer=make_buffer(), fmt="wav")
+        records.insert_many([
+            {"call_id": "call-1", "audio_file_id": "audio_0001.wav", "audio_gridfs_id": shared_id},
+            {"call_id": "call-2", "audio_file_id": "audio_0002.wav", "audio_gridfs_id": shared_id}
+        ])
+
+        new_audio = make_buffer(freq=880.0).to_wav_bytes()
+        new_id, _ = replace_call_audio(self.db, records, records.find_one({"call_id": "call-2"}), new_audio)
+        self.assertNotEqual(new_id, shared_id)
+        self.assertEqual(load_call_audio(self.db, records.find_one({"call_id": "call-2"})), new_audio)
+        # call-1 still plays its audio; call-2's alias moved to the new file
+        self.assertEqual(load_call_audio(self.db, records.find_one({"call_id": "call-1"})), make_buffer().to_wav_bytes())
+        self.assertEqual(find_audio_file(self.db, "audio_0002.wav"), new_id)
+
+        # Nothing else uses call-1's file any more: replacing it deletes it
+        replace_call_audio(self.db, records, records.find_one({"call_id": "call-1"}), make_buffer(freq=220.0).to_wav_bytes())
+        self.assertIsNone(self.db["fs.files"].find_one({"_id": shared_id}))
+
+    def test_buffer_and_bytes_hash_the_same(self):
+        buf = make_buffer()
+        _, from_buffer, _ = store_call_audio(self.db, "audio_0001.wav", "call-1", audio_buffer=buf, fmt="wav")
+        _, from_bytes, dedup = store_call_audio(self.db, "audio_0002.wav", "call-2", audio_bytes=buf.to_wav_bytes(), fmt="wav")
+        self.assertEqual(from_buffer, from_bytes)
+        self.assertTrue(dedup)
+
+    def test_no_audio(self):
+        self.assertEqual(store_call_audio(self.db, "audio_0001.wav", "call-1", audio_buffer=PCMBuffer()), (None, None, False))
+
+    @unittest.skipIf(soundfile is None, "soundfile not installed")
+    def test_flac_storage_decodes_to_wav(self):
+        buf = make_buffer()
+        grid_id, _, _ = store_call_audio(self.db, "audio_0001.wav", "call-1", audio_buffer=buf, fmt="flac")
+        stored_file = self.db["fs.files"].find_one({"_id": grid_id})
+        self.assertEqual(stored_file["metadata"]["format"], "flac")
+        self.assertLess(stored_file["length"], len(buf.to_wav_bytes()))
+
+        wav_bytes = load_call_audio(self.db, {"audio_gridfs_id": grid_id})
+        with wave.open(io.BytesIO(wav_bytes), 'rb') as w:
+            self.assertEqual(w.getframerate(), 16000)
+            pcm = np.frombuffer(w.readframes(w.getnframes()), dtype='<i2')
+        original = np.frombuffer(b"".join(buf.iter_pcm16()), dtype='<i2')
+        # FLAC is lossless at 16-bit
+        np.testing.assert_array_equal(pcm, original)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import unittest
+import sys
+import os
+import threading
+import time
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.asr_service import ASRStream
+from src.call_session import CallSession, StepMetrics, InvalidTransition
+from src.incremental_analysis import aggregate_ai_probability
+from src.analysis_queue import AnalysisExecutor
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+def make_session():
+    return CallSession("s1", "+15550001", asr=ASRStream(transcribe=lambda samples, prompt=None, step_id=None: ""))
+
+class TestCallSession(unittest.TestCase):
+
+    def test_slots_reject_unknown_fields(self):
+        session = make_session()
+        with self.assertRaises(AttributeError):
+            session.analyzing = True
+        self.assertFalse(hasattr(session, "__dict__"))
+
+    def test_report_lifecycle(self):
+        session = make_session()
+        self.assertEqual(session.state, "ivr")
+        session.begin_report()
+        self.assertEqual((session.state, session.report_status), ("analysing", "pending"))
+        self.assertFalse(session.report_event.is_set())
+        session.finish_report(True)
+        self.assertEqual((session.state, session.report_status), ("completed", "completed"))
+        self.assertTrue(session.report_event.is_set())
+
+        session.enter_handover()
+        session.begin_report()  # Every handover turn re-scores the call
+        session.finish_report(False)
+        self.assertEqual((session.state, session.report_status), ("handover", "failed"))
+
+    def test_cancel_report_restores_previous_state(self):
+        session = make_session()
+        token = session.begin_report()
+        session.cancel_report(token)
+        self.assertEqual((session.state, session.report_status), ("ivr", None))
+
+    def test_invalid_transition(self):
+        session = make_session()
+        with self.assertRaises(InvalidTransition):
+            session.transition("completed")
+        with self.assertRaises(InvalidTransition):
+            session.enter_handover()
+
+    def test_add_and_rollback_chunk(self):
+        session = make_session()
+        session.add_chunk(np.zeros(800, dtype=np.float32), "greeting")
+        self.assertEqual(session.add_chunk(np.zeros(400, dtype=np.float32), "name"), (800, 1200))
+        self.assertEqual(session.rollback_answer(800), 800)
+        self.assertEqual((session.chunks, session.chunk_steps, len(session.audio)), ([(0, 800)], ["greeting"], 800))
+
+    def test_buffer_keeps_untrimmed_answer(self):
+        session = make_session()
+        self.assertEqual(session.add_chunk(np.zeros(1000, dtype=np.float32), "greeting", speech=(200, 700)), (0, 1000))
+        self.assertEqual(session.add_silence(np.zeros(300, dtype=np.float32)), (1000, 1300))
+        self.assertEqual((session.chunks, len(session.audio)), ([(200, 700)], 1300))
+
+        # Rolling back a silent answer leaves the previous chunk alone
+        session.rollback_answer(1000)
+        self.assertEqual((session.chunks, len(session.audio)), ([(200, 700)], 1000))
+        session.rollback_answer(0)
+        self.assertEqual((session.chunks, session.chunk_steps, len(session.audio)), ([], [], 0))
+
+    def test_rollback_after_analysis_consumed_the_chunk(self):
+        # The report queue rejects the last answer after an analysis pass already ran on it
+        session = CallSession("s1", "+15550001", asr=ASRStream(transcribe=lambda samples, prompt=None, step_id=None: "text"))
+        for step, prob in [("greeting", 0.2), ("name", 0.9)]:
+            session.add_chunk(np.zeros(800, dtype=np.float32), step)
+            idx, start, end, step, rollbacks = session.next_chunk()
+            session.asr.feed(session.audio.view(start, end), step)
+            session.record_chunk_result(idx, rollbacks, step=step, duration=0.05, transcript="text", ai_prob=prob)
+
+        session.rollback_answer(800)
+        self.assertEqual((session.analyzed_chunks, len(session.chunks)), (1, 1))
+        self.assertEqual([c["index"] for c in session.analysis["chunks"]], [0])
+        self.assertAlmostEqual(aggregate_ai_probability(session.analysis), 0.2)
+        self.assertEqual(session.asr.step_transcripts(), {"greeting": "text"})
+
+        # The retried answer is analysed as a new chunk 1
+        session.add_chunk(np.zeros(800, dtype=np.float32), "name")
+        self.assertEqual(session.next_chunk()[0], 1)
+
+    def test_submit_rejected_while_pass_in_flight(self):
+        session = make_session()
+        start, _ = session.add_chunk(np.ones(800, dtype=np.float32), "greeting")
+        picked = threading.Event()
+        release = threading.Event()
+        recorded = []
+
+        def analysis_pass(session_id):
+            if session_id != "s1":
+                return
+            idx, _, _, step, rollbacks = session.next_chunk()
+            picked.set()
+            release.wait(2)  # The chunk is being scored...
+            recorded.append(session.record_chunk_result(idx, rollbacks, step=step, duration=0.05, ai_prob=0.9))
+
+        executor = AnalysisExecutor(analysis_pass, workers=1, max_queue=1)
+        self.assertTrue(executor.submit("s1"))
+        self.assertTrue(picked.wait(2))
+        self.assertTrue(executor.submit("s2"))
+        # ...when the next submit is rejected and the answer rolled back, then re-sent
+        self.assertFalse(executor.submit("s3"))
+        session.rollback_answer(start)
+        session.add_chunk(np.zeros(800, dtype=np.float32), "greeting")
+        release.set()
+        self.assertTrue(wait_until(lambda: recorded == [False]))
+        self.assertEqual((session.analyzed_chunks, session.analysis["chunks"]), (0, []))
+        self.assertEqual(session.next_chunk()[0], 0)  # The retry still gets analysed
+
+    def test_risk_snapshot(self):
+        session = make_session()
+        self.assertEqual(session.risk_snapshot(), ("PENDING", None))
+        session.analyzed = True
+        session.voice_prob = 0.3
+        self.assertEqual(session.summary()["risk_level"], "MEDIUM")
+        session.begin_report()
+        session.risk_data = {"final_risk": "HIGH", "risk_percentage": 87.5}
+        session.finish_report(True)
+        self.assertEqual(session.risk_snapshot(), ("HIGH", 87.5))
+
+class TestStepMetrics(unittest.TestCase):
+
+    def test_views_skip_missing_measurements(self):
+        metrics = StepMetrics(capacity=2)
+        metrics.add("greeting", vad_onset=0.25, speech_seconds=1.5, hesitation=0.6, score=0.2, level="LOW", onset=0.3, timing="client")
+        metrics.add("name")  # Silent answer: nothing measured
+        metrics.add("dob", vad_onset=0.1, speech_seconds=2.0, hesitation=3.0, score=0.8, level="HIGH", onset=0.1)
+        self.assertEqual(len(metrics), 3)
+        self.assertEqual([o["step"] for o in metrics.vad_onsets()], ["greeting", "dob"])
+        risks = metrics.latency_risks()
+        self.assertEqual(risks[0], {"step": "greeting", "hesitation": 0.6, "score": 0.2, "level": "LOW", "onset": 0.3, "timing": "client"})
+        self.assertEqual((risks[1]["level"], risks[1]["timing"]), ("HIGH", "server"))
+        self.assertAlmostEqual(metrics.mean_latency_score(), 0.5)
+
+    def test_state_roundtrip(self):
+        metrics = StepMetrics()
+        metrics.add("greeting", hesitation=1.25, score=0.4, level="MEDIUM", onset=0.5)
+        restored = StepMetrics.from_state(metrics.to_state())
+        self.assertEqual(restored.latency_risks(), metrics.latency_risks())
+        restored.add("name")
+        self.assertEqual(len(restored), 2)
+
+if __name__ == '__main__':
+    unittest.main()
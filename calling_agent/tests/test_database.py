@@ -0,0 +1,237 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+try:
+    import mongomock
+    import mongomock.gridfs
+    mongomock.gridfs.enable_gridfs_integration()
+except ImportError:
+    mongomock = None
+
+from src import database
+
+@unittest.skipIf(mongomock is None, "mongomock not installed")
+class TestDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        database.set_client(self.client)
+
+    def tearDown(self):
+        database.set_client(None)
+
+    def test_shared_client(self):
+        self.assertIs(database.get_client(), self.client)
+        self.assertIs(database.get_db_connection().client, self.client)
+
+    def test_new_client_after_fork(self):
+        # Simulate running in a forked child: the parent's client must not be reused
+        database._client_pid = -1
+        client = database.get_client()
+        self.assertIsNot(client, self.client)
+        self.assertEqual(database._client_pid, os.getpid())
+        self.assertIs(database.get_client(), client)
+
+    def test_ping(self):
+        ok, _ = database.ping_db()
+        self.assertTrue(ok)
+
+    def test_ping_result_is_cached(self):
+        self.assertTrue(database.ping_db()[0])
+        # Mongo goes away: probes within the TTL don't touch it
+        class Unreachable:
+            @property
+            def admin(self):
+                raise RuntimeError("server selection timeout")
+        database._client = Unreachable()
+        self.assertTrue(database.ping_db()[0])
+        self.assertFalse(database.ping_db(max_age=0)[0])
+
+    def test_cross_call_memory_roundtrip(self):
+        database.update_cross_call_memory("9999", {"last_verified_name": "Mukesh", "trust_score": 70})
+        database.update_cross_call_memory("9999", {"trust_score": 80})
+        mem = database.get_cross_call_memory("9999")
+        self.assertEqual(mem["last_verified_name"], "Mukesh")
+        self.assertEqual(mem["trust_score_history"], [70, 80])
+
+    def test_linked_accounts(self):
+        self.assertEqual(database.get_linked_accounts("9999"), [])
+        database.add_linked_account("9999", "ACC1")
+        database.add_linked_account("9999", "ACC1")
+        self.assertEqual(database.get_linked_accounts("9999"), ["ACC1"])
+
+    def test_sequence_is_atomic_counter(self):
+        database._sequence_blocks.clear()
+        self.assertEqual(database.next_sequence("test_seq", block_size=1), 1)
+        self.assertEqual(database.next_sequence("test_seq", block_size=1), 2)
+        doc = self.client[database.DB_NAME][database.COUNTERS_COLLECTION_NAME].find_one({"_id": "test_seq"})
+        self.assertEqual(doc["value"], 2)
+
+    def test_sequence_blocks(self):
+        database._sequence_blocks.clear()
+        values = [database.next_sequence("block_seq", block_size=5) for _ in range(7)]
+        self.assertEqual(values, [1, 2, 3, 4, 5, 6, 7])
+        # Two blocks reserved: the counter is already at 10
+        doc = self.client[database.DB_NAME][database.COUNTERS_COLLECTION_NAME].find_one({"_id": "block_seq"})
+        self.assertEqual(doc["value"], 10)
+
+    def test_init_sequence_counter_from_existing_max(self):
+        database._sequence_blocks.clear()
+        records = self.client[database.DB_NAME][database.COLLECTION_NAME]
+        records.insert_many([{"audio_sequence_number": 7}, {"audio_sequence_number": 41}, {"phone_number": "x"}])
+        self.assertEqual(database.init_sequence_counter(), 41)
+        # Idempotent and never moves backwards
+        records.delete_many({})
+        database.init_sequence_counter()
+        self.assertEqual(database.next_sequence(block_size=1), 42)
+
+    def test_voice_profile_migrated_and_cached(self):
+        records = self.client[database.DB_NAME][database.COLLECTION_NAME]
+        emb = np.ones(256, dtype=np.float32)
+        self.assertIsNone(database.get_voice_profile("5555"))
+
+        # Cached (even the miss): a direct insert is not seen...
+        records.insert_one({"phone_number": "5555", "verification_status": "VERIFIED", "voice_embedding": emb.tobytes()})
+        self.assertIsNone(database.get_voice_profile("5555"))
+
+        # ...but a verified save through the app refreshes it (migrating the older record too)
+        other = np.zeros(256, dtype=np.float32)
+        other[0] = 1
+        database.save_verification_record({
+            "call_id": "c1", "phone_number": "5555", "verification_status": "VERIFIED",
+            "voice_embedding_bytes": other.tobytes()
+        })
+        profile = database.get_voice_profile("5555")
+        self.assertEqual(len(profile), 2)
+        self.assertGreater(database.get_voice_metrics()["profile_cache"]["hits"], 0)
+
+        # Persisted: a fresh process reads the profile document, not the records
+        records.delete_many({})
+        database.set_client(self.client)
+        self.assertEqual(len(database.get_voice_profile("5555")), 2)
+        np.testing.assert_allclose(database.get_baseline_audio("5555"), profile.centroid(), rtol=1e-5)
+
+    def test_voice_profile_keeps_recent_calls(self):
+        database.VOICE_PROFILE_SIZE, size = 3, database.VOICE_PROFILE_SIZE
+        try:
+            rng = np.random.default_rng(2)
+            voices = rng.standard_normal((5, 256)).astype(np.float32)
+            for i, v in enumerate(voices):
+                database.save_verification_record({
+                    "call_id": f"c{i}", "phone_number": "7777", "verification_status": "VERIFIED",
+                    "voice_embedding_bytes": v.tobytes()
+                })
+            profile = database.get_voice_profile("7777")
+            self.assertEqual(len(profile), 3)
+            self.assertAlmostEqual(profile.match(voices[-1])["max_score"], 1.0, places=5)
+            self.assertLess(profile.match(voices[0])["max_score"], 0.5)
+        finally:
+            database.VOICE_PROFILE_SIZE = size
+
+    def test_concurrent_enrollments_are_not_lost(self):
+        rng = np.random.default_rng(3)
+        voices = rng.standard_normal((3, 256)).astype(np.float32)
+        records = self.client[database.DB_NAME][database.COLLECTION_NAME]
+        records.insert_one({"phone_number": "8888", "verification_status": "VERIFIED", "voice_embedding": voices[0].tobytes()})
+        self.assertEqual(len(database.get_voice_profile("8888")), 1)  # Migrated into a profile document
+
+        # Another enrollment lands between this call's read and its write
+        original = database.VoiceProfile.from_document
+        def racing_from_document(doc, capacity=None):
+            database.VoiceProfile.from_document = original
+            database.update_voice_profile("8888", voices[1])
+            return original(doc, capacity=capacity)
+        database.VoiceProfile.from_document = racing_from_document
+        try:
+            profile = database.update_voice_profile("8888", voices[2])
+        finally:
+            database.VoiceProfile.from_document = original
+        self.assertEqual(len(profile), 3)
+        database.set_client(self.client)
+        self.assertEqual(len(database.get_voice_profile("8888")), 3)
+
+    def test_verified_embeddings_are_indexed(self):
+        rng = np.random.default_rng(1)
+        voice = rng.standard_normal(256).astype(np.float32)
+        database.save_verification_record({
+            "call_id": "ring-1", "phone_number": "1111", "verification_status": "VERIFIED",
+            "voice_embedding_bytes": voice.tobytes()
+        })
+        database.save_verification_record({
+            "call_id": "failed-1", "phone_number": "2222", "verification_status": "FAILED",
+            "voice_embedding_bytes": voice.tobytes()
+        })
+        # Same voice calling from another number finds the enrolled call; own number is excluded
+        matches = database.find_similar_voices(voice, exclude_phone="3333")
+        self.assertEqual([m["call_id"] for m in matches], ["ring-1"])
+        self.assertEqual(database.find_similar_voices(voice, exclude_phone="1111"), [])
+
+        # Rebuilt from Mongo on first use in a new worker, without init_db()
+        database.set_client(self.client)
+        self.assertFalse(database.get_voice_metrics()["voice_index_loaded"])
+        self.assertEqual(database.find_similar_voices(voice)[0]["phone_number"], "1111")
+        self.assertEqual(database.get_voice_metrics()["voice_index_size"], 1)
+        self.assertEqual(database.load_voice_index(), 1)
+
+    def test_voice_index_skips_unreadable_embeddings(self):
+        records = self.client[database.DB_NAME][database.COLLECTION_NAME]
+        voice = np.random.default_rng(5).standard_normal(256).astype(np.float32)
+        records.insert_many([
+            {"call_id": "legacy", "phone_number": "4444", "verification_status": "VERIFIED", "voice_embedding": voice.tolist()},
+            {"call_id": "broken", "phone_number": "4445", "verification_status": "VERIFIED", "voice_embedding": b"\x00\x01\x02"},
+            {"call_id": "blob", "phone_number": "4446", "verification_status": "VERIFIED", "voice_embedding": (-voice).tobytes()}
+        ])
+        self.assertEqual(database.load_voice_index(), 2)
+        self.assertEqual(database.find_similar_voices(voice)[0]["call_id"], "legacy")
+
+    def test_failed_voice_index_load_backs_off(self):
+        calls = []
+        def failing_load():
+            calls.append(1)
+            raise RuntimeError("server selection timeout")
+        load = database.load_voice_index
+        database.load_voice_index = failing_load
+        try:
+            voice = np.ones(256, dtype=np.float32)
+            self.assertEqual(database.find_similar_voices(voice), [])
+            self.assertEqual(database.find_similar_voices(voice), [])
+            self.assertEqual(len(calls), 1)  # Second call within the retry delay: no rescan
+            database._voice_index_retry_at = 0.0
+            database.find_similar_voices(voice)
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(database._voice_index_failures, 2)
+        finally:
+            database.load_voice_index = load
+
+    def test_export_voice_embeddings(self):
+        from src.voice_similarity import open_embedding_matrix, compare_many
+        rng = np.random.default_rng(3)
+        voices = rng.standard_normal((3, 256)).astype(np.float32)
+        for i, v in enumerate(voices):
+            database.save_verification_record({
+                "call_id": f"e{i}", "phone_number": f"80{i}", "verification_status": "VERIFIED",
+                "voice_embedding_bytes": v.tobytes()
+            })
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "voices.f32")
+            call_ids = database.export_voice_embeddings(path)
+            matrix = open_embedding_matrix(path)
+            self.assertEqual(sorted(call_ids), ["e0", "e1", "e2"])
+            self.assertEqual(matrix.shape, (3, 256))
+            best = int(np.argmax(compare_many(voices[1], matrix, normalized=True)))
+            self.assertEqual(call_ids[best], "e1")
+            del matrix
+
+    def test_pool_metrics_shape(self):
+        metrics = database.get_pool_metrics()
+        for key in ("checkouts", "wait_seconds_avg", "max_pool_size"):
+            self.assertIn(key, metrics)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.detector_backends import build_backend, softmax, EagerBackend
+
+try:
+    import torch
+    import transformers
+except ImportError:
+    torch = None
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+SR = 16000
+
+def fixed_clips():
+    """
+    Deterministic clips: a tone, low noise and a chirp, of different lengths (so padding is exercised).
+    """
+    rng = np.random.default_rng(42)
+    t3 = np.arange(SR * 3) / SR
+    t2 = np.arange(SR * 2) / SR
+    return [
+        (0.3 * np.sin(2 * np.pi * 220 * t3)).astype(np.float32),
+        (rng.standard_normal(SR * 4) * 0.05).astype(np.float32),
+        (0.3 * np.sin(2 * np.pi * (200 + 400 * t2) * t2)).astype(np.float32),
+    ]
+
+class TestBackendHelpers(unittest.TestCase):
+
+    def test_softmax_rows_sum_to_one(self):
+        probs = softmax([[1.0, 2.0], [1000.0, 1000.0]])
+        np.testing.assert_allclose(probs.sum(axis=1), [1.0, 1.0], rtol=1e-6)
+        self.assertAlmostEqual(float(probs[1, 0]), 0.5, places=6)
+
+    def test_unknown_backend_falls_back_to_eager(self):
+        self.assertIsInstance(build_backend("tensorrt", model=object()), EagerBackend)
+
+@unittest.skipIf(torch is None, "torch/transformers not installed")
+class TestBackendParity(unittest.TestCase):
+    """
+    Quantized / exported backends must agree with the eager model on fixed clips.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            from src import ai_detector
+        except ImportError as e:
+            raise unittest.SkipTest(f"detector dependencies missing: {e}")
+        ai_detector.load_ai_model()
+        if ai_detector._model is None:
+            raise unittest.SkipTest("detector model could not be loaded")
+        cls.ai_detector = ai_detector
+        cls.clips = fixed_clips()
+        cls.eager = ai_detector.infer_batch(cls.clips, backend=EagerBackend(ai_detector._model))
+
+    def test_batched_matches_single_clip(self):
+        backend = EagerBackend(self.ai_detector._model)
+        singles = [self.ai_detector.infer_batch([c], backend=backend)[0] for c in self.clips]
+        np.testing.assert_allclose(self.eager, singles, atol=1e-2)
+
+    def test_int8_parity(self):
+        backend = build_backend("int8", self.ai_detector._model)
+        self.assertEqual(backend.name, "int8")
+        probs = self.ai_detector.infer_batch(self.clips, backend=backend)
+        np.testing.assert_allclose(probs, self.eager, atol=0.05)
+
+    @unittest.skipIf(onnxruntime is None, "onnxruntime not installed")
+    def test_onnx_parity(self):
+        from src.detector_backends import OnnxBackend
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = OnnxBackend(self.ai_detector._model, path=os.path.join(tmp, "detector.onnx"))
+            probs = self.ai_detector.infer_batch(self.clips, backend=backend)
+        np.testing.assert_allclose(probs, self.eager, atol=1e-3)
+
+if __name__ == '__main__':
+    unittest.main()
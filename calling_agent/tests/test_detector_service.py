@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+import threading
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.detector_service import DetectorService
+
+class TestDetectorService(unittest.TestCase):
+
+    def test_results_fan_out_in_order(self):
+        service = DetectorService(lambda clips: [c * 2 for c in clips], max_batch_size=4, max_wait_ms=5)
+        futures = [service.submit(i) for i in range(10)]
+        self.assertEqual([f.result(timeout=2) for f in futures], [i * 2 for i in range(10)])
+        self.assertEqual(service.metrics()["clips"], 10)
+
+    def test_concurrent_callers_share_a_batch(self):
+        batch_sizes = []
+        gate = threading.Event()
+
+        def infer(clips):
+            # Hold the first batch so the others pile up behind it
+            gate.wait(2)
+            batch_sizes.append(len(clips))
+            return clips
+
+        service = DetectorService(infer, max_batch_size=8, max_wait_ms=50)
+        first = service.submit(0)
+        rest = [service.submit(i) for i in range(1, 9)]
+        gate.set()
+        self.assertEqual(first.result(timeout=2), 0)
+        self.assertEqual([f.result(timeout=2) for f in rest], list(range(1, 9)))
+        self.assertLessEqual(max(batch_sizes), 8)
+        self.assertLess(len(batch_sizes), 9)
+        self.assertGreater(service.metrics()["avg_batch_size"], 1.0)
+
+    def test_batch_failure_reaches_every_caller(self):
+        def infer(clips):
+            raise ValueError("boom")
+
+        service = DetectorService(infer, max_batch_size=2, max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            service.predict("clip", timeout=2)
+        self.assertEqual(service.metrics()["failed_batches"], 1)
+
+        # The worker keeps serving after a failure
+        service.infer_batch = lambda clips: ["ok"] * len(clips)
+        self.assertEqual(service.predict("clip", timeout=2), "ok")
+
+if __name__ == '__main__':
+    unittest.main()
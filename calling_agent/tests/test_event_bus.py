@@ -0,0 +1,69 @@
+import unittest
+import sys
+import os
+import json
+import threading
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.event_bus import EventBus, HoldSlots, sse_format
+
+class TestEventBus(unittest.TestCase):
+
+    def test_publish_reaches_channel_subscribers_only(self):
+        bus = EventBus()
+        a = bus.subscribe("client:1")
+        b = bus.subscribe("client:2")
+        self.assertEqual(bus.publish("client:1", "agent_audio", {"n": 1}), 1)
+        self.assertEqual(a.get(0.1), ("agent_audio", {"n": 1}))
+        self.assertIsNone(b.get(0.01))
+
+    def test_waiter_is_woken(self):
+        bus = EventBus()
+        sub = bus.subscribe("dashboard")
+        received = []
+        waiter = threading.Thread(target=lambda: received.append(sub.get(2)))
+        waiter.start()
+        bus.publish("dashboard", "session_update", {"session_id": "s1"})
+        waiter.join(2)
+        self.assertEqual(received, [("session_update", {"session_id": "s1"})])
+
+    def test_slow_subscriber_drops_oldest(self):
+        bus = EventBus(max_queue=2)
+        sub = bus.subscribe("c")
+        for i in range(3):
+            bus.publish("c", "e", i)
+        self.assertEqual([sub.get(0)[1], sub.get(0)[1]], [1, 2])
+        self.assertEqual(bus.metrics()["dropped"], 1)
+
+    def test_unsubscribe(self):
+        bus = EventBus()
+        with bus.subscribe("c"):
+            self.assertEqual(bus.metrics()["subscribers"], 1)
+        self.assertEqual(bus.metrics()["subscribers"], 0)
+        self.assertEqual(bus.publish("c", "e"), 0)
+
+    def test_sse_format(self):
+        msg = sse_format("agent_audio", {"audio_url": "/a.wav"}, event_id=3)
+        self.assertTrue(msg.endswith("\n\n"))
+        lines = msg.strip().split("\n")
+        self.assertEqual(lines[:2], ["id: 3", "event: agent_audio"])
+        self.assertEqual(json.loads(lines[2][len("data: "):]), {"audio_url": "/a.wav"})
+
+class TestHoldSlots(unittest.TestCase):
+
+    def test_cap_and_idempotent_release(self):
+        slots = HoldSlots(2)
+        first = slots.acquire()
+        second = slots.acquire()
+        self.assertIsNone(slots.acquire())
+        first()
+        first()  # Stream closed and also released on disconnect: counted once
+        self.assertIsNotNone(slots.acquire())
+        metrics = slots.metrics()
+        self.assertEqual((metrics["held"], metrics["rejected"], metrics["held_max"]), (2, 1, 2))
+        second()
+
+if __name__ == '__main__':
+    unittest.main()
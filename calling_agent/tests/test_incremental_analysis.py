@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.incremental_analysis import (
+    new_analysis_state, add_chunk_result, aggregate_ai_probability,
+    mean_embedding, full_transcript, chunk_summary
+)
+
+class TestIncrementalAnalysis(unittest.TestCase):
+
+    def test_empty_state(self):
+        state = new_analysis_state()
+        self.assertEqual(aggregate_ai_probability(state), 0.0)
+        self.assertIsNone(mean_embedding(state))
+        self.assertEqual(full_transcript(state), "")
+
+    def test_duration_weighted_ai_probability(self):
+        state = new_analysis_state()
+        add_chunk_result(state, 0, "welcome_otp", duration=1.0, ai_prob=0.9)
+        add_chunk_result(state, 1, "ask_name", duration=3.0, ai_prob=0.1)
+        # (0.9*1 + 0.1*3) / 4 = 0.3
+        self.assertAlmostEqual(aggregate_ai_probability(state), 0.3)
+        self.assertAlmostEqual(state["total_duration"], 4.0)
+
+    def test_unscored_chunks_do_not_dilute_probability(self):
+        state = new_analysis_state()
+        add_chunk_result(state, 0, "welcome_otp", duration=2.0, ai_prob=0.8)
+        add_chunk_result(state, 1, "ask_name", duration=5.0, ai_prob=None)
+        self.assertAlmostEqual(aggregate_ai_probability(state), 0.8)
+
+    def test_running_mean_embedding_is_normalized(self):
+        state = new_analysis_state()
+        add_chunk_result(state, 0, "welcome_otp", duration=1.0, embedding=np.array([2.0, 0.0]))
+        add_chunk_result(state, 1, "ask_name", duration=1.0, embedding=np.array([0.0, 5.0]))
+        emb = mean_embedding(state)
+        self.assertEqual(emb.dtype, np.float32)
+        self.assertAlmostEqual(float(np.linalg.norm(emb)), 1.0, places=5)
+        np.testing.assert_allclose(emb, [np.sqrt(0.5), np.sqrt(0.5)], rtol=1e-5)
+
+    def test_transcript_and_summary(self):
+        state = new_analysis_state()
+        add_chunk_result(state, 0, "welcome_otp", duration=1.0, transcript="The OTP is 5646.")
+        add_chunk_result(state, 1, "ask_name", duration=1.0, transcript=None)
+        add_chunk_result(state, 2, "ask_dob", duration=1.0, transcript="15 July 2005")
+        self.assertEqual(full_transcript(state), "The OTP is 5646. 15 July 2005")
+        summary = chunk_summary(state)
+        self.assertEqual([c["step"] for c in summary], ["welcome_otp", "ask_name", "ask_dob"])
+        self.assertNotIn("embedding", summary[0])
+
+if __name__ == '__main__':
+    unittest.main()
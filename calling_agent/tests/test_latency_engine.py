@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.latency_engine import detect_speech_onset, speech_start_time, calculate_hesitation_risk
+
+SR = 16000
+
+def tone(seconds, amp=0.3):
+    t = np.arange(int(SR * seconds)) / SR
+    return (amp * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+def noise(seconds, amp=0.002, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(SR * seconds)) * amp).astype(np.float32)
+
+class TestSpeechOnset(unittest.TestCase):
+
+    def test_onset_after_silence(self):
+        chunk = np.concatenate([np.zeros(int(SR * 1.37), dtype=np.float32), tone(1.0), np.zeros(SR, dtype=np.float32)])
+        self.assertAlmostEqual(detect_speech_onset(chunk, SR), 1.37, delta=0.02)
+
+    def test_onset_above_background_noise(self):
+        chunk = noise(3.0)
+        chunk[int(SR * 2.0):int(SR * 2.5)] += tone(0.5)
+        self.assertAlmostEqual(detect_speech_onset(chunk, SR), 2.0, delta=0.02)
+
+    def test_speech_from_the_start(self):
+        self.assertEqual(detect_speech_onset(tone(2.0), SR), 0.0)
+
+    def test_no_speech(self):
+        self.assertIsNone(detect_speech_onset(noise(3.0), SR))
+        self.assertIsNone(detect_speech_onset(np.zeros(0, dtype=np.float32), SR))
+
+class TestHesitation(unittest.TestCase):
+
+    def test_client_timing_ignores_upload_delay(self):
+        # Prompt ended at t=100, recording started at t=100.5, speech 1.2 s into the recording
+        start = speech_start_time(1.2, record_start=100.5, arrival_time=200.0, recorded_seconds=5.0)
+        level, score, hesitation = calculate_hesitation_risk(100.0, start)
+        self.assertAlmostEqual(hesitation, 1.7)
+        self.assertEqual(level, "LOW")
+
+    def test_server_estimate(self):
+        # 5 s recording arrived at t=110 -> started at 105, speech 0.5 s in
+        self.assertAlmostEqual(speech_start_time(0.5, arrival_time=110.0, recorded_seconds=5.0), 105.5)
+        self.assertIsNone(speech_start_time(None, record_start=100.0))
+
+    def test_long_hesitation_is_high_risk(self):
+        level, score, _ = calculate_hesitation_risk(100.0, 106.0)
+        self.assertEqual(level, "HIGH")
+        self.assertGreater(score, 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import threading
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src import model_registry
+
+class FakeModel:
+    def transcribe(self, audio):
+        return {"text": ""}
+
+    def embed_utterance(self, audio):
+        return audio[:256]
+
+def broken_loader():
+    raise RuntimeError("weights not found")
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.loaders = dict(model_registry.MODEL_LOADERS)
+        self.reset()
+
+    def tearDown(self):
+        model_registry.MODEL_LOADERS.clear()
+        model_registry.MODEL_LOADERS.update(self.loaders)
+        self.reset()
+
+    def reset(self):
+        model_registry._models.clear()
+        model_registry._metrics.clear()
+        model_registry._failed.clear()
+        model_registry._ready = threading.Event()
+        model_registry._finished = threading.Event()
+
+    def test_ready_when_every_model_loads(self):
+        model_registry.MODEL_LOADERS.update(
+            whisper=FakeModel, voice_encoder=FakeModel, deepfake_detector=lambda: (None, None))
+        warm, backend = model_registry._warm_up_model, model_registry._warm_up_detector_backend
+        model_registry._warm_up_model = lambda name, model, audio: None
+        model_registry._warm_up_detector_backend = lambda audio: None
+        try:
+            self.assertEqual(model_registry.status(), "warming_up")
+            model_registry.warm_up()
+        finally:
+            model_registry._warm_up_model, model_registry._warm_up_detector_backend = warm, backend
+        self.assertTrue(model_registry.is_ready())
+        self.assertEqual((model_registry.status(), model_registry.failures()), ("ok", {}))
+
+    def test_not_ready_when_a_model_fails(self):
+        model_registry.MODEL_LOADERS.update(
+            whisper=FakeModel, voice_encoder=FakeModel, deepfake_detector=broken_loader)
+        model_registry.warm_up()
+        self.assertFalse(model_registry.is_ready())
+        self.assertEqual(model_registry.status(), "failed")
+        self.assertEqual(model_registry.failures(), {"deepfake_detector": "weights not found"})
+
+    def test_not_ready_when_detector_backend_fails(self):
+        model_registry.MODEL_LOADERS.update(
+            whisper=FakeModel, voice_encoder=FakeModel, deepfake_detector=lambda: (None, None))
+        warm = model_registry._warm_up_model
+        model_registry._warm_up_model = lambda name, model, audio: None
+        try:
+            model_registry.warm_up()  # Here the backend can't even be built (no torch / librosa)
+        finally:
+            model_registry._warm_up_model = warm
+        self.assertEqual(model_registry.status(), "failed")
+        self.assertEqual(list(model_registry.failures()), ["detector_backend"])
+        self.assertFalse(model_registry.get_metrics()["detector_backend"]["loaded"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import types
+import wave
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.prompt_assets import build_prompts, ensure_prompts, load_manifest, prompt_files, stale_steps, synthesize_offline
+
+STEPS = [
+    {"id": "welcome", "question_text": "Welcome."},
+    {"id": "ask_name", "question_text": "Please say your full name."}
+]
+
+class FakeTTS:
+    """
+    Writes one second of 16 kHz silence per word, and counts calls.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text, output_path):
+        self.calls.append(text)
+        with wave.open(output_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(b"\x00\x00" * 16000 * len(text.split()))
+        return True
+
+class TestPromptAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        if os.path.exists(self.tmp + ".lock"):
+            os.remove(self.tmp + ".lock")
+
+    def test_build_writes_hashed_files_and_manifest(self):
+        manifest = build_prompts(STEPS, self.tmp, synthesize_func=FakeTTS(), opus=False)
+        entry = manifest["prompts"]["ask_name"]
+        self.assertRegex(entry["wav"], r"^ask_name\.[0-9a-f]{12}\.wav$")
+        self.assertAlmostEqual(entry["duration"], 5.0)
+        self.assertEqual(load_manifest(self.tmp), manifest)
+        self.assertEqual(sorted(os.listdir(self.tmp)), sorted(["manifest.json"] + list(prompt_files(manifest))))
+
+    def test_rebuild_only_changed_prompts(self):
+        tts = FakeTTS()
+        first = build_prompts(STEPS, self.tmp, synthesize_func=tts, opus=False)
+        old_name = first["prompts"]["ask_name"]["wav"]
+        self.assertEqual(ensure_prompts(STEPS, self.tmp, synthesize_func=tts, opus=False), first)
+        self.assertEqual(len(tts.calls), 2)
+
+        changed = [STEPS[0], {"id": "ask_name", "question_text": "Say your name."}]
+        self.assertEqual(stale_steps(first, changed, self.tmp, opus=False), ["ask_name"])
+        second = ensure_prompts(changed, self.tmp, synthesize_func=tts, opus=False)
+        self.assertEqual(tts.calls[2:], ["Say your name."])
+        self.assertNotEqual(second["prompts"]["ask_name"]["wav"], old_name)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, old_name)))  # Superseded build removed
+
+    def test_failed_synthesis_is_left_out(self):
+        manifest = build_prompts(STEPS, self.tmp, synthesize_func=lambda text, path: False, opus=False)
+        self.assertEqual(manifest["prompts"], {})
+        self.assertEqual(stale_steps(manifest, STEPS, self.tmp, opus=False), ["welcome", "ask_name"])
+
+    def test_concurrent_cold_starts_build_once(self):
+        tts = FakeTTS()
+        manifests = []
+        workers = [threading.Thread(target=lambda: manifests.append(ensure_prompts(STEPS, self.tmp, synthesize_func=tts, opus=False)))
+                   for _ in range(4)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        self.assertEqual(len(tts.calls), len(STEPS))
+        self.assertTrue(all(m == manifests[0] for m in manifests))
+        self.assertEqual(stale_steps(load_manifest(self.tmp), STEPS, self.tmp, opus=False), [])
+
+    def test_offline_tts_writing_aiff_falls_back(self):
+        class AiffEngine:
+            def save_to_file(self, text, path):
+                with open(path, "wb") as f:
+                    f.write(b"FORM\x00\x00\x00\x04AIFF")
+            def runAndWait(self):
+                pass
+            def stop(self):
+                pass
+        path = os.path.join(self.tmp, "prompt.wav")
+        sys.modules["pyttsx3"], saved = types.SimpleNamespace(init=AiffEngine), sys.modules.get("pyttsx3")
+        try:
+            self.assertFalse(synthesize_offline("Welcome.", path))
+        finally:
+            if saved is None:
+                del sys.modules["pyttsx3"]
+            else:
+                sys.modules["pyttsx3"] = saved
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.asr_service import ASRStream
+from src.call_session import CallSession
+from src import session_store
+from src.session_store import MemorySessionStore, SharedSessionStore, SQLiteBackend
+from src.session_reaper import SessionReaper, eviction_candidates, remove_stale_files, session_bytes
+
+def make_session(session_id, seconds=0.0):
+    session = CallSession(session_id, "+15550001", asr=ASRStream(transcribe=lambda samples, prompt=None, step_id=None: ""))
+    if seconds:
+        session.add_chunk(np.zeros(int(16000 * seconds), dtype=np.float32), "greeting")
+    return session
+
+def summary(session_id, age, status=None, now=1000.0):
+    return {"id": session_id, "last_active": now - age, "report_status": status}
+
+class TestEvictionPolicy(unittest.TestCase):
+
+    def test_idle_and_completed_ttl(self):
+        evict = eviction_candidates([
+            summary("active", 5),
+            summary("idle", 120),
+            summary("done", 40, "completed"),
+            summary("done_recent", 5, "completed"),
+            summary("stuck_report", 120, "pending")
+        ], now=1000.0, idle_ttl=100, completed_ttl=30, max_sessions=10)
+        self.assertEqual(sorted(evict), [("done", "completed"), ("idle", "idle"), ("stuck_report", "idle")])
+
+    def test_lru_over_limit_skips_pending_reports(self):
+        evict = eviction_candidates([
+            summary("oldest", 50, "pending"),
+            summary("old", 40),
+            summary("newer", 20),
+            summary("newest", 10)
+        ], now=1000.0, idle_ttl=100, completed_ttl=100, max_sessions=2)
+        self.assertEqual(evict, [("old", "lru"), ("newer", "lru")])
+
+class TestSessionReaper(unittest.TestCase):
+
+    def test_run_once_evicts_and_notifies(self):
+        store = MemorySessionStore()
+        with mock.patch("time.time", return_value=time.time() - 3600):
+            store.create(make_session("a"))  # Last saved an hour ago
+        store.create(make_session("b"))
+        evicted = []
+        reaper = SessionReaper(store, idle_ttl=60, on_evict=lambda sid, why: evicted.append((sid, why)))
+        self.assertEqual(reaper.run_once(), [("a", "idle")])
+        self.assertEqual(evicted, [("a", "idle")])
+        self.assertEqual(store.ids(), ["b"])
+        self.assertEqual(reaper.metrics()["evicted_idle"], 1)
+
+    def test_check_limit_on_create(self):
+        store = MemorySessionStore()
+        reaper = SessionReaper(store, max_sessions=2)
+        for i in range(3):
+            with mock.patch("time.time", return_value=time.time() - 10 + i):
+                store.create(make_session(f"s{i}"))
+            reaper.check_limit()
+        self.assertEqual(sorted(store.ids()), ["s1", "s2"])
+
+    def test_counts_from_concurrent_passes_add_up(self):
+        reaper = SessionReaper(MemorySessionStore())
+        passes = [threading.Thread(target=lambda: [reaper.run_once(clean_files=False) for _ in range(200)]) for _ in range(8)]
+        for t in passes:
+            t.start()
+        for t in passes:
+            t.join()
+        self.assertEqual(reaper.metrics()["runs"], 1600)
+
+    def test_gauges_track_held_bytes(self):
+        store = MemorySessionStore()
+        store.create(make_session("a", seconds=2.0))
+        gauges = SessionReaper(store).gauges()
+        self.assertEqual(gauges["live_sessions"], 1)
+        self.assertGreaterEqual(gauges["held_bytes"], 2 * 16000 * 4)
+        self.assertGreaterEqual(session_bytes(store.get("a")), store.get("a").audio.nbytes)
+
+    @unittest.skipIf(session_store.msgpack is None, "msgpack not installed")
+    def test_shared_store_prunes_sessions_deleted_elsewhere(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "sessions.db")
+            a = SharedSessionStore(SQLiteBackend(path))
+            b = SharedSessionStore(SQLiteBackend(path))
+            a.create(make_session("s1"))
+            b.get("s1")
+            self.assertEqual(SessionReaper(b).gauges()["held_sessions"], 1)
+            a.delete("s1")
+            reaper = SessionReaper(b)
+            reaper.run_once()
+            self.assertEqual(reaper.gauges(), {"live_sessions": 0, "held_sessions": 0, "held_bytes": 0})
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+class TestStaleFiles(unittest.TestCase):
+
+    def test_only_old_matching_files_removed(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            now = time.time()
+            for name, age in [("temp_old.webm", 7200), ("temp_new.webm", 10), ("agent_keep.wav", 7200)]:
+                path = os.path.join(tmp, name)
+                open(path, "wb").close()
+                os.utime(path, (now - age, now - age))
+            self.assertEqual(remove_stale_files(tmp, ["temp_*"], 3600, now), 1)
+            self.assertEqual(sorted(os.listdir(tmp)), ["agent_keep.wav", "temp_new.webm"])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_undelivered_files_are_kept(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            now = time.time()
+            for name in ["agent_s1_a.wav", "agent_s2_b.wav"]:
+                path = os.path.join(tmp, name)
+                open(path, "wb").close()
+                os.utime(path, (now - 7200, now - 7200))
+            pending = lambda path: os.path.basename(path).startswith("agent_s1_")
+            reaper = SessionReaper(MemorySessionStore(), file_rules=[(tmp, ["agent_*.wav"], 3600, pending)])
+            reaper.run_once(now)
+            self.assertEqual(os.listdir(tmp), ["agent_s1_a.wav"])
+            self.assertEqual(reaper.metrics()["files_removed"], 1)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,262 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.asr_service import ASRStream
+from src.call_session import CallSession
+from src.incremental_analysis import add_chunk_result
+from src import session_store
+from src.session_store import MemorySessionStore, SharedSessionStore, SQLiteBackend, RedisBackend, create_session_store
+
+def make_session(session_id="s1"):
+    asr = ASRStream(transcribe=lambda samples, prompt=None, step_id=None: "hello")
+    return CallSession(session_id, "+15550001", account_id="ACC1", asr=asr)
+
+def add_chunk(store, session, seconds=0.5, step="greeting"):
+    start, end = session.add_chunk(np.linspace(-0.5, 0.5, int(16000 * seconds), dtype=np.float32), step)
+    store.append_audio(session, start, end)
+
+def check_incremental_changes(test, writer, reader):
+    a = writer.create(make_session("a"))
+    writer.create(make_session("b"))
+    page = reader.changes(since=0)
+    test.assertEqual([s["id"] for s in page["sessions"]], ["a", "b"])
+    test.assertIsNone(page["next_cursor"])
+    version = page["version"]
+
+    # Nothing changed: nothing sent
+    test.assertEqual(reader.changes(since=version)["sessions"], [])
+
+    a.voice_prob = 0.9
+    a.analyzed = True
+    writer.save(a)
+    writer.delete("b")
+    page = reader.changes(since=version)
+    test.assertEqual([(s["id"], s["risk_level"]) for s in page["sessions"]], [("a", "HIGH")])
+    test.assertEqual(page["deleted"], ["b"])
+    test.assertGreater(page["version"], version)
+
+    # Pagination: the cursor continues where the previous page stopped
+    for sid in ("c", "d", "e"):
+        writer.create(make_session(sid))
+    first = reader.changes(since=page["version"], limit=2)
+    test.assertEqual([s["id"] for s in first["sessions"]], ["c", "d"])
+    second = reader.changes(since=first["next_cursor"], limit=2)
+    test.assertEqual([s["id"] for s in second["sessions"]], ["e"])
+    test.assertIsNone(second["next_cursor"])
+
+class TestMemorySessionStore(unittest.TestCase):
+
+    def test_create_save_delete(self):
+        store = create_session_store("memory")
+        session = store.create(make_session())
+        self.assertIs(store.get("s1"), session)
+        self.assertEqual(session.version, 1)
+        generation = store.generation()
+        store.save(session)
+        self.assertEqual(session.version, 2)
+        self.assertNotEqual(store.generation(), generation)
+        self.assertEqual([s["id"] for s in store.summaries()], ["s1"])
+        self.assertEqual(store.count(), 1)
+        store.delete("s1")
+        self.assertFalse(store.exists("s1"))
+        self.assertEqual(store.count(), 0)
+
+    def test_summary_stored_on_save(self):
+        store = create_session_store("memory")
+        session = store.create(make_session())
+        session.voice_prob = 0.75
+        self.assertEqual(store.summaries()[0]["voice_prob"], 0.0)  # Listings don't rebuild summaries
+        store.save(session)
+        self.assertEqual(store.summaries()[0]["voice_prob"], 0.75)
+        self.assertEqual(store.changes()["sessions"][0]["voice_prob"], 0.75)
+
+    def test_incremental_changes(self):
+        store = MemorySessionStore()
+        check_incremental_changes(self, store, store)
+
+    def test_forgotten_tombstones_force_reset(self):
+        store = MemorySessionStore()
+        store.create(make_session("a"))
+        version = store.generation()
+        old_limit = session_store.SESSION_TOMBSTONES
+        session_store.SESSION_TOMBSTONES = 1
+        try:
+            for sid in ("b", "c"):
+                store.create(make_session(sid))
+                store.delete(sid)
+            page = store.changes(since=version)
+        finally:
+            session_store.SESSION_TOMBSTONES = old_limit
+        self.assertTrue(page["reset"])
+        self.assertEqual([s["id"] for s in page["sessions"]], ["a"])
+
+    def test_outbox(self):
+        store = MemorySessionStore()
+        store.outbox_put("s1", "/audio/x.mp3")
+        self.assertTrue(store.outbox_pending("s1"))
+        self.assertEqual(store.outbox_pop("s1"), "/audio/x.mp3")
+        self.assertIsNone(store.outbox_pop("s1"))
+        self.assertFalse(store.outbox_pending("s1"))
+
+    def test_lock_is_reentrant(self):
+        store = MemorySessionStore()
+        with store.lock("s1"):
+            with store.lock("s1"):
+                pass
+
+@unittest.skipIf(session_store.msgpack is None, "msgpack not installed")
+class TestSQLiteSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "sessions.db")
+        # Two stores on one file stand in for two worker processes
+        self.a = SharedSessionStore(SQLiteBackend(self.path))
+        self.b = create_session_store(f"sqlite://{self.path}")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_roundtrip_between_workers(self):
+        session = self.a.create(make_session())
+        add_chunk(self.a, session)
+        session.asr.feed(session.audio.view(), "greeting")
+        add_chunk_result(session.analysis, 0, "greeting", 0.5, transcript="hello", ai_prob=0.2,
+                         embedding=np.ones(256, dtype=np.float32))
+        session.extracted_details["name"] = "Ada"
+        session.step_metrics.add("greeting", vad_onset=0.2, speech_seconds=0.5, hesitation=0.8, score=0.1, level="LOW", onset=0.2)
+        session.begin_report()
+        session.finish_report(True)
+        self.a.save(session)
+
+        other = self.b.get("s1")
+        self.assertIsNot(other, session)
+        self.assertEqual(other.version, session.version)
+        self.assertEqual(len(other.audio), len(session.audio))
+        np.testing.assert_allclose(other.audio.view(), session.audio.view(), atol=2 / 32768)
+        self.assertEqual(other.chunks, [(0, 8000)])
+        self.assertEqual(other.asr.step_transcripts(), {"greeting": "hello"})
+        self.assertEqual(other.extracted_details["name"], "Ada")
+        self.assertEqual(other.latency_risks, session.latency_risks)
+        self.assertEqual(other.state, "completed")
+        chunk = other.analysis["chunks"][0]
+        self.assertEqual(chunk["embedding"].dtype, np.float32)
+        np.testing.assert_allclose(other.analysis["embedding_sum"], session.analysis["embedding_sum"])
+        self.assertTrue(other.report_event.is_set())
+
+    def test_cached_until_version_changes(self):
+        session = self.a.create(make_session())
+        first = self.b.get("s1")
+        self.assertIs(self.b.get("s1"), first)
+        self.assertEqual(self.b.metrics()["loads"], 1)
+
+        add_chunk(self.a, session)
+        session.step_index = 1
+        self.a.save(session)
+        second = self.b.get("s1")
+        self.assertIsNot(second, first)
+        self.assertEqual(second.step_index, 1)
+        # Audio buffer is reused and only the new block is read
+        self.assertIs(second.audio, first.audio)
+        self.assertEqual(len(second.audio), 8000)
+
+    def test_truncate_audio(self):
+        session = self.a.create(make_session())
+        add_chunk(self.a, session)
+        add_chunk(self.a, session)
+        self.a.save(session)
+        self.assertEqual(len(self.b.get("s1").audio), 16000)
+
+        self.a.truncate_audio(session, session.rollback_answer(8000))
+        self.a.save(session)
+        self.assertEqual(len(self.b.get("s1").audio), 8000)
+
+    def test_summaries_outbox_and_delete(self):
+        session = self.a.create(make_session())
+        session.voice_prob = np.float32(0.75)
+        self.a.save(session)
+        summaries = self.b.summaries()
+        self.assertEqual(summaries[0]["id"], "s1")
+        self.assertEqual(self.b.count(), 1)
+        self.assertAlmostEqual(summaries[0]["voice_prob"], 0.75)
+        self.assertEqual(summaries[0]["version"], session.version)
+
+        self.assertFalse(self.b.outbox_pending("s1"))
+        self.a.outbox_put("s1", "/audio/next.mp3")
+        self.assertTrue(self.b.outbox_pending("s1"))
+        self.assertEqual(self.b.outbox_pop("s1"), "/audio/next.mp3")
+        self.assertIsNone(self.a.outbox_pop("s1"))
+
+        generation = self.b.generation()
+        self.a.delete("s1")
+        self.assertIsNone(self.b.get("s1"))
+        self.assertFalse(self.b.exists("s1"))
+        self.assertEqual(self.b.count(), 0)
+        self.assertNotEqual(self.b.generation(), generation)
+
+    def test_incremental_changes(self):
+        check_incremental_changes(self, self.a, self.b)
+
+    def test_lock_excludes_other_worker(self):
+        self.a.create(make_session())
+        order = []
+
+        def other_worker():
+            with self.b.lock("s1"):
+                order.append("b")
+
+        with self.a.lock("s1"):
+            with self.a.lock("s1"):  # Re-entrant in the owning worker
+                t = threading.Thread(target=other_worker)
+                t.start()
+                time.sleep(0.2)
+                order.append("a")
+        t.join(5)
+        self.assertEqual(order, ["a", "b"])
+
+class FakeRedisLock:
+    def __init__(self):
+        self.renewals = 0
+        self.released = False
+
+    def acquire(self, blocking=True):
+        return True
+
+    def reacquire(self):
+        self.renewals += 1
+
+    def release(self):
+        self.released = True
+
+class TestRedisLockLease(unittest.TestCase):
+
+    def test_lease_renewed_until_released(self):
+        fake = FakeRedisLock()
+        backend = RedisBackend.__new__(RedisBackend)  # No Redis server needed
+        backend.prefix = "test:"
+        backend.client = type("Client", (), {"lock": lambda self, name, timeout, thread_local: fake})()
+        old_timeout = session_store.SESSION_LOCK_TIMEOUT
+        session_store.SESSION_LOCK_TIMEOUT = 0.06
+        try:
+            release = backend.lock("s1:analysis")
+            time.sleep(0.2)  # Longer than the lease
+            release()
+            renewals = fake.renewals
+            time.sleep(0.1)
+        finally:
+            session_store.SESSION_LOCK_TIMEOUT = old_timeout
+        self.assertGreaterEqual(renewals, 2)
+        self.assertEqual(fake.renewals, renewals)  # Renewal stops on release
+        self.assertTrue(fake.released)
+
+if __name__ == '__main__':
+    unittest.main()
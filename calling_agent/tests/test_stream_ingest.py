@@ -0,0 +1,123 @@
+import unittest
+import sys
+import os
+import threading
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from concurrent.futures import Future
+from src.stream_ingest import StreamingUtterance, PreviewPool
+
+SR = 16000
+
+def voiced(seconds, f0=150.0):
+    t = np.arange(int(SR * seconds)) / SR
+    sig = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 15))
+    return (0.3 * sig * (1 + 0.5 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+
+def silence(seconds):
+    return np.zeros(int(SR * seconds), dtype=np.float32)
+
+def pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+def feed_in_pieces(utterance, data, size=1001):
+    # Odd piece size: samples straddle reads
+    for pos in range(0, len(data), size):
+        utterance.feed(data[pos:pos + size])
+
+class InlinePool(PreviewPool):
+    """
+    Runs each preview synchronously so every window is recorded in order.
+    """
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+class TestStreamingUtterance(unittest.TestCase):
+
+    def test_reassembles_split_frames(self):
+        audio = voiced(1.0)
+        utterance = StreamingUtterance()
+        feed_in_pieces(utterance, pcm16(audio))
+        samples = utterance.finish()
+        self.assertEqual(len(samples), len(audio))
+        np.testing.assert_allclose(samples, audio, atol=1 / 16384)
+
+        utterance = StreamingUtterance(fmt="f32")
+        feed_in_pieces(utterance, audio.astype('<f4').tobytes(), size=4097)
+        np.testing.assert_array_equal(utterance.finish(), audio)
+
+    def test_onset_and_endpoint(self):
+        utterance = StreamingUtterance(endpoint_ms=600)
+        feed_in_pieces(utterance, pcm16(silence(0.5)))
+        self.assertFalse(utterance.speech_started)
+
+        feed_in_pieces(utterance, pcm16(voiced(1.0)))
+        self.assertTrue(utterance.speech_started)
+        self.assertAlmostEqual(utterance.onset, 0.5, delta=0.1)
+        self.assertFalse(utterance.end_of_utterance)
+
+        feed_in_pieces(utterance, pcm16(silence(0.3)))
+        self.assertFalse(utterance.end_of_utterance)
+        feed_in_pieces(utterance, pcm16(silence(0.5)))
+        self.assertTrue(utterance.end_of_utterance)
+
+    def test_partial_transcripts_while_speaking(self):
+        partials = []
+        done = threading.Event()
+
+        def on_preview(samples, settle):
+            partials.append(len(samples))
+            done.set()
+
+        utterance = StreamingUtterance(on_preview=on_preview, preview_seconds=0.5)
+        feed_in_pieces(utterance, pcm16(silence(1.0)))
+        self.assertEqual(utterance.previews, 0)  # Nothing to transcribe before speech
+
+        feed_in_pieces(utterance, pcm16(voiced(1.0)))
+        self.assertTrue(done.wait(2))
+        self.assertGreaterEqual(utterance.previews, 1)
+        self.assertGreater(partials[0], SR)
+
+    def test_previews_dropped_when_pool_saturated(self):
+        release = threading.Event()
+        pool = PreviewPool(workers=1)
+        pool.submit(release.wait)  # Another stream's preview occupies the only worker
+        utterance = StreamingUtterance(on_preview=lambda samples, settle: None, preview_seconds=0.5, preview_pool=pool)
+        feed_in_pieces(utterance, pcm16(voiced(2.0)))
+        self.assertEqual(utterance.previews, 0)
+        self.assertGreater(utterance.previews_dropped, 0)
+        release.set()
+
+    def test_preview_decodes_only_audio_since_last_pause(self):
+        windows = []
+        utterance = StreamingUtterance(on_preview=lambda samples, settle: windows.append((len(samples), settle)),
+                                       preview_seconds=0.5, preview_pool=InlinePool(workers=1))
+        feed_in_pieces(utterance, pcm16(np.concatenate([voiced(1.0), silence(0.3), voiced(1.5)])))
+        utterance.finish()
+
+        settled = [i for i, (_, settle) in enumerate(windows) if settle]
+        self.assertEqual(len(settled), 1)  # Closed once, at the pause
+        self.assertAlmostEqual(windows[settled[0]][0] / SR, 1.3, delta=0.1)
+        # Later windows start after the pause instead of re-decoding from the beginning
+        self.assertTrue(all(n < 1.6 * SR for n, _ in windows[settled[0] + 1:]))
+
+    def test_preview_window_is_bounded_without_pauses(self):
+        windows = []
+        utterance = StreamingUtterance(on_preview=lambda samples, settle: windows.append((len(samples), settle)),
+                                       preview_seconds=0.5, window_seconds=2.0, preview_pool=InlinePool(workers=1))
+        feed_in_pieces(utterance, pcm16(voiced(5.0)))
+        self.assertTrue(all(n <= 2.5 * SR for n, _ in windows))
+        self.assertGreaterEqual(sum(settle for _, settle in windows), 2)
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            StreamingUtterance(fmt="opus")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src import vad
+from src.vad import trim_silence, speech_bounds, energy_frames
+
+SR = 16000
+
+def voiced(seconds, f0=150.0):
+    """
+    Speech-like harmonic signal with syllable-rate amplitude modulation.
+    """
+    t = np.arange(int(SR * seconds)) / SR
+    sig = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 15))
+    return (0.3 * sig * (1 + 0.5 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+
+def silence(seconds):
+    return np.zeros(int(SR * seconds), dtype=np.float32)
+
+class TestVAD(unittest.TestCase):
+
+    def test_trims_leading_and_trailing_silence(self):
+        chunk = np.concatenate([silence(1.0), voiced(1.5), silence(2.5)])
+        result = trim_silence(chunk, SR)
+        self.assertIsNotNone(result)
+        self.assertAlmostEqual(result["onset"], 1.0, delta=0.1)
+        self.assertLess(result["speech_seconds"], 2.0)
+        self.assertGreater(result["skipped_seconds"], 3.0)
+        self.assertAlmostEqual(result["speech_seconds"] + result["skipped_seconds"], 5.0, places=3)
+
+    def test_silent_chunks_are_dropped(self):
+        self.assertIsNone(trim_silence(silence(5.0), SR))
+        hiss = (np.random.default_rng(0).standard_normal(SR * 3) * 0.001).astype(np.float32)
+        self.assertIsNone(trim_silence(hiss, SR))
+
+    def test_short_clicks_are_not_speech(self):
+        flags = np.zeros(100, dtype=bool)
+        flags[10] = True          # 30 ms click
+        flags[40:60] = True       # real speech
+        self.assertEqual(speech_bounds(flags, 3), (40, 60))
+        self.assertIsNone(speech_bounds(flags[:30], 3))
+
+    def test_energy_fallback(self):
+        chunk = np.concatenate([silence(0.5), voiced(1.0), silence(0.5)])
+        flags = energy_frames(chunk, SR)
+        self.assertFalse(flags[:15].any())
+        self.assertTrue(flags[20:45].all())
+
+        saved = vad.webrtcvad
+        vad.webrtcvad = None
+        try:
+            result = trim_silence(chunk, SR)
+        finally:
+            vad.webrtcvad = saved
+        self.assertAlmostEqual(result["onset"], 0.5, delta=0.05)
+
+if __name__ == '__main__':
+    unittest.main()
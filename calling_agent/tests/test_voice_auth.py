@@ -0,0 +1,33 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.voice_auth import VoiceAuthenticator
+
+class TestVoiceAuthComparisons(unittest.TestCase):
+    """
+    The comparisons are pure numpy: no encoder (or Resemblyzer) needed.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        self.matrix = rng.standard_normal((20, 256)).astype(np.float32)
+
+    def test_compare_many_without_encoder(self):
+        scores = VoiceAuthenticator.compare_many(self.matrix[3], self.matrix)
+        self.assertEqual(scores.shape, (20,))
+        self.assertAlmostEqual(float(scores[3]), 1.0, places=5)
+        self.assertTrue(np.all((scores >= 0) & (scores <= 1)))
+        self.assertEqual(len(VoiceAuthenticator.compare_many(None, self.matrix)), 20)
+
+    def test_pairwise_without_encoder(self):
+        scores = VoiceAuthenticator.pairwise(self.matrix[:4], -self.matrix[:2])
+        self.assertEqual(scores.shape, (4, 2))
+        self.assertEqual(float(scores[0, 0]), 0.0)  # Opposite voices clip to 0
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import time
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.voice_index import EmbeddingCache, VoiceIndex
+
+MISS = object()
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def test_hit_miss_and_cached_none(self):
+        cache = EmbeddingCache(max_entries=10, ttl_seconds=60)
+        self.assertIs(cache.get("a", MISS), MISS)
+        cache.put("a", None)
+        self.assertIsNone(cache.get("a", MISS))
+        self.assertEqual(cache.metrics()["hits"], 1)
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIs(cache.get("b", MISS), MISS)
+        self.assertEqual(cache.get("a"), 1)
+
+    def test_ttl_and_invalidate(self):
+        cache = EmbeddingCache(ttl_seconds=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        self.assertIs(cache.get("a", MISS), MISS)
+        cache = EmbeddingCache(ttl_seconds=60)
+        cache.put("a", 1)
+        cache.invalidate("a")
+        self.assertIs(cache.get("a", MISS), MISS)
+
+class TestVoiceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_nearest_neighbours(self):
+        index = VoiceIndex(dim=8, initial_capacity=2)
+        voices = self.rng.standard_normal((20, 8)).astype(np.float32)
+        for i, v in enumerate(voices):
+            index.add(f"call{i}", v, phone_number=f"p{i}")
+        self.assertEqual(len(index), 20)
+
+        query = voices[7] + self.rng.standard_normal(8).astype(np.float32) * 0.01
+        results = index.search(query, k=3)
+        self.assertEqual(results[0]["key"], "call7")
+        self.assertGreater(results[0]["score"], 0.99)
+        self.assertEqual(len(results), 3)
+        self.assertGreaterEqual(results[0]["score"], results[1]["score"])
+
+    def test_exclude_phone_and_threshold(self):
+        index = VoiceIndex(dim=4)
+        index.add("own", [1, 0, 0, 0], phone_number="111")
+        index.add("ring", [0.99, 0.1, 0, 0], phone_number="222")
+        index.add("other", [0, 1, 0, 0], phone_number="333")
+        results = index.search([1, 0, 0, 0], k=5, min_score=0.9, exclude_phone="111")
+        self.assertEqual([r["key"] for r in results], ["ring"])
+
+    def test_replace_and_reject_bad_vectors(self):
+        index = VoiceIndex(dim=4)
+        self.assertTrue(index.add("c", [1, 0, 0, 0]))
+        self.assertTrue(index.add("c", [0, 1, 0, 0]))
+        self.assertEqual(len(index), 1)
+        self.assertFalse(index.add("z", [0, 0, 0, 0]))
+        self.assertFalse(index.add("w", [1, 0]))
+        self.assertEqual(index.search([0, 1, 0, 0], k=1)[0]["key"], "c")
+
+if __name__ == '__main__':
+    unittest.main()
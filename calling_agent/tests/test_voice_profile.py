@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.voice_profile import VoiceProfile
+
+def unit(v):
+    v = np.asarray(v, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+class TestVoiceProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_running_centroid_matches_mean(self):
+        profile = VoiceProfile(dim=16, capacity=4)
+        voices = self.rng.standard_normal((10, 16)).astype(np.float32)
+        for v in voices:
+            self.assertTrue(profile.add(v))
+        self.assertEqual(len(profile), 4)
+        self.assertEqual(profile.total_added, 10)
+
+        # Ring buffer keeps the last 4, oldest first; centroid is their normalized mean
+        expected = np.array([unit(v) for v in voices[-4:]])
+        np.testing.assert_allclose(profile.embeddings(), expected, rtol=1e-5)
+        np.testing.assert_allclose(profile.centroid(), unit(expected.mean(axis=0)), rtol=1e-4, atol=1e-6)
+
+    def test_match_uses_centroid_and_best_enrollment(self):
+        profile = VoiceProfile(dim=4, capacity=4)
+        profile.add([1, 0, 0, 0])
+        profile.add([0, 1, 0, 0])
+        match = profile.match([1, 0, 0, 0])
+        self.assertAlmostEqual(match["max_score"], 1.0, places=5)
+        self.assertAlmostEqual(match["centroid_score"], 1 / np.sqrt(2), places=5)
+        self.assertAlmostEqual(match["score"], (1.0 + 1 / np.sqrt(2)) / 2, places=5)
+
+    def test_rejects_bad_vectors(self):
+        profile = VoiceProfile(dim=4)
+        self.assertIsNone(profile.centroid())
+        self.assertIsNone(profile.match([1, 0, 0, 0]))
+        self.assertFalse(profile.add([0, 0, 0, 0]))
+        self.assertFalse(profile.add([1, 0]))
+        profile.add([1, 0, 0, 0])
+        self.assertIsNone(profile.match([0, 0, 0, 0]))
+
+    def test_document_roundtrip(self):
+        profile = VoiceProfile(dim=8, capacity=3)
+        for v in self.rng.standard_normal((5, 8)):
+            profile.add(v)
+        restored = VoiceProfile.from_document(profile.to_document())
+        np.testing.assert_allclose(restored.embeddings(), profile.embeddings())
+        np.testing.assert_allclose(restored.centroid(), profile.centroid(), rtol=1e-5)
+        self.assertEqual(restored.total_added, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src import voice_similarity
+
+def cosine(a, b):
+    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+
+class TestVoiceSimilarity(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.matrix = rng.standard_normal((50, 16)).astype(np.float32)
+        self.query = rng.standard_normal(16).astype(np.float32)
+
+    def test_compare_many_matches_pairwise_cosine(self):
+        expected = [cosine(self.query, row) for row in self.matrix]
+        # Small blocks exercise the block scan
+        scores = voice_similarity.compare_many(self.query, self.matrix, block_rows=7)
+        np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-6)
+
+        normalized = voice_similarity.normalize_rows(self.matrix)
+        np.testing.assert_allclose(voice_similarity.compare_many(self.query, normalized, normalized=True), expected, rtol=1e-5, atol=1e-6)
+
+    def test_pairwise(self):
+        scores = voice_similarity.pairwise(self.matrix[:3], self.matrix[10:15])
+        self.assertEqual(scores.shape, (3, 5))
+        self.assertAlmostEqual(float(scores[1, 2]), cosine(self.matrix[1], self.matrix[12]), places=5)
+
+    def test_zero_rows_score_zero(self):
+        matrix = np.vstack([np.zeros(16, dtype=np.float32), self.query])
+        scores = voice_similarity.compare_many(self.query, matrix)
+        self.assertEqual(scores[0], 0.0)
+        self.assertAlmostEqual(float(scores[1]), 1.0, places=5)
+
+    def test_top_k_over_blocks(self):
+        idx, scores = voice_similarity.top_k(self.matrix[23], self.matrix, k=3, block_rows=8)
+        expected = np.argsort(-voice_similarity.compare_many(self.matrix[23], self.matrix))[:3]
+        self.assertEqual(list(idx), list(expected))
+        self.assertEqual(idx[0], 23)
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_memmap_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "voices.f32")
+            self.assertEqual(voice_similarity.write_embedding_matrix(path, self.matrix, dim=16), 50)
+            mapped = voice_similarity.open_embedding_matrix(path, dim=16)
+            self.assertIsInstance(mapped, np.memmap)
+            self.assertEqual(mapped.shape, (50, 16))
+            scores = voice_similarity.compare_many(self.query, mapped, normalized=True, block_rows=16)
+            np.testing.assert_allclose(scores, voice_similarity.compare_many(self.query, self.matrix), rtol=1e-5, atol=1e-6)
+            del mapped
+
+    def test_pairwise_over_blocks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "voices.f32")
+            voice_similarity.write_embedding_matrix(path, self.matrix, dim=16)
+            mapped = voice_similarity.open_embedding_matrix(path, dim=16)
+            scores = voice_similarity.pairwise(mapped, mapped[:9], normalized=True, block_rows=4)
+            np.testing.assert_allclose(scores, voice_similarity.pairwise(self.matrix, self.matrix[:9]), rtol=1e-5, atol=1e-6)
+            del mapped
+
+if __name__ == '__main__':
+    unittest.main()
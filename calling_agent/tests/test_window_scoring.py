@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Adjust path to import src
+sys.path.append(os.path.join(os.getcwd(), '../calling_agent'))
+
+from src.window_scoring import window_bounds, score_windows
+
+SR = 16000
+
+class TestWindowScoring(unittest.TestCase):
+
+    def test_bounds_cover_clip_with_full_windows(self):
+        bounds = window_bounds(SR * 9, SR, window_seconds=4, hop_seconds=2)
+        self.assertEqual(bounds[0], (0, SR * 4))
+        self.assertEqual(bounds[-1], (SR * 5, SR * 9))
+        self.assertTrue(all(e - s == SR * 4 for s, e in bounds))
+
+    def test_short_and_empty_clips(self):
+        self.assertEqual(window_bounds(SR, SR, window_seconds=4), [(0, SR)])
+        self.assertEqual(window_bounds(0, SR), [])
+
+    def test_mean_of_window_scores_and_batching(self):
+        batches = []
+
+        def score(windows):
+            batches.append(len(windows))
+            return [0.2] * len(windows)
+
+        result = score_windows(np.zeros(SR * 20), score, SR, window_seconds=4, hop_seconds=2, batch_size=3)
+        self.assertEqual(result["windows_total"], 9)
+        self.assertEqual(len(result["windows"]), 9)
+        self.assertAlmostEqual(result["probability"], 0.2)
+        self.assertFalse(result["early_exit"])
+        self.assertEqual(batches, [3, 3, 3])
+
+    def test_early_exit_bounds_cost(self):
+        calls = []
+
+        def score(windows):
+            calls.append(len(windows))
+            return [0.97] * len(windows)
+
+        # A one-hour clip stops after min_windows once confidence is reached
+        result = score_windows(np.zeros(SR * 3600, dtype=np.float32), score, SR, batch_size=8, early_exit_threshold=0.9)
+        self.assertTrue(result["early_exit"])
+        self.assertEqual(calls, [2])
+        self.assertEqual(len(result["windows"]), 2)
+        self.assertGreater(result["windows_total"], 1000)
+
+    def test_early_exit_fires_on_typical_answer(self):
+        # ~10 s answer: 4 windows, fewer than one full batch
+        scores = iter([0.95, 0.96, 0.2, 0.2])
+        result = score_windows(np.zeros(SR * 10), lambda w: [next(scores) for _ in w], SR,
+                               batch_size=8, early_exit_threshold=0.9)
+        self.assertTrue(result["early_exit"])
+        self.assertEqual(len(result["windows"]), 2)
+
+    def test_threshold_below_half_rejected(self):
+        with self.assertRaises(ValueError):
+            score_windows(np.zeros(SR * 10), lambda w: [0.5] * len(w), SR, early_exit_threshold=0.3)
+
+    def test_no_early_exit_when_uncertain(self):
+        result = score_windows(np.zeros(SR * 12), lambda w: [0.5] * len(w), SR, batch_size=2, early_exit_threshold=0.9)
+        self.assertFalse(result["early_exit"])
+        self.assertEqual(len(result["windows"]), result["windows_total"])
+
+if __name__ == '__main__':
+    unittest.main()
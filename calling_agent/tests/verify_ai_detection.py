@@ -78,6 +78,11 @@ def verify_ai_fraud_detection():
                 time.sleep(0.5)
             
             result = resp.json()
+            
+            # Final step returns 'report_pending'; long-poll for the report
+            while result.get('status') == 'report_pending':
+                resp = requests.get(f"{SERVER_URL}{result['report_url']}", params={"timeout": 25})
+                result = resp.json()
             report = result.get('report', {})
             
             print("\n" + "="*30)
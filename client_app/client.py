@@ -4,6 +4,10 @@ import time
 import os
 import sys
 import threading
+import array
+import math
+import re
+from urllib.parse import urlparse
 
 # Audio Dependencies (Local Client Only)
 try:
@@ -22,6 +26,24 @@ except ImportError as e:
 
 SERVER_URL = "http://localhost:5001" # Default fallback
 
+# Client-clock timestamps sent with each answer, so the server can measure hesitation
+# from the end of the prompt to the first speech in the recording
+LAST_PLAYBACK_END = None
+LAST_RECORD_START = None
+
+# Streaming answers: raw 16 kHz PCM is uploaded while the caller speaks and recording
+# stops after STREAM_END_SILENCE seconds of silence instead of a fixed 5 s window
+STREAMING = os.environ.get("CLIENT_STREAMING", "1") != "0"
+STREAM_RATE = 16000
+STREAM_FRAME = 480  # 30 ms
+STREAM_SPEECH_RMS = 500  # int16 RMS treated as speech
+STREAM_END_SILENCE = 0.8
+
+# IVR prompts have content-hashed names (/audio/ask_name.<hash>.wav) whose bytes never
+# change, so each one is downloaded once and played from disk on every later call
+PROMPT_CACHE_DIR = os.environ.get("PROMPT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".voice_sentinel", "prompts"))
+HASHED_PROMPT = re.compile(r"^/audio/[\w-]+\.[0-9a-f]{12}\.wav$")
+
 def get_server_url():
     """
     Asks user for the Server IP to connect over Wi-Fi.
@@ -43,23 +65,82 @@ def get_server_url():
             ip = f"http://{ip}:5001"
         return ip
 
-def play_audio_from_url(url):
+class SessionExpired(Exception):
+    pass
+
+def wait_for_agent_audio():
     """
-    Fetches audio from URL and plays it locally.
+    Blocks until the agent sends a message and returns its audio URL.
+    Listens on the session's Server-Sent Events stream; falls back to the
+    long-poll endpoint if the stream can't be used. Returns None on a timeout.
+    """
+    try:
+        with requests.get(f"{SERVER_URL}/client/events/{SESSION_ID}", stream=True, timeout=(5, 60)) as r:
+            if r.status_code == 404:
+                raise SessionExpired()
+            if r.status_code == 200:
+                event = None
+                for line in r.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and event == "agent_audio":
+                        return json.loads(line[5:])["audio_url"]
+                    elif line.startswith("data:") and event == "session_expired":
+                        raise SessionExpired()
+                return None
+    except requests.RequestException:
+        pass
+
+    r = requests.get(f"{SERVER_URL}/client/wait_for_agent/{SESSION_ID}", params={"timeout": 25}, timeout=35)
+    if r.status_code == 404:
+        raise SessionExpired()
+    data = r.json()
+    if data.get("has_audio"):
+        return data.get("audio_url")
+    if "Retry-After" in r.headers:
+        # Server is holding as many waiting connections as it can; it answered at once
+        time.sleep(float(r.headers["Retry-After"]))
+    return None
+
+def fetch_audio(url):
+    """
+    Local path of the audio at `url`. IVR prompts come from the prompt cache when possible.
     """
     full_url = f"{SERVER_URL}{url}" if url.startswith("/") else url
+    path = urlparse(full_url).path
+    if HASHED_PROMPT.match(path):
+        cached = os.path.join(PROMPT_CACHE_DIR, os.path.basename(path))
+        if os.path.exists(cached):
+            print(f"[Client] Playing (cached): {path}")
+            return cached
+        print(f"[Client] Playing: {full_url}")
+        r = requests.get(full_url, timeout=30)
+        r.raise_for_status()
+        os.makedirs(PROMPT_CACHE_DIR, exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.part"
+        with open(tmp, "wb") as f:
+            f.write(r.content)
+        os.replace(tmp, cached)
+        return cached
+
     print(f"[Client] Playing: {full_url}")
-    
+    r = requests.get(full_url)
+    with open("temp_playback.wav", "wb") as f:
+        f.write(r.content)
+    return "temp_playback.wav"
+
+def play_audio_from_url(url):
+    """
+    Fetches audio from URL and plays it locally.
+    """
     try:
-        r = requests.get(full_url)
-        with open("temp_playback.wav", "wb") as f:
-            f.write(r.content)
+        local_path = fetch_audio(url)
             
         # Play using PyAudio (Windows/Cross-platform Safe)
         import wave
         import pyaudio
         
-        wf = wave.open("temp_playback.wav", 'rb')
+        wf = wave.open(local_path, 'rb')
         p = pyaudio.PyAudio()
         
         stream = p.open(format=p.get_format_from_width(wf.getsampwidth()),
@@ -78,6 +159,87 @@ def play_audio_from_url(url):
         
     except Exception as e:
         print(f"[Playback Error] {e}")
+    finally:
+        global LAST_PLAYBACK_END
+        LAST_PLAYBACK_END = time.time()
+
+def post_response(record_file, max_retries=5):
+    """
+    Uploads a recorded answer. Honours HTTP 429 / Retry-After back-pressure from the server.
+    """
+    resp = None
+    for attempt in range(max_retries):
+        with open(record_file, "rb") as f:
+            files = {'file': f}
+            payload = {'session_id': SESSION_ID}
+            if LAST_PLAYBACK_END is not None and LAST_RECORD_START is not None:
+                payload['playback_end'] = LAST_PLAYBACK_END
+                payload['record_start'] = LAST_RECORD_START
+            resp = requests.post(f"{SERVER_URL}/submit-response", files=files, data=payload)
+        if resp.status_code != 429:
+            break
+        wait = int(resp.headers.get("Retry-After", 1))
+        print(f"[Client] Server busy. Retrying in {wait}s...")
+        time.sleep(wait)
+    return resp
+
+def frame_rms(data):
+    samples = array.array('h', data)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(x * x for x in samples) / len(samples))
+
+def stream_response(max_seconds=10):
+    """
+    Records from the microphone and uploads 16 kHz PCM16 frames as they are captured
+    (chunked transfer). Stops after STREAM_END_SILENCE seconds of silence following speech.
+    Returns the server response; frames are kept for a full-body retry on 429.
+    """
+    global LAST_RECORD_START
+    p = pyaudio.PyAudio()
+    stream = p.open(format=pyaudio.paInt16, channels=1, rate=STREAM_RATE, input=True, frames_per_buffer=STREAM_FRAME)
+    LAST_RECORD_START = time.time()  # Capture starts when the stream opens
+    frames = []
+
+    def capture():
+        heard_speech = False
+        silence = 0.0
+        frame_seconds = STREAM_FRAME / STREAM_RATE
+        print(f"\n[Client] Listening (up to {max_seconds}s)... GO!")
+        for _ in range(int(max_seconds / frame_seconds)):
+            data = stream.read(STREAM_FRAME, exception_on_overflow=False)
+            frames.append(data)
+            yield data
+            if frame_rms(data) >= STREAM_SPEECH_RMS:
+                heard_speech = True
+                silence = 0.0
+            elif heard_speech:
+                silence += frame_seconds
+                if silence >= STREAM_END_SILENCE:
+                    break
+        print("[Client] Recording Finished.")
+
+    url = f"{SERVER_URL}/submit-response/stream?session_id={SESSION_ID}&format=pcm16&sample_rate={STREAM_RATE}"
+    url += f"&record_start={LAST_RECORD_START}"
+    if LAST_PLAYBACK_END is not None:
+        url += f"&playback_end={LAST_PLAYBACK_END}"
+    headers = {"Content-Type": "application/octet-stream"}
+    try:
+        resp = requests.post(url, data=capture(), headers=headers)
+    finally:
+        stream.stop_stream()
+        stream.close()
+        p.terminate()
+
+    body = b"".join(frames)
+    for _ in range(5):
+        if resp.status_code != 429:
+            break
+        wait = int(resp.headers.get("Retry-After", 1))
+        print(f"[Client] Server busy. Retrying in {wait}s...")
+        time.sleep(wait)
+        resp = requests.post(url, data=body, headers=headers)
+    return resp
 
 def record_audio(filename, duration=5):
     """
@@ -100,6 +262,8 @@ def record_audio(filename, duration=5):
     
     frames = []
     
+    global LAST_RECORD_START
+    LAST_RECORD_START = time.time()
     for i in range(0, int(RATE / CHUNK * duration)):
         data = stream.read(CHUNK)
         frames.append(data)
@@ -184,9 +348,14 @@ def main():
     while True:
         # Record Answer
         record_file = "client_response.wav"
+        streamed = False
         try:
             input("[Press Enter to Start Recording]")
-            record_audio(record_file, duration=5) # Fixed 5s for now, can be dynamic
+            if STREAMING:
+                pyaudio  # Raises NameError (mock path) when audio deps are missing
+                streamed = True # Recorded while uploading, below
+            else:
+                record_audio(record_file, duration=5) # Fixed 5s window
         except NameError: 
              # Mock if imports failed
              print("[Mock] Recording...")
@@ -200,16 +369,16 @@ def main():
                  w.writeframes(b'\x00' * 44100 * 2) # 1 sec silence
         
         # Send
-        print("[Client] Sending Response...")
         try:
-            with open(record_file, "rb") as f:
-                files = {'file': f}
-                payload = {'session_id': SESSION_ID}
-                resp = requests.post(f"{SERVER_URL}/submit-response", files=files, data=payload)
-                
+            if streamed:
+                resp = stream_response()
+            else:
+                print("[Client] Sending Response...")
+                resp = post_response(record_file)
             data = resp.json()
             
-            if data.get("status") == "completed":
+            if data.get("status") in ("completed", "report_pending"):
+                # Report is generated server-side in the background
                 print("\n[Client] IVR Completed. Connecting you to a human agent...")
                 print("... (Music Playing) ...")
                 # Wait loop or simple hold
@@ -247,19 +416,17 @@ def main():
             print("[Client] Waiting for Agent to speak...", end="\r")
             agent_audio_url = None
             
-            # Poll loop
+            # Push delivery: SSE stream, long-poll if the stream can't be opened
             while not agent_audio_url:
                 try:
-                    p_resp = requests.get(f"{SERVER_URL}/client/poll_agent/{SESSION_ID}", timeout=5)
-                    if p_resp.status_code == 200:
-                        p_data = p_resp.json()
-                        if p_data.get('has_audio'):
-                            agent_audio_url = p_data['audio_url']
-                            print(f"\n[Agent] Message Received!")
-                    time.sleep(1)
+                    agent_audio_url = wait_for_agent_audio()
+                    if agent_audio_url:
+                        print(f"\n[Agent] Message Received!")
+                except SessionExpired:
+                    raise
                 except KeyboardInterrupt:
                     raise
-                except:
+                except Exception:
                     time.sleep(1)
             
             # 2. Play Agent Audio
@@ -269,16 +436,14 @@ def main():
             print("\n[Your Turn]")
             input("Press Enter to Start Recording >> ")
             
-            # 4. Record
+            # 4. Record & 5. Send
             record_file = "client_handover_response.wav"
-            record_audio(record_file, duration=5)
-            
-            # 5. Send
-            print("[Client] Sending Reply...")
-            with open(record_file, "rb") as f:
-                files = {'file': f}
-                payload = {'session_id': SESSION_ID}
-                resp = requests.post(f"{SERVER_URL}/submit-response", files=files, data=payload)
+            if STREAMING:
+                resp = stream_response()
+            else:
+                record_audio(record_file, duration=5)
+                print("[Client] Sending Reply...")
+                resp = post_response(record_file)
                 
             if resp.status_code == 200:
                 print("[Sent] Message delivered.")
@@ -294,6 +459,9 @@ def main():
             except:
                 pass
                 
+        except SessionExpired:
+            print("❌ Session Expired (Server Restarted). Please restart this client script.")
+            break
         except KeyboardInterrupt:
             print("\nCall Ended.")
             break
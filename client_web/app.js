@@ -6,7 +6,17 @@ let SESSION_ID = null;
 let mediaRecorder;
 let audioChunks = [];
 let isRecording = false;
-let pollingInterval;
+let agentEvents = null;
+// Client-clock timestamps (seconds) sent with each answer for hesitation measurement
+let lastPlaybackEnd = null;
+let recordStart = null;
+
+// IVR prompts have content-hashed names (/audio/ask_name.<hash>.wav|.opus) whose bytes
+// never change: they are kept in Cache Storage and only downloaded on the first call
+const PROMPT_CACHE = 'ivr-prompts-v1';
+const HASHED_PROMPT = /\/audio\/[\w-]+\.[0-9a-f]{12}\.(wav|opus)$/;
+const CAN_PLAY_OPUS = !!new Audio().canPlayType('audio/ogg; codecs=opus');
+const promptObjectUrls = new Map(); // prompt URL -> blob: URL, for this page
 
 // --- Elements ---
 const views = {
@@ -67,7 +77,7 @@ document.getElementById('setup-form').addEventListener('submit', async (e) => {
 
             // Auto-play first audio
             if (data.audio_url) {
-                await playAudio(data.audio_url);
+                await playAudio(promptUrl(data));
             }
         } else {
             throw new Error(data.error || "Failed to start");
@@ -108,6 +118,7 @@ async function startRecording() {
         };
 
         mediaRecorder.onstop = submitResponse;
+        mediaRecorder.onstart = () => { recordStart = Date.now() / 1000; };
 
         mediaRecorder.start();
         isRecording = true;
@@ -160,21 +171,34 @@ async function submitResponse() {
     const formData = new FormData();
     formData.append('file', audioBlob, 'response.wav');
     formData.append('session_id', SESSION_ID);
+    if (lastPlaybackEnd !== null && recordStart !== null) {
+        formData.append('playback_end', lastPlaybackEnd);
+        formData.append('record_start', recordStart);
+    }
 
     try {
-        const res = await fetch(`${SERVER_URL}/submit-response`, {
-            method: 'POST',
-            body: formData
-        });
+        let res;
+        // Honour back-pressure from the analysis queue (HTTP 429 + Retry-After)
+        for (let attempt = 0; attempt < 5; attempt++) {
+            res = await fetch(`${SERVER_URL}/submit-response`, {
+                method: 'POST',
+                body: formData
+            });
+            if (res.status !== 429) break;
+            const wait = parseInt(res.headers.get('Retry-After') || '1', 10);
+            updateStatus("Server Busy", `Retrying in ${wait}s`);
+            await new Promise(r => setTimeout(r, wait * 1000));
+        }
 
         const data = await res.json();
 
         if (data.status === 'continued') {
             updateStatus("Listening...", "Waiting for input");
             if (data.audio_url) {
-                await playAudio(data.audio_url);
+                await playAudio(promptUrl(data));
             }
-        } else if (data.status === 'completed') {
+        } else if (data.status === 'completed' || data.status === 'report_pending') {
+            // Final report is generated server-side in the background
             enterHandoverMode();
         }
 
@@ -187,15 +211,42 @@ async function submitResponse() {
 }
 
 // --- Audio Playback ---
-function playAudio(url) {
+function promptUrl(data) {
+    // The Opus copy is a fraction of the WAV's size
+    return (data.audio_opus_url && CAN_PLAY_OPUS) ? data.audio_opus_url : data.audio_url;
+}
+
+async function cachedAudioUrl(fullUrl) {
+    if (!HASHED_PROMPT.test(fullUrl) || !window.caches) return fullUrl;
+    if (promptObjectUrls.has(fullUrl)) return promptObjectUrls.get(fullUrl);
+    try {
+        const cache = await caches.open(PROMPT_CACHE);
+        let res = await cache.match(fullUrl);
+        if (!res) {
+            res = await fetch(fullUrl);
+            if (!res.ok) return fullUrl;
+            await cache.put(fullUrl, res.clone());
+        }
+        const objectUrl = URL.createObjectURL(await res.blob());
+        promptObjectUrls.set(fullUrl, objectUrl);
+        return objectUrl;
+    } catch (err) {
+        console.warn("Prompt cache unavailable", err); // e.g. not a secure context
+        return fullUrl;
+    }
+}
+
+async function playAudio(url) {
+    const fullUrl = url.startsWith("http") ? url : `${SERVER_URL}${url}`;
+    const src = await cachedAudioUrl(fullUrl);
     return new Promise((resolve) => {
         updateStatus("Sentinel Speaking", "Secure Voice Output");
         animateVisualizer(true, 'blue'); // Different color/style for playback?
 
-        const fullUrl = url.startsWith("http") ? url : `${SERVER_URL}${url}`;
-        const audio = new Audio(fullUrl);
+        const audio = new Audio(src);
 
         audio.onended = () => {
+            lastPlaybackEnd = Date.now() / 1000;
             animateVisualizer(false);
             updateStatus("Your Turn", "Press button to speak");
             resolve();
@@ -218,32 +269,56 @@ function playAudio(url) {
 function enterHandoverMode() {
     switchView('handover');
 
-    // Start polling for agent audio
-    pollingInterval = setInterval(pollAgent, 2000);
+    // Agent messages are pushed: Server-Sent Events, long-poll where EventSource is unavailable
+    if (window.EventSource) {
+        agentEvents = new EventSource(`${SERVER_URL}/client/events/${SESSION_ID}`);
+        agentEvents.addEventListener('agent_audio', (e) => showAgentMessage(JSON.parse(e.data).audio_url));
+        agentEvents.addEventListener('session_expired', () => {
+            // Session was evicted on the server; stop reconnecting
+            agentEvents.close();
+            agentEvents = null;
+        });
+        agentEvents.onerror = () => {
+            // EventSource reconnects on its own; give up only if the stream was closed for good (e.g. 404)
+            if (agentEvents.readyState === EventSource.CLOSED) {
+                agentEvents = null;
+                waitForAgent();
+            }
+        };
+    } else {
+        waitForAgent();
+    }
 }
 
-async function pollAgent() {
-    try {
-        const res = await fetch(`${SERVER_URL}/client/poll_agent/${SESSION_ID}`);
-        if (res.status === 200) {
-            const data = await res.json();
-            if (data.has_audio && data.audio_url) {
-                // Determine URL (Handle Localhost relative vs absolute)
-                // If the backend returns a full URL using its internal knowledge, we might need to adjust if proxied.
-                // But server logic uses request.host_url so it should be fine.
-
-                const agentMsgBox = document.getElementById('agent-msg-box');
-                agentMsgBox.innerHTML = `<button onclick="playAudio('${data.audio_url}')" class="px-4 py-2 bg-indigo-100 text-indigo-700 rounded-lg flex items-center gap-2"><i data-lucide="play"></i> Play Message from Agent</button>`;
-
-                // Optional: Auto Play
-                playAudio(data.audio_url);
+async function waitForAgent() {
+    while (SESSION_ID) {
+        try {
+            const res = await fetch(`${SERVER_URL}/client/wait_for_agent/${SESSION_ID}?timeout=25`);
+            if (res.status === 404) return;
+            if (res.status === 200) {
+                const data = await res.json();
+                if (data.has_audio && data.audio_url) showAgentMessage(data.audio_url);
+                // Server had no thread to hold this request open: it answered at once, back off
+                const retryAfter = res.headers.get('Retry-After');
+                if (retryAfter) await new Promise(r => setTimeout(r, parseInt(retryAfter, 10) * 1000));
+                continue;
             }
+        } catch (e) {
+            // Network error: back off below
         }
-    } catch (e) {
-        // Silent fail
+        await new Promise(r => setTimeout(r, 2000));
     }
 }
 
+function showAgentMessage(audioUrl) {
+    // server logic uses request.host_url so the URL is absolute
+    const agentMsgBox = document.getElementById('agent-msg-box');
+    agentMsgBox.innerHTML = `<button onclick="playAudio('${audioUrl}')" class="px-4 py-2 bg-indigo-100 text-indigo-700 rounded-lg flex items-center gap-2"><i data-lucide="play"></i> Play Message from Agent</button>`;
+
+    // Optional: Auto Play
+    playAudio(audioUrl);
+}
+
 
 // --- Utilities ---
 function switchView(viewName) {
@@ -40,6 +40,12 @@ def run_test(target_url):
     print("Checking Health...")
     try:
         resp = requests.get(f"{target_url}/health", timeout=60)
+        # 503 means the server is still warming up its models
+        for _ in range(60):
+            if resp.status_code != 503:
+                break
+            time.sleep(2)
+            resp = requests.get(f"{target_url}/health", timeout=60)
         print(f"Health: {resp.status_code} - {resp.text}")
         if resp.status_code != 200:
             print("Health check failed!")
@@ -84,6 +90,11 @@ def run_test(target_url):
             json_resp = resp.json()
             print(f"Step {step} Response: {json_resp}")
             
+            # Final report is generated asynchronously; long-poll for it
+            while json_resp.get("status") == "report_pending":
+                resp = requests.get(f"{target_url}{json_resp['report_url']}", params={"timeout": 25}, timeout=60)
+                json_resp = resp.json()
+            
             if json_resp.get("status") == "completed":
                 print("IVR Flow Completed!")
                 report = json_resp.get("report")